@@ -1,7 +1,10 @@
 import os
 import openai
 import pandas as pd
+import numpy as np
 import time
+from sentiment_records import ensure_article_ids, load_name_to_code, make_records
+from security_ids import attach_security_id, load_security_master, security_master_path
 
 # 환경 변수에서 API 키 불러오기
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -13,6 +16,9 @@ client = openai.OpenAI(api_key=OPENAI_API_KEY)
 # 파일 경로 설정
 EXCEL_PATH = "/Users/imdonghyeon/Desktop/Quantlab/processed_economy/updated_time_normalized/NewsResult_20220101-20220131.xlsx"
 OUTPUT_PATH = "NewsResult_20220101-20220131_with_score.xlsx"
+# 기업별 감성 레코드 (article_id, company, ticker, score, confidence)
+RECORDS_PATH = "NewsResult_20220101-20220131_with_score_records.xlsx"
+MATCHED_PATH = "matched_companies.json"
 
 
 # 프롬프트
@@ -38,42 +44,53 @@ def analyze_company(title, company):
         response = client.chat.completions.create(
             model="gpt-4.1-nano-2025-04-14",
             messages=[{"role": "user", "content": prompt}],
-            temperature=0
+            temperature=0,
+            logprobs=True
         )
         content = response.choices[0].message.content.strip()
         label = content.split("\n")[0].strip().upper()
 
+        # 첫 토큰 확률을 응답 신뢰도로 사용
+        logprobs = response.choices[0].logprobs
+        confidence = float(np.exp(logprobs.content[0].logprob)) \
+            if logprobs and logprobs.content else np.nan
+
         print(f"GPT 응답:\n{content}")
-        print(f"감성 해석 결과: {company} → {label}")
+        print(f"감성 해석 결과: {company} → {label} (신뢰도 {confidence:.3f})")
 
-        return {
+        score = {
             "예": 1, "YES": 1,
             "아니오": -1, "NO": -1,
             "알 수 없음": 0, "UNKNOWN": 0
         }.get(label, 0)
+        return score, confidence
 
     except Exception as e:
         print(f"GPT 분석 실패: {company} → {e}")
-        return 0
+        return 0, np.nan
 
 
 df = pd.read_excel(EXCEL_PATH, dtype=str)
+# 기사 고유 id (출력 파일에 컬럼으로 저장, 이후 모든 단계에서 레코드 결합 키)
+df = ensure_article_ids(df)
 titles = df["제목"].fillna("")
 companies_list = df["기관(정규화)"].fillna("")
 
 # 결과 저장 열
 results = []
+records = []
 
 # 한 기사씩 분석 루프
-for idx, (title, company_str) in enumerate(zip(titles, companies_list)):
+for idx, (article_id, title, company_str) in enumerate(zip(df["article_id"], titles, companies_list)):
     companies = [c.strip() for c in company_str.split(",") if c.strip()]
     row_result = []
 
     print(f"\n🚀 [{idx+1}/{len(df)}] 뉴스 제목 분석 시작: '{title}'")
 
     for comp in companies:
-        score = analyze_company(title, comp)
+        score, confidence = analyze_company(title, comp)
         row_result.append(f"{comp}({score})")
+        records.append((article_id, comp, score, confidence))
         time.sleep(1.1)
 
     results.append(", ".join(row_result))
@@ -84,3 +101,13 @@ df["GPT_기업별감성"] = results
 
 df.to_excel(OUTPUT_PATH, index=False)
 print(f"\n전체 분석 완료! 결과 저장됨 → {OUTPUT_PATH}")
+
+# 기업별 감성 레코드 저장 (article_id = 출력 파일의 article_id 컬럼)
+name_to_code = load_name_to_code(
+    MATCHED_PATH) if os.path.exists(MATCHED_PATH) else None
+records_df = make_records(records, name_to_code)
+if os.path.exists(security_master_path):
+    records_df = attach_security_id(
+        records_df, load_security_master(security_master_path))
+records_df.to_excel(RECORDS_PATH, index=False)
+print(f"기업별 감성 레코드 저장됨 → {RECORDS_PATH} ({len(records_df)}건)")
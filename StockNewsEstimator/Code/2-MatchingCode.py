@@ -1,5 +1,8 @@
+import os
 import json
 from pykrx import stock
+from security_ids import (build_security_master, extend_security_master, load_security_master,
+                          normalize_code, save_security_master, security_master_path)
 
 # 1. mentioned_companies.txt
 with open("/Users/imdonghyeon/Desktop/Quantlab/Normailized List/mentioned_companies.txt", "r", encoding="utf-8") as f:
@@ -18,11 +21,13 @@ for line in lines:
             company_list.append(line)
 
 # 2. 전체 상장기업 리스트 가져오기
-tickers = stock.get_market_ticker_list(market="ALL")
 name_to_code = {}
-for ticker in tickers:
-    name = stock.get_market_ticker_name(ticker)
-    name_to_code[name] = ticker
+code_to_market = {}
+for market in ["KOSPI", "KOSDAQ", "KONEX"]:
+    for ticker in stock.get_market_ticker_list(market=market):
+        name = stock.get_market_ticker_name(ticker)
+        name_to_code[name] = ticker
+        code_to_market[ticker] = market
 
 # 3. Matching
 result = {}
@@ -37,3 +42,19 @@ with open("matched_companies.json", "w", encoding="utf-8") as f:
     json.dump(result, f, ensure_ascii=False, indent=4)
 
 print("JSON 저장 완료: matched_companies.json")
+
+# 4. 종목코드 → 정수 security_id 마스터 (이후 단계는 이 id 로 병합)
+# 기존 마스터가 있으면 새 종목만 뒤에 추가 (저장된 레코드/상태의 security_id 유지)
+codes = list(name_to_code.values())
+names = list(name_to_code.keys())
+markets = [code_to_market[c] for c in codes]
+if os.path.exists(security_master_path):
+    master = extend_security_master(load_security_master(security_master_path), codes, names, markets)
+    # 시장 정보 없이 추가됐던 기존 종목의 시장 채우기
+    market_of = dict(zip(normalize_code(codes), markets))
+    filled = master['code'].map(market_of)
+    master['market'] = master['market'].fillna(filled) if 'market' in master.columns else filled
+else:
+    master = build_security_master(codes, names, markets)
+save_security_master(master)
+print(f"security_id 마스터 저장 완료: {security_master_path} ({len(master)}개 종목)")
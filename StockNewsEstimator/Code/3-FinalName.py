@@ -1,6 +1,7 @@
 import os
 import pandas as pd
 import re
+from sentiment_records import rename_companies
 
 input_folder = '/Users/imdonghyeon/Desktop/Quantlab/final_newsdata'
 output_folder = '/Users/imdonghyeon/Desktop/Quantlab/tmp'
@@ -33,7 +34,10 @@ for filename in os.listdir(input_folder):
         try:
             df = pd.read_excel(file_path, engine='openpyxl')
 
-            if 'GPT_기업별감성' in df.columns:
+            # 기업별 감성 레코드는 company 컬럼을 바로 치환
+            if 'company' in df.columns and 'article_id' in df.columns:
+                df = rename_companies(df, name_map)
+            elif 'GPT_기업별감성' in df.columns:
                 df['GPT_기업별감성'] = df['GPT_기업별감성'].apply(replace_company_names)
 
             output_path = os.path.join(output_folder, filename)
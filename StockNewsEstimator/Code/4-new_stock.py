@@ -2,6 +2,8 @@ import os
 import re
 import pandas as pd
 import datetime
+from security_ids import (build_security_master, extend_security_master, load_security_master,
+                          lookup_security_id, save_security_master, security_master_path, MISSING_ID)
 
 input_dir = '/Users/imdonghyeon/Desktop/Quantlab/PRA_DAY'
 out_dir = '/Users/imdonghyeon/Desktop/Quantlab/news_stock'
@@ -33,10 +35,22 @@ melted = stock_df.melt(
 melted['price'] = melted['price'].str.replace(',', '').astype(float)
 melted['date'] = pd.to_datetime(melted['date'], format='%Y-%m-%d').dt.date
 
+# 종목코드 → 정수 security_id (마스터에 없는 종목은 뒤에 추가)
+master = load_security_master(security_master_path) \
+    if os.path.exists(security_master_path) else None
+symbols = stock_df[['Symbol', 'Symbol Name']].drop_duplicates('Symbol')
+if master is None:
+    master = build_security_master(symbols['Symbol'], symbols['Symbol Name'])
+else:
+    master = extend_security_master(
+        master, symbols['Symbol'], symbols['Symbol Name'])
+save_security_master(master, security_master_path)
+melted['security_id'] = lookup_security_id(master, codes=melted['Symbol'])
+
 open_df = melted[melted['Item Name'] == '시가(원)'].rename(
-    columns={'price': '시가'})[['Symbol Name', 'date', '시가']]
+    columns={'price': '시가'})[['Symbol Name', 'security_id', 'date', '시가']]
 adj_df = melted[melted['Item Name'] == '수정주가 (현금배당반영)(원)'].rename(
-    columns={'price': '수정종가'})[['Symbol Name', 'date', '수정종가']]
+    columns={'price': '수정종가'})[['Symbol Name', 'security_id', 'date', '수정종가']]
 
 # 1) 뉴스 폴더 내 모든 파일 처리
 for filename in os.listdir(input_dir):
@@ -52,25 +66,44 @@ for filename in os.listdir(input_dir):
         news_df = pd.read_excel(input_file, dtype=str)
 
         # 뉴스 전처리
-        news_df['일자_clean'] = news_df['일자'].str.extract(
-            r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')[0]
-        news_df['date'] = pd.to_datetime(
-            news_df['일자_clean'], format='%Y-%m-%d %H:%M:%S', errors='coerce').dt.date
-        news_df['company'] = news_df['GPT_기업별감성'].str.extract(
-            r'([^()]+)')[0].str.strip()
-        news_df['GPT_SCORE'] = pd.to_numeric(news_df['GPT_기업별감성'].str.extract(
-            r'\(([-+]?[0-9]*\.?[0-9]+)\)')[0], errors='coerce')
-
-        # 주가 병합
-        merged = pd.merge(news_df, open_df, left_on=['company', 'date'], right_on=[
-                          'Symbol Name', 'date'], how='left')
-        merged = pd.merge(merged, adj_df, left_on=['company', 'date'], right_on=[
-                          'Symbol Name', 'date'], how='left', suffixes=('', '_drop'))
-        merged.drop(columns=['Symbol Name_drop'], inplace=True)
+        labeled = 'company' in news_df.columns and 'date' in news_df.columns
+        if labeled:
+            # news_labeling.py 출력: 기업별 레코드가 이미 펼쳐져 있음
+            news_df['date'] = pd.to_datetime(news_df['date']).dt.date
+            news_df['GPT_SCORE'] = pd.to_numeric(
+                news_df['GPT_SCORE'], errors='coerce')
+        else:
+            news_df['일자_clean'] = news_df['일자'].str.extract(
+                r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')[0]
+            news_df['date'] = pd.to_datetime(
+                news_df['일자_clean'], format='%Y-%m-%d %H:%M:%S', errors='coerce').dt.date
+            news_df['company'] = news_df['GPT_기업별감성'].str.extract(
+                r'([^()]+)')[0].str.strip()
+            news_df['GPT_SCORE'] = pd.to_numeric(news_df['GPT_기업별감성'].str.extract(
+                r'\(([-+]?[0-9]*\.?[0-9]+)\)')[0], errors='coerce')
+
+        # 주가 병합 (security_id 가 있으면 정수 키, 없으면 기업명)
+        if 'security_id' in news_df.columns:
+            news_df['security_id'] = pd.to_numeric(
+                news_df['security_id'], errors='coerce').fillna(MISSING_ID).astype('int64')
+            keys = ['security_id', 'date']
+            merged = pd.merge(news_df, open_df.drop(columns='Symbol Name'),
+                              on=keys, how='left')
+            merged = pd.merge(merged, adj_df, on=keys, how='left')
+        else:
+            merged = pd.merge(news_df, open_df.drop(columns='security_id'), left_on=['company', 'date'], right_on=[
+                              'Symbol Name', 'date'], how='left')
+            merged = pd.merge(merged, adj_df.drop(columns='security_id'), left_on=['company', 'date'], right_on=[
+                              'Symbol Name', 'date'], how='left', suffixes=('', '_drop'))
+            merged.drop(columns=['Symbol Name_drop'], inplace=True)
 
         # 저장
-        cleaned = merged.drop(
-            columns=['일자_clean', 'company', 'Symbol Name', 'date'])
+        if labeled:
+            # 타입이 지정된 컬럼(date, company 등)은 그대로 유지
+            cleaned = merged.drop(columns=['Symbol Name'])
+        else:
+            cleaned = merged.drop(
+                columns=['일자_clean', 'company', 'Symbol Name', 'date'])
         cleaned.to_excel(out_file, index=False)
         print(f"처리 완료: {filename} → {os.path.basename(out_file)}")
 
@@ -0,0 +1,166 @@
+import time
+import numpy as np
+import pandas as pd
+from daily_aggregates import delta_neutral_daily, equal_weight_daily
+from position_engine import (SESSION_RULES, build_price_cube, build_return_cube, daily_portfolio_returns,
+                             prepare_news_arrays, resolve_entry_exit)
+from cost_model import COST_PARAMS, position_costs
+from incremental_backtest import append_day, daily_frame, init_state
+from param_sweep import daily_delta_neutral
+
+# 일별 집계 속도/일치 확인: 수백만 행 합성 데이터로 날짜별 루프(기존 방식) vs bincount 집계 비교
+# 증분 백테스트 (append_day 를 하루씩 재생) vs 전체 재계산 (param_sweep.daily_delta_neutral) 일치 확인
+
+N_ROWS = 5_000_000
+N_DAYS = 800
+
+
+def make_synthetic(n_rows=N_ROWS, n_days=N_DAYS, seed=0):
+    """
+    news_with_sector 형식 합성 데이터 (롱 50% / 숏 30% / 포지션 없음 20%)
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2022-01-03', periods=n_days)
+    r = rng.normal(0.0005, 0.02, n_rows)
+    side = rng.choice([1, -1, 0], n_rows, p=[0.5, 0.3, 0.2])
+    return pd.DataFrame({
+        'current_date': dates[rng.integers(0, n_days, n_rows)],
+        'long_return': np.where(side > 0, r, 0.0),
+        'short_return': np.where(side < 0, -r, 0.0)
+    })
+
+
+def loop_delta_neutral(df):
+    # 기존 calculate_delta_neutral_returns 의 날짜별 루프
+    daily_results = []
+    for date, group in df.groupby('current_date'):
+        long_positions = group[group['long_return'] != 0]
+        short_positions = group[group['short_return'] != 0]
+        n_long, n_short = len(long_positions), len(short_positions)
+        weighted_long_return = (long_positions['long_return'] * (0.5 / n_long)).sum() if n_long > 0 else 0
+        weighted_short_return = (short_positions['short_return'] * (0.5 / n_short)).sum() if n_short > 0 else 0
+        daily_results.append({
+            'current_date': date,
+            'long_return': weighted_long_return,
+            'short_return': weighted_short_return,
+            'long_short_return': weighted_long_return + weighted_short_return,
+            'n_long': n_long,
+            'n_short': n_short,
+            'n_total': n_long + n_short
+        })
+    return pd.DataFrame(daily_results).set_index('current_date')
+
+
+def loop_equal_weight(df):
+    # 기존 calculate_category_benchmark 의 날짜별 루프
+    daily = []
+    for date, group in df.groupby('current_date'):
+        avg_return = (group['long_return'] + group['short_return']) / 2
+        daily.append({'current_date': date, 'benchmark_return': avg_return.mean(),
+                      'n_stocks': len(avg_return)})
+    out = pd.DataFrame(daily).set_index('current_date')
+    out['cumulative_return'] = (1 + out['benchmark_return']).cumprod()
+    return out
+
+
+def compare(name, loop_fn, fast_fn, df):
+    start = time.perf_counter()
+    expected = loop_fn(df)
+    t_loop = time.perf_counter() - start
+    start = time.perf_counter()
+    result = fast_fn(df)
+    t_fast = time.perf_counter() - start
+
+    max_diff = np.abs(result[expected.columns].to_numpy(dtype=float) -
+                      expected.to_numpy(dtype=float)).max()
+    same_index = result.index.equals(pd.DatetimeIndex(expected.index))
+    print(f"{name}: 루프 {t_loop:.2f}s → bincount {t_fast:.3f}s "
+          f"({t_loop / t_fast:.0f}배), 최대 차이 {max_diff:.1e}, 날짜 일치 {same_index}")
+
+
+def make_synthetic_market(n_days=60, n_sec=40, n_news=400, missing=0.05, seed=0):
+    """
+    가격 결측 (시가 / 종가 NaN) 을 섞은 합성 가격 큐브 + 세션 태그 뉴스 (마지막 3 거래일은 뉴스 없음)
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2023-01-02', periods=n_days)
+    close = 100 * np.cumprod(1 + rng.normal(0, 0.02, (n_days, n_sec)), axis=0)
+    open_ = close * np.exp(rng.normal(0, 0.005, (n_days, n_sec)))
+    close[rng.random(close.shape) < missing] = np.nan
+    open_[rng.random(open_.shape) < missing] = np.nan
+    price_df = pd.DataFrame({'Date': np.repeat(dates, n_sec), 'security_id': np.tile(np.arange(n_sec), n_days),
+                             'Open': open_.ravel(), 'Close': close.ravel()})
+
+    tags = rng.integers(0, len(SESSION_RULES), n_news)
+    keys = list(SESSION_RULES)
+    news_df = pd.DataFrame({
+        '거래일': dates[rng.integers(0, n_days - 3, n_news)],
+        'security_id': rng.integers(0, n_sec, n_news),
+        'GPT_SCORE': rng.choice([1.0, -1.0], n_news),
+        'tag1': [keys[k][0] for k in tags],
+        'tag2': [keys[k][1] for k in tags]
+    })
+    return build_price_cube(price_df), news_df
+
+
+def full_delta_neutral(cube, news_df, exit_shift=0, cost_params=None):
+    """
+    전체 재계산: param_sweep 과 같은 포지션 해석 + daily_delta_neutral, 보유 종목 수는 단위 가중 gross
+    """
+    ret_cube = build_return_cube(cube)
+    arrays = prepare_news_arrays(news_df, cube)
+    res = resolve_entry_exit(arrays, cube, SESSION_RULES, exit_shift)
+    score = arrays['score']
+    valid = res['reason'] < 0
+    is_long, is_short = valid & (score > 0), valid & (score < 0)
+
+    costs = None
+    if cost_params is not None:
+        costs = position_costs(cube['dates'], np.where(valid, arrays['sec'], 0), np.sign(np.nan_to_num(score)),
+                               np.where(valid, res['entry_day'], 0), np.where(valid, res['exit_day'], 0),
+                               np.zeros(cube['prices'].shape[2], dtype=np.int64), cost_params)
+    long_return, short_return, long_net, short_net = daily_delta_neutral(
+        ret_cube, res, arrays['sec'], is_long, is_short, costs)
+
+    counts = {}
+    for col, mask in (('n_long', is_long), ('n_short', is_short)):
+        _, counts[col] = daily_portfolio_returns(
+            ret_cube, arrays['sec'][mask], res['entry_day'][mask], res['exit_day'][mask],
+            res['entry_field'][mask], res['exit_field'][mask], np.ones(mask.sum()))
+    return pd.DataFrame({'long_return': long_net, 'short_return': short_net,
+                         'long_short_return': long_net + short_net, **counts},
+                        index=cube['dates'].rename('current_date'))
+
+
+def incremental_delta_neutral(cube, news_df, exit_shift=0, cost_params=None):
+    """
+    증분 재계산: 거래일마다 그날 뉴스와 가격으로 append_day 호출
+    """
+    state = init_state(exit_shift=exit_shift, cost_params=cost_params)
+    news_day = cube['dates'].get_indexer(pd.to_datetime(news_df['거래일']))
+    by_day = news_df.groupby(news_day)
+    open_idx, close_idx = cube['fields'].index('Open'), cube['fields'].index('Close')
+    for d, date in enumerate(cube['dates']):
+        append_day(state, date, cube['prices'][open_idx, d], cube['prices'][close_idx, d],
+                   by_day.get_group(d) if d in by_day.groups else None)
+    return daily_frame(state)
+
+
+def compare_incremental(exit_shift=0, cost_params=None, **synthetic):
+    cube, news_df = make_synthetic_market(**synthetic)
+    expected = full_delta_neutral(cube, news_df, exit_shift, cost_params)
+    result = incremental_delta_neutral(cube, news_df, exit_shift, cost_params)
+    max_diff = np.abs(result[expected.columns].to_numpy(dtype=float) - expected.to_numpy(dtype=float)).max()
+    print(f"incremental (exit_shift={exit_shift}, 비용 {'차감' if cost_params else '없음'}): "
+          f"최대 차이 {max_diff:.1e}")
+    return max_diff
+
+
+# 메인 실행 코드
+if __name__ == "__main__":
+    df = make_synthetic()
+    print(f"📊 합성 데이터 {len(df):,}행, {N_DAYS}거래일")
+    compare('delta-neutral', loop_delta_neutral, delta_neutral_daily, df)
+    compare('equal-weight', loop_equal_weight, equal_weight_daily, df)
+    for cost_params in (None, COST_PARAMS):
+        compare_incremental(cost_params=cost_params)
@@ -0,0 +1,145 @@
+import os
+import json
+import hashlib
+import pandas as pd
+from daily_aggregates import category_cells, category_membership, equal_weight_by_category
+
+# 벤치마크 수익률 저장소: 동일가중(EqualWeight) / ETF / 지수 벤치마크를 입력 버전(출처 해시)당 한 번만 계산해 저장하고,
+# 같은 입력이면 저장된 결과를 그대로 읽어 각 분석 스크립트가 날짜 index 로 맞춰 쓴다.
+
+store_dir = '/Users/imdonghyeon/Desktop/Quantlab/final_수정/benchmark_store'
+
+# KRX 지수 코드 (pykrx)
+INDEX_TICKERS = {
+    'KOSPI': '1001',
+    'KOSDAQ': '2001'
+}
+
+
+def file_provenance(path, chunk_size=1 << 20):
+    """
+    입력 파일 출처: 경로 / 크기 / 내용 sha256
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return {'path': os.path.abspath(path), 'size': os.path.getsize(path), 'sha256': digest.hexdigest()}
+
+
+def frame_provenance(df, columns):
+    """
+    메모리 DataFrame 출처: 사용하는 컬럼 내용의 해시 (파일 경로가 없을 때)
+    """
+    hashed = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    return {'rows': len(df), 'columns': list(columns), 'sha256': hashlib.sha256(hashed.tobytes()).hexdigest()}
+
+
+def provenance_hash(provenance):
+    """
+    출처 dict → 짧은 해시 (키 순서 무관)
+    """
+    text = json.dumps(provenance, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def cached_benchmark(name, provenance, compute, path=store_dir):
+    """
+    이름 / 출처가 같은 저장 결과가 있으면 읽고, 없거나 출처가 바뀌었으면 compute() 후 저장
+    저장 형식: {name, hash, provenance, created, data} pickle
+    """
+    key = provenance_hash(provenance)
+    file_path = os.path.join(path, f'{name}.pkl')
+    if os.path.exists(file_path):
+        entry = pd.read_pickle(file_path)
+        if entry.get('hash') == key:
+            return entry['data']
+
+    data = compute()
+    os.makedirs(path, exist_ok=True)
+    pd.to_pickle({
+        'name': name,
+        'hash': key,
+        'provenance': provenance,
+        'created': pd.Timestamp.now(),
+        'data': data
+    }, file_path)
+    return data
+
+
+def stored_benchmarks(path=store_dir):
+    """
+    저장소 목록: (이름, 해시, 생성 시각, 출처) DataFrame
+    """
+    rows = []
+    if os.path.isdir(path):
+        for file_name in sorted(os.listdir(path)):
+            if file_name.endswith('.pkl'):
+                entry = pd.read_pickle(os.path.join(path, file_name))
+                rows.append({k: entry.get(k) for k in ['name', 'hash', 'created', 'provenance']})
+    return pd.DataFrame(rows, columns=['name', 'hash', 'created', 'provenance'])
+
+
+def equal_weight_benchmarks(df, category_col, groups=None, return_col='benchmark_return',
+                            source=None, date_col='current_date', path=store_dir):
+    """
+    카테고리별 동일가중 벤치마크 dict (전체 포함, equal_weight_by_category 와 같은 결과) 를 저장소에서
+    source: 뉴스 데이터 파일 경로 (있으면 파일 내용 해시, 없으면 사용 컬럼 내용 해시로 출처 식별)
+    """
+    columns = [date_col, category_col, 'long_return', 'short_return']
+    provenance = {
+        'input': file_provenance(source) if source is not None else frame_provenance(df, columns),
+        'category_col': category_col,
+        'groups': groups,
+        'return_col': return_col
+    }
+
+    def compute():
+        membership = category_membership(df, category_col, groups)
+        return equal_weight_by_category(df, category_cells(df, membership, date_col), return_col)
+
+    return cached_benchmark(f'equalweight_{category_col}_{return_col}', provenance, compute, path)
+
+
+def load_index_prices(start_date, end_date, tickers=INDEX_TICKERS, path=store_dir):
+    """
+    KRX 지수 종가 (거래일 × 지수) DataFrame, 기간 / 지수 코드가 같으면 저장소에서 (pykrx 호출 없음)
+    """
+    start = pd.to_datetime(start_date).strftime('%Y%m%d')
+    end = pd.to_datetime(end_date).strftime('%Y%m%d')
+
+    def compute():
+        from pykrx import stock
+        closes = {name: stock.get_index_ohlcv_by_date(start, end, ticker)['종가']
+                  for name, ticker in tickers.items()}
+        return pd.DataFrame(closes).sort_index().astype(float)
+
+    return cached_benchmark(f'index_{start}_{end}', {'tickers': tickers, 'start': start, 'end': end},
+                            compute, path)
+
+
+def align_to_dates(benchmark, dates, fill=None):
+    """
+    저장된 벤치마크 (Series / DataFrame, 날짜 index) 를 분석 날짜 index 에 맞춤
+    fill: None 이면 벤치마크에 없는 날짜는 NaN, 숫자면 그 값으로 채움 (수익률이면 0)
+    """
+    aligned = benchmark.reindex(pd.DatetimeIndex(dates))
+    return aligned if fill is None else aligned.fillna(fill)
+
+
+def price_returns(prices):
+    """
+    종가 (거래일 × 계열) → 일별 단순 수익률 (첫날 제외)
+    """
+    prices = prices.where(prices > 0)
+    return (prices / prices.shift(1) - 1).iloc[1:]
+
+
+# 메인 실행 코드
+if __name__ == "__main__":
+    listing = stored_benchmarks()
+    if len(listing):
+        print(f"📦 벤치마크 저장소 ({store_dir}):")
+        print(listing[['name', 'hash', 'created']].to_string(index=False))
+    else:
+        print(f"📦 벤치마크 저장소가 비어 있습니다: {store_dir}")
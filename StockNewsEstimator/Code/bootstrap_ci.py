@@ -0,0 +1,70 @@
+import numpy as np
+from metrics_kernel import matrix_metrics
+
+# 일별 수익률의 블록/정상(stationary) 부트스트랩 신뢰구간
+# (표본 × 거래일) 인덱스 행렬 하나로 모든 지표를 한 번에 계산하고,
+# 같은 인덱스를 전략/벤치마크에 함께 적용해 초과수익률 같은 결합 지표도 구한다.
+
+N_BOOTSTRAP = 1000
+BLOCK_SIZE = 10       # 평균 블록 길이 (거래일)
+CI_ALPHA = 0.05       # 95% 신뢰구간
+
+
+def bootstrap_indices(n_days, n_resamples=N_BOOTSTRAP, block_size=BLOCK_SIZE,
+                      method='stationary', seed=0):
+    """
+    (표본 × 거래일) 재표집 인덱스 행렬
+    stationary: 매 거래일 1/block_size 확률로 새 블록 시작 (Politis-Romano)
+    block: 길이 block_size 고정 블록 (원형 이동 블록)
+    """
+    rng = np.random.default_rng(seed)
+    pos = np.arange(n_days)
+    if method == 'stationary':
+        new_block = rng.random((n_resamples, n_days)) < 1.0 / block_size
+        new_block[:, 0] = True
+    elif method == 'block':
+        new_block = np.broadcast_to(pos % block_size == 0, (n_resamples, n_days))
+    else:
+        raise ValueError(f"method 는 'stationary' 또는 'block': {method}")
+
+    starts = rng.integers(0, n_days, (n_resamples, n_days))
+    # 각 위치가 속한 블록의 시작 위치
+    block_start = np.maximum.accumulate(np.where(new_block, pos, 0), axis=1)
+    first = np.take_along_axis(starts, block_start, axis=1)
+    return (first + pos - block_start) % n_days
+
+
+def bootstrap_metric_draws(series, annual_days=252, n_resamples=N_BOOTSTRAP,
+                           block_size=BLOCK_SIZE, method='stationary', seed=0):
+    """
+    같은 거래일 축의 수익률 시계열 dict → 시계열별 {지표: (표본,) 배열}
+    모든 시계열에 같은 재표집 인덱스를 사용
+    """
+    series = {k: np.asarray(v, dtype=float) for k, v in series.items()}
+    n_days = len(next(iter(series.values())))
+    idx = bootstrap_indices(n_days, n_resamples, block_size, method, seed)
+    return {k: matrix_metrics(v[idx], annual_days) for k, v in series.items()}
+
+
+def percentile_ci(draws, alpha=CI_ALPHA):
+    """
+    부트스트랩 표본 → (하한, 상한) 백분위수 신뢰구간
+    """
+    draws = np.asarray(draws, dtype=float)
+    return (np.nanpercentile(draws, 100 * alpha / 2),
+            np.nanpercentile(draws, 100 * (1 - alpha / 2)))
+
+
+def add_ci_columns(row, column_map, alpha=CI_ALPHA):
+    """
+    표의 한 행(dict)에 '<컬럼> CI 하한/상한' 을 해당 컬럼 바로 뒤에 추가
+    column_map: 표 컬럼명 → 부트스트랩 표본 배열
+    """
+    out = {}
+    for col, value in row.items():
+        out[col] = value
+        if col in column_map:
+            lower, upper = percentile_ci(column_map[col], alpha)
+            out[f'{col} CI 하한'] = lower
+            out[f'{col} CI 상한'] = upper
+    return out
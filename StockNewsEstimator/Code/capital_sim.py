@@ -0,0 +1,247 @@
+import os
+import glob
+import numpy as np
+import pandas as pd
+from position_engine import (SESSION_RULES, holding_log_returns, net_news_arrays, prepare_news_arrays,
+                             resolve_entry_exit)
+from cost_model import COST_PARAMS, market_codes, position_costs
+from metrics_kernel import compute_metrics
+
+# 자본 회계 시뮬레이터: 현금, 롱/숏 보유 수량, 공매도 담보를 거래일마다 (시가 → 종가 순서로) 갱신하고
+# 종가 기준 종목별 평가로 NAV 를 계산한다. 신규 진입 금액은 전일 NAV 의 비율이며,
+# 여유 현금 (현금 - 숏 담보) 이 부족하면 그날 진입을 비례 축소한다.
+# 거래일 순서로만 진행하고 (자본 복리는 순차적), 하루 안의 진입/청산/평가는 모두 종목·포지션 배열 연산이다.
+
+# 기본 자본 파라미터
+CAPITAL_PARAMS = {
+    'initial_capital': 1e9,     # 초기 자본 (원)
+    'long_budget': 0.5,         # 하루 신규 롱 진입 총액 / 전일 NAV (롱 종목 수로 균등 배분)
+    'short_budget': 0.5,        # 하루 신규 숏 진입 총액 / 전일 NAV
+    'collateral_ratio': 1.4,    # 숏 담보 요구액 / 숏 평가금액 (매도대금 포함)
+}
+
+CAPITAL_COLUMNS = ['nav', 'cash', 'long_value', 'short_value', 'collateral', 'free_cash', 'shortfall',
+                   'gross_exposure', 'net_exposure', 'n_long', 'n_short', 'entry_scale', 'costs', 'return']
+
+
+def prepare_positions(news_df, cube, ret_cube, rules=SESSION_RULES, exit_shift=0, netting=None,
+                      cost_params=None, market=None, date_col='거래일', score_col='GPT_SCORE'):
+    """
+    뉴스 → 포지션 배열 (position_engine.calculate_positions 와 같은 유효 포지션)
+    반환: {sec, sign, entry_day, exit_day, entry_field, exit_field, entry_cost, exit_cost}
+    """
+    arrays = prepare_news_arrays(news_df, cube, date_col, score_col)
+    if netting is not None:
+        arrays = net_news_arrays(arrays, rules, netting)
+    res = resolve_entry_exit(arrays, cube, rules, exit_shift)
+    keep = res['reason'] < 0
+
+    sec = np.where(keep, arrays['sec'], 0)
+    log_ret = holding_log_returns(ret_cube, sec, np.where(keep, res['entry_day'], 0),
+                                  np.where(keep, res['exit_day'], 0), res['entry_field'], res['exit_field'])
+    keep &= ~np.isnan(log_ret)
+
+    positions = {
+        'sec': arrays['sec'][keep],
+        'sign': np.sign(arrays['score'][keep]),
+        'entry_day': res['entry_day'][keep],
+        'exit_day': res['exit_day'][keep],
+        'entry_field': res['entry_field'][keep],
+        'exit_field': res['exit_field'][keep]
+    }
+    if cost_params is not None:
+        if market is None:
+            market = np.zeros(cube['prices'].shape[2], dtype=np.int64)
+        positions['entry_cost'], positions['exit_cost'] = position_costs(
+            cube['dates'], positions['sec'], positions['sign'], positions['entry_day'],
+            positions['exit_day'], market, cost_params)
+    else:
+        positions['entry_cost'] = positions['exit_cost'] = np.zeros(keep.sum())
+    return positions
+
+
+def adjusted_prices(ret_cube):
+    """
+    누적 로그가격 → (필드 × 거래일 × 종목) 수정가격 지수, 평가용 종가는 마지막 유효 종가 유지
+    반환: (체결 가격, 평가 종가) — 체결 가격은 결측이면 NaN
+    """
+    prices = np.exp(ret_cube['log_price'])
+    close = prices[ret_cube['fields'].index('Close')]
+    return prices, pd.DataFrame(close).ffill().fillna(0).to_numpy()
+
+
+def _event_slices(day, field_order, n_days):
+    # (거래일, 시가=0 / 종가=1) 이벤트 순서로 정렬한 포지션 위치와 이벤트별 경계
+    event = day * 2 + field_order
+    order = np.argsort(event, kind='stable')
+    return order, np.searchsorted(event[order], np.arange(2 * n_days + 1))
+
+
+def simulate_capital(positions, ret_cube, dates, params=CAPITAL_PARAMS):
+    """
+    포지션 배열 (prepare_positions) → 거래일별 자본 계정 DataFrame (CAPITAL_COLUMNS)
+    이벤트 순서: 거래일마다 시가 청산 → 시가 진입 → 종가 청산 → 종가 진입 → 종가 평가
+    롱: 매수대금 + 진입 비용을 현금에서 지급, 청산 시 매도대금 - 비용 입금
+    숏: 매도대금 - 진입 비용 (대차비용 포함) 입금, 청산 시 매수대금 + 비용 지급
+    담보: collateral_ratio × 숏 평가금액 (매도대금 포함), 여유 현금 = 현금 - 담보
+    신규 진입 금액: 전일 NAV × budget / 그날 같은 방향 진입 수, 여유 현금이 부족하면 그날 이벤트 진입 전체를 같은 비율로 축소
+    shortfall: 종가 기준 여유 현금 부족액 (마진콜 상당, 강제 청산은 하지 않음)
+    """
+    prices, close = adjusted_prices(ret_cube)
+    n_days, n_sec = close.shape
+    sec, sign = positions['sec'], positions['sign']
+    is_long = sign > 0
+    open_idx, close_idx = ret_cube['fields'].index('Open'), ret_cube['fields'].index('Close')
+    entry_order = (positions['entry_field'] == close_idx).astype(np.int64)
+    exit_order = (positions['exit_field'] == close_idx).astype(np.int64)
+    entry_pos, entry_bounds = _event_slices(positions['entry_day'], entry_order, n_days)
+    exit_pos, exit_bounds = _event_slices(positions['exit_day'], exit_order, n_days)
+
+    # 거래일별 같은 방향 신규 진입 수 (진입 금액 균등 배분)
+    n_new_long = np.bincount(positions['entry_day'][is_long], minlength=n_days)
+    n_new_short = np.bincount(positions['entry_day'][~is_long], minlength=n_days)
+
+    shares = np.zeros(len(sec))
+    long_shares = np.zeros(n_sec)
+    short_shares = np.zeros(n_sec)
+    cash = float(params['initial_capital'])
+    nav = cash
+    ratio = params['collateral_ratio']
+    out = {c: np.zeros(n_days) for c in CAPITAL_COLUMNS}
+
+    for d in range(n_days):
+        prev_nav = nav
+        day_costs = 0.0
+        day_scale = 1.0
+        for order, field in ((0, open_idx), (1, close_idx)):
+            k = 2 * d + order
+            px = prices[field, d]
+            mark = np.where(np.isnan(px), close[d - 1] if d > 0 else 0.0, px)
+
+            # 청산: 롱 매도 / 숏 환매
+            idx = exit_pos[exit_bounds[k]:exit_bounds[k + 1]]
+            if len(idx):
+                value = shares[idx] * px[sec[idx]]
+                cost = value * positions['exit_cost'][idx]
+                cash += np.sum(np.where(is_long[idx], value, -value)) - cost.sum()
+                day_costs += cost.sum()
+                np.subtract.at(long_shares, sec[idx], np.where(is_long[idx], shares[idx], 0.0))
+                np.subtract.at(short_shares, sec[idx], np.where(is_long[idx], 0.0, shares[idx]))
+                shares[idx] = 0.0
+
+            # 진입: 전일 NAV 기준 금액, 여유 현금 한도 안에서 비례 축소
+            idx = entry_pos[entry_bounds[k]:entry_bounds[k + 1]]
+            if len(idx):
+                long_idx = is_long[idx]
+                budget = np.where(long_idx, params['long_budget'] / max(n_new_long[d], 1),
+                                  params['short_budget'] / max(n_new_short[d], 1)) * max(prev_nav, 0.0)
+                cost_rate = positions['entry_cost'][idx]
+                need = np.sum(np.where(long_idx, budget * (1 + cost_rate), budget * (ratio - 1 + cost_rate)))
+                free = cash - ratio * (short_shares @ mark)
+                scale = min(1.0, max(free, 0.0) / need) if need > 0 else 1.0
+                day_scale = min(day_scale, scale)
+
+                notional = budget * scale
+                cost = notional * cost_rate
+                cash += np.sum(np.where(long_idx, -notional, notional)) - cost.sum()
+                day_costs += cost.sum()
+                shares[idx] = notional / px[sec[idx]]
+                np.add.at(long_shares, sec[idx], np.where(long_idx, shares[idx], 0.0))
+                np.add.at(short_shares, sec[idx], np.where(long_idx, 0.0, shares[idx]))
+
+        # 종가 평가
+        long_value = long_shares @ close[d]
+        short_value = short_shares @ close[d]
+        nav = cash + long_value - short_value
+        collateral = ratio * short_value
+        out['nav'][d] = nav
+        out['cash'][d] = cash
+        out['long_value'][d] = long_value
+        out['short_value'][d] = short_value
+        out['collateral'][d] = collateral
+        out['free_cash'][d] = cash - collateral
+        out['shortfall'][d] = max(collateral - cash, 0.0)
+        out['n_long'][d] = np.count_nonzero(long_shares > 1e-12)
+        out['n_short'][d] = np.count_nonzero(short_shares > 1e-12)
+        out['entry_scale'][d] = day_scale
+        out['costs'][d] = day_costs
+        out['return'][d] = nav / prev_nav - 1 if prev_nav > 0 else 0.0
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out['gross_exposure'] = np.where(out['nav'] > 0, (out['long_value'] + out['short_value']) / out['nav'],
+                                         np.nan)
+        out['net_exposure'] = np.where(out['nav'] > 0, (out['long_value'] - out['short_value']) / out['nav'],
+                                       np.nan)
+
+    frame = pd.DataFrame(out, index=pd.DatetimeIndex(dates, name='current_date'))
+    frame = frame.astype({'n_long': np.int64, 'n_short': np.int64})
+    if len(positions['entry_day']):
+        # 첫 진입일 ~ 마지막 청산일
+        frame = frame.iloc[positions['entry_day'].min():positions['exit_day'].max() + 1]
+    return frame
+
+
+def exposure_stats(daily, initial_capital=None):
+    """
+    자본 계정 → 요약 Series (NAV 수익률 지표 + 노출 / 현금 / 담보 통계)
+    """
+    initial_capital = CAPITAL_PARAMS['initial_capital'] if initial_capital is None else initial_capital
+    metrics = compute_metrics(daily['return'].rename('nav')).loc['nav']
+    return pd.Series({
+        'final_nav': daily['nav'].iloc[-1],
+        'total_return': daily['nav'].iloc[-1] / initial_capital - 1,
+        'annual_return': metrics['annual_return'],
+        'annual_vol': metrics['annual_vol'],
+        'sharpe_ratio': metrics['sharpe_ratio'],
+        'max_drawdown': metrics['max_drawdown'],
+        'mean_gross_exposure': daily['gross_exposure'].mean(),
+        'max_gross_exposure': daily['gross_exposure'].max(),
+        'mean_net_exposure': daily['net_exposure'].mean(),
+        'mean_free_cash_ratio': (daily['free_cash'] / daily['nav']).mean(),
+        'total_costs': daily['costs'].sum(),
+        'scaled_entry_days': int((daily['entry_scale'] < 1).sum()),
+        'shortfall_days': int((daily['shortfall'] > 0).sum()),
+        'max_shortfall_ratio': (daily['shortfall'] / daily['nav']).max()
+    })
+
+
+def capital_sweep(positions, ret_cube, dates, grid, base=CAPITAL_PARAMS):
+    """
+    자본 파라미터 목록 (base 에 덮어쓸 dict) → (설정 × exposure_stats) DataFrame
+    """
+    rows = []
+    for overrides in grid:
+        params = {**base, **overrides}
+        stats = exposure_stats(simulate_capital(positions, ret_cube, dates, params), params['initial_capital'])
+        rows.append({**overrides, **stats})
+    return pd.DataFrame(rows)
+
+
+# 메인 실행 코드
+if __name__ == "__main__":
+    from simu import (load_news, load_price_data, news_folder, output_folder, stock_path, APPLY_COSTS,
+                      EXIT_SHIFT, NETTING)
+    from position_engine import build_price_cube, build_return_cube
+
+    price_df, master = load_price_data(stock_path)
+    price_cube = build_price_cube(price_df)
+    ret_cube = build_return_cube(price_cube)
+    news_df = pd.concat([load_news(path, master) for path in sorted(glob.glob(os.path.join(news_folder, '*.xlsx')))],
+                        ignore_index=True)
+
+    positions = prepare_positions(news_df, price_cube, ret_cube, exit_shift=EXIT_SHIFT, netting=NETTING,
+                                  cost_params=COST_PARAMS if APPLY_COSTS else None,
+                                  market=market_codes(master, price_cube['prices'].shape[2]))
+    daily = simulate_capital(positions, ret_cube, price_cube['dates'])
+    print(f"💰 자본 시뮬레이션: 포지션 {len(positions['sec'])}건, {len(daily)} 거래일")
+    print(exposure_stats(daily).round(4).to_string())
+
+    sweep_df = capital_sweep(positions, ret_cube, price_cube['dates'],
+                             [{'long_budget': b, 'short_budget': b, 'collateral_ratio': r}
+                              for b in (0.25, 0.5, 1.0) for r in (1.05, 1.4)])
+    print("\n📊 진입 비율 × 담보 비율:")
+    print(sweep_df.round(4).to_string(index=False))
+
+    os.makedirs(output_folder, exist_ok=True)
+    daily.to_csv(os.path.join(output_folder, 'capital_daily.csv'), encoding='utf-8-sig')
+    sweep_df.to_csv(os.path.join(output_folder, 'capital_sweep.csv'), encoding='utf-8-sig', index=False)
@@ -0,0 +1,133 @@
+import pandas as pd
+import numpy as np
+
+# 거래비용 모델 (수수료, 호가 스프레드, 증권거래세, 공매도 대차비용, 규모 의존 슬리피지)
+# 모든 비용은 포지션 명목금액 대비 비율이며 포지션 배열 단위로 한 번에 계산한다.
+
+MARKETS = ['KOSPI', 'KOSDAQ', 'KONEX']
+
+# 매도 시 증권거래세 (농어촌특별세 포함, bps) — (적용 시작일, 세율)
+SELL_TAX_SCHEDULE_BPS = {
+    'KOSPI': [('2021-01-01', 23.0), ('2023-01-01', 20.0), ('2024-01-01', 18.0), ('2025-01-01', 15.0)],
+    'KOSDAQ': [('2021-01-01', 23.0), ('2023-01-01', 20.0), ('2024-01-01', 18.0), ('2025-01-01', 15.0)],
+    'KONEX': [('2021-01-01', 10.0)],
+}
+
+COST_PARAMS = {
+    'commission_bps': 1.5,        # 편도 수수료
+    'half_spread_bps': 5.0,       # 편도 호가 스프레드 (절반)
+    'borrow_bps_annual': 300.0,   # 공매도 대차비용 (연율, 달력일 기준)
+    'impact_coef_bps': 0.0,       # 슬리피지 = 계수 × sqrt(거래금액 / 평균거래대금), 0 이면 미적용
+    'tax_schedule': SELL_TAX_SCHEDULE_BPS,
+}
+
+NO_COSTS = {
+    'commission_bps': 0.0,
+    'half_spread_bps': 0.0,
+    'borrow_bps_annual': 0.0,
+    'impact_coef_bps': 0.0,
+    'tax_schedule': {m: [('1900-01-01', 0.0)] for m in MARKETS},
+}
+
+
+def market_codes(master, n_sec=None):
+    """
+    security_id → 시장 코드 배열 (MARKETS 순서, 정보가 없으면 KOSPI)
+    """
+    n_sec = len(master) if n_sec is None else n_sec
+    codes = np.zeros(n_sec, dtype=np.int64)
+    if 'market' in master.columns:
+        m = master['market'].map({k: i for i, k in enumerate(MARKETS)})\
+            .fillna(0).to_numpy(dtype=np.int64)
+        ids = master['security_id'].to_numpy(dtype=np.int64)
+        inside = ids < n_sec
+        codes[ids[inside]] = m[inside]
+    return codes
+
+
+def sell_tax_by_day(dates, tax_schedule=SELL_TAX_SCHEDULE_BPS):
+    """
+    (시장 × 거래일) 매도세율 행렬 (비율)
+    """
+    dates = pd.DatetimeIndex(dates).to_numpy()
+    table = np.zeros((len(MARKETS), len(dates)))
+    for k, market in enumerate(MARKETS):
+        schedule = sorted(tax_schedule.get(market, []))
+        if not schedule:
+            continue
+        starts = pd.to_datetime([d for d, _ in schedule]).to_numpy()
+        rates = np.array([r for _, r in schedule]) / 1e4
+        pos = np.searchsorted(starts, dates, side='right') - 1
+        table[k] = np.where(pos >= 0, rates[np.clip(pos, 0, None)], 0.0)
+    return table
+
+
+def position_costs(dates, sec, side, entry_day, exit_day, market, params=COST_PARAMS,
+                   notional=None, adv=None):
+    """
+    포지션별 진입/청산 비용 (명목금액 대비 비율)
+    side: +1 롱 / -1 숏, market: security_id 별 시장 코드 배열
+    notional, adv(거래일 × 종목 평균거래대금): 슬리피지 계산용 (선택)
+    반환: (진입 비용, 청산 비용) — 대차비용은 진입 비용에 포함
+    """
+    dates = pd.DatetimeIndex(dates)
+    per_side = (params['commission_bps'] + params['half_spread_bps']) / 1e4
+    entry_cost = np.full(len(sec), per_side)
+    exit_cost = np.full(len(sec), per_side)
+
+    # 매도세: 롱은 청산 시, 숏은 진입(공매도) 시
+    tax = sell_tax_by_day(dates, params['tax_schedule'])
+    mkt = market[sec]
+    is_short = side < 0
+    entry_cost += np.where(is_short, tax[mkt, entry_day], 0.0)
+    exit_cost += np.where(~is_short, tax[mkt, exit_day], 0.0)
+
+    # 대차비용: 달력일 기준 (당일 청산도 최소 1일)
+    if params['borrow_bps_annual']:
+        held = (dates.to_numpy()[exit_day] - dates.to_numpy()[entry_day]) \
+            / np.timedelta64(1, 'D')
+        entry_cost += np.where(is_short, params['borrow_bps_annual'] / 1e4
+                               * np.maximum(held, 1) / 365, 0.0)
+
+    # 규모 의존 슬리피지 (거래대금 대비 참여율의 제곱근)
+    if params['impact_coef_bps'] and notional is not None and adv is not None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            entry_part = np.nan_to_num(notional / adv[entry_day, sec])
+            exit_part = np.nan_to_num(notional / adv[exit_day, sec])
+        entry_cost += params['impact_coef_bps'] / 1e4 * np.sqrt(entry_part)
+        exit_cost += params['impact_coef_bps'] / 1e4 * np.sqrt(exit_part)
+
+    return entry_cost, exit_cost
+
+
+def apply_row_costs(df, params=COST_PARAMS, date_col='current_date', market_col=None):
+    """
+    행 단위 1일 롱/숏 수익률(long_return, short_return)에서 왕복 비용 차감
+    (marketbench-delta.py 의 news_with_sector.csv 형식, 수익률이 0 인 행은 포지션 없음)
+    """
+    df = df.copy()
+    dates = pd.to_datetime(df[date_col])
+    market = df[market_col].map({k: i for i, k in enumerate(MARKETS)}).fillna(0)\
+        .to_numpy(dtype=np.int64) if market_col else np.zeros(len(df), dtype=np.int64)
+
+    tax = sell_tax_by_day(dates, params['tax_schedule'])[
+        market, np.arange(len(df))]
+    round_trip = 2 * (params['commission_bps'] +
+                      params['half_spread_bps']) / 1e4 + tax
+    borrow = params['borrow_bps_annual'] / 1e4 / 365
+
+    has_long = df['long_return'].to_numpy() != 0
+    has_short = df['short_return'].to_numpy() != 0
+    df['long_return'] = df['long_return'] - np.where(has_long, round_trip, 0.0)
+    df['short_return'] = df['short_return'] - \
+        np.where(has_short, round_trip + borrow, 0.0)
+    return df
+
+
+def daily_costs(exit_day, weight, entry_cost, exit_cost, n_days):
+    """
+    거래일별 비용 합 (포지션의 진입/청산 비용을 청산일에 일괄 차감, 가중치 절대값 기준)
+    daily_portfolio_returns 의 pnl 과 같은 단위 → 순수익률 = (pnl - cost) / gross
+    """
+    return np.bincount(exit_day, weights=np.abs(weight) * (entry_cost + exit_cost),
+                       minlength=n_days)
@@ -0,0 +1,377 @@
+import numpy as np
+import pandas as pd
+
+# news_with_sector/style 형식 (current_date, long_return, short_return) 의 일별 집계
+# 날짜를 정수 코드로 바꾼 뒤 bincount 한 번으로 롱/숏 종목 수, 0.5/n 가중 수익률, 동일가중 평균을 계산한다.
+# 카테고리별 집계는 (카테고리 × 거래일) 셀 코드로 펼쳐 모든 카테고리를 한 번에 계산한다 (카테고리별 필터/복사 없음).
+
+
+def date_codes(df, date_col='current_date'):
+    """
+    날짜 컬럼 → (정수 코드 배열, 정렬된 DatetimeIndex), 날짜가 없는 행은 -1
+    """
+    codes, dates = pd.factorize(pd.to_datetime(df[date_col]), sort=True)
+    return codes, pd.DatetimeIndex(dates, name=date_col)
+
+
+def delta_neutral_daily(df, date_col='current_date'):
+    """
+    일별 델타-뉴트럴 수익률: 롱(long_return != 0) / 숏(short_return != 0) 각각 0.5 / n 가중
+    반환 컬럼: long_return, short_return, long_short_return, n_long, n_short, n_total
+    """
+    codes, dates = date_codes(df, date_col)
+    ok = codes >= 0
+    codes = codes[ok]
+    n_days = len(dates)
+    long_ret = df['long_return'].to_numpy(dtype=float)[ok]
+    short_ret = df['short_return'].to_numpy(dtype=float)[ok]
+
+    # 포지션이 없는 행은 수익률이 0 이므로 날짜별 합에 영향 없음
+    n_long = np.bincount(codes[long_ret != 0], minlength=n_days)
+    n_short = np.bincount(codes[short_ret != 0], minlength=n_days)
+    weighted_long = np.bincount(codes, weights=long_ret, minlength=n_days) \
+        * np.where(n_long > 0, 0.5 / np.maximum(n_long, 1), 0.0)
+    weighted_short = np.bincount(codes, weights=short_ret, minlength=n_days) \
+        * np.where(n_short > 0, 0.5 / np.maximum(n_short, 1), 0.0)
+
+    return pd.DataFrame({
+        'long_return': weighted_long,
+        'short_return': weighted_short,
+        'long_short_return': weighted_long + weighted_short,
+        'n_long': n_long,
+        'n_short': n_short,
+        'n_total': n_long + n_short
+    }, index=dates)
+
+
+def equal_weight_daily(df, return_col='benchmark_return', date_col='current_date'):
+    """
+    일별 동일가중 평균: 종목별 (long_return + short_return) / 2 의 날짜별 평균 (포지션 유무 무관)
+    반환 컬럼: return_col, n_stocks, cumulative_return
+    """
+    codes, dates = date_codes(df, date_col)
+    ok = codes >= 0
+    codes = codes[ok]
+    n_days = len(dates)
+    avg_return = ((df['long_return'].to_numpy(dtype=float) +
+                   df['short_return'].to_numpy(dtype=float)) / 2)[ok]
+
+    has = ~np.isnan(avg_return)
+    total = np.bincount(codes, weights=np.where(has, avg_return, 0.0), minlength=n_days)
+    count = np.bincount(codes, weights=has, minlength=n_days)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+
+    out = pd.DataFrame({
+        return_col: mean,
+        'n_stocks': np.bincount(codes, minlength=n_days).astype(np.int64)
+    }, index=dates)
+    out['cumulative_return'] = (1 + out[return_col]).cumprod()
+    return out
+
+
+def category_membership(df, category_col, groups=None, total_label='전체'):
+    """
+    (행 × 카테고리) 소속 행렬 (bool DataFrame), 한 행이 여러 카테고리에 속할 수 있음
+    groups: 카테고리명 → 포함할 category_col 값 목록 (예: 성장주 → [성장주, 성장주+가치주])
+            None 이면 category_col 의 값마다 하나 (등장 순서, 결측 제외)
+    total_label: 모든 행이 속하는 전체 카테고리 이름 (None 이면 생략)
+    """
+    values = df[category_col]
+    if groups is None:
+        groups = {v: [v] for v in values.dropna().unique()}
+
+    columns = {total_label: np.ones(len(df), dtype=bool)} if total_label is not None else {}
+    for name, members in groups.items():
+        columns[name] = values.isin(members).to_numpy()
+    return pd.DataFrame(columns, index=df.index)
+
+
+def category_cells(df, membership, date_col='current_date'):
+    """
+    소속 행렬 → (카테고리 × 거래일) 셀 인덱스, 카테고리별 집계를 bincount 한 번으로 하기 위한 상태
+    행 하나가 k 개 카테고리에 속하면 (행, 카테고리) 쌍 k 개로 펼친다 (데이터 복사 없음)
+    """
+    codes, dates = date_codes(df, date_col)
+    rows, cats = np.nonzero(membership.to_numpy(dtype=bool) & (codes >= 0)[:, None])
+    n_days = len(dates)
+    n_cat = membership.shape[1]
+    cell = cats * n_days + codes[rows]
+    return {
+        'rows': rows,
+        'cell': cell,
+        'dates': dates,
+        'categories': list(membership.columns),
+        'n_rows': np.bincount(cell, minlength=n_cat * n_days).reshape(n_cat, n_days)
+    }
+
+
+def _cell_sum(cells, weights):
+    # (카테고리 × 거래일) 셀별 합
+    n_cat, n_days = cells['n_rows'].shape
+    return np.bincount(cells['cell'], weights=weights[cells['rows']],
+                       minlength=n_cat * n_days).reshape(n_cat, n_days)
+
+
+def _split_categories(cells, frame_of):
+    # 카테고리별로 행이 있는 거래일만 잘라 DataFrame dict (행이 없는 카테고리는 제외)
+    out = {}
+    for k, category in enumerate(cells['categories']):
+        present = cells['n_rows'][k] > 0
+        if present.any():
+            out[category] = frame_of(k, present)
+    return out
+
+
+def delta_neutral_by_category(df, cells):
+    """
+    카테고리별 delta_neutral_daily 를 한 번에: 카테고리 → 일별 DataFrame (컬럼 동일)
+    """
+    long_ret = df['long_return'].to_numpy(dtype=float)
+    short_ret = df['short_return'].to_numpy(dtype=float)
+    n_long = _cell_sum(cells, (long_ret != 0).astype(float)).astype(np.int64)
+    n_short = _cell_sum(cells, (short_ret != 0).astype(float)).astype(np.int64)
+    weighted_long = _cell_sum(cells, long_ret) * np.where(n_long > 0, 0.5 / np.maximum(n_long, 1), 0.0)
+    weighted_short = _cell_sum(cells, short_ret) * np.where(n_short > 0, 0.5 / np.maximum(n_short, 1), 0.0)
+
+    return _split_categories(cells, lambda k, present: pd.DataFrame({
+        'long_return': weighted_long[k, present],
+        'short_return': weighted_short[k, present],
+        'long_short_return': weighted_long[k, present] + weighted_short[k, present],
+        'n_long': n_long[k, present],
+        'n_short': n_short[k, present],
+        'n_total': n_long[k, present] + n_short[k, present]
+    }, index=cells['dates'][present]))
+
+
+def equal_weight_by_category(df, cells, return_col='benchmark_return'):
+    """
+    카테고리별 equal_weight_daily 를 한 번에: 카테고리 → 일별 DataFrame (컬럼 동일)
+    """
+    avg_return = (df['long_return'].to_numpy(dtype=float) +
+                  df['short_return'].to_numpy(dtype=float)) / 2
+    has = ~np.isnan(avg_return)
+    total = _cell_sum(cells, np.where(has, avg_return, 0.0))
+    count = _cell_sum(cells, has.astype(float))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+
+    def frame_of(k, present):
+        out = pd.DataFrame({
+            return_col: mean[k, present],
+            'n_stocks': cells['n_rows'][k, present]
+        }, index=cells['dates'][present])
+        out['cumulative_return'] = (1 + out[return_col]).cumprod()
+        return out
+
+    return _split_categories(cells, frame_of)
+
+
+def hedge_by_category(df, cells, row_beta, row_index_return, positions=None):
+    """
+    카테고리별 지수 헤지: 롱/숏 각 0.5 / n 가중 북의 순베타와 헤지 수익률 (-순베타 × 지수 수익률, 종목별 지수)
+    row_beta / row_index_return: df 행 순서의 종목 베타, 해당 종목 시장 지수 수익률
+    positions: (행, 카테고리) 쌍별 부호 비중 (예: neutral_positions), 있으면 0.5 / n 대신 사용
+    반환: 카테고리 → [net_beta, hedge_return] 일별 DataFrame (delta_neutral_by_category 와 같은 거래일)
+    """
+    if positions is not None:
+        shape = cells['n_rows'].shape
+        beta = row_beta[cells['rows']]
+        net_beta = np.bincount(cells['cell'], weights=positions * beta,
+                               minlength=cells['n_rows'].size).reshape(shape)
+        hedge = -np.bincount(cells['cell'], weights=positions * beta * row_index_return[cells['rows']],
+                             minlength=cells['n_rows'].size).reshape(shape)
+    else:
+        is_long = df['long_return'].to_numpy(dtype=float) != 0
+        is_short = df['short_return'].to_numpy(dtype=float) != 0
+        n_long = _cell_sum(cells, is_long.astype(float))
+        n_short = _cell_sum(cells, is_short.astype(float))
+        w_long = np.where(n_long > 0, 0.5 / np.maximum(n_long, 1), 0.0)
+        w_short = np.where(n_short > 0, 0.5 / np.maximum(n_short, 1), 0.0)
+
+        exposure = row_beta * row_index_return
+        net_beta = _cell_sum(cells, np.where(is_long, row_beta, 0.0)) * w_long \
+            - _cell_sum(cells, np.where(is_short, row_beta, 0.0)) * w_short
+        hedge = -(_cell_sum(cells, np.where(is_long, exposure, 0.0)) * w_long
+                  - _cell_sum(cells, np.where(is_short, exposure, 0.0)) * w_short)
+
+    return _split_categories(cells, lambda k, present: pd.DataFrame({
+        'net_beta': net_beta[k, present],
+        'hedge_return': hedge[k, present]
+    }, index=cells['dates'][present]))
+
+
+def name_codes(df, id_col='security_id', name_cols=('ticker', 'company')):
+    """
+    행별 종목 코드 (name_cap 을 종목 단위로 적용): security_id, 없으면 ticker / company 컬럼 순으로 factorize
+    종목을 모르는 행은 행마다 다른 코드
+    """
+    if id_col in df.columns:
+        codes = pd.to_numeric(df[id_col], errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    else:
+        col = next((c for c in name_cols if c in df.columns), None)
+        codes = pd.factorize(df[col])[0].astype(np.int64) if col is not None else np.full(len(df), -1)
+    unknown = codes < 0
+    return np.where(unknown, codes.max(initial=-1) + 1 + np.arange(len(df)), codes)
+
+
+def _side_fractions(cells, on_side, weights, name_cap=None, names=None, max_iter=50):
+    """
+    (행, 카테고리) 쌍별 한쪽 북 안 비중 (셀마다 합 1)
+    가중치가 NaN / 0 이하인 행은 같은 셀 유효 가중치 평균 (유효 가중치가 없는 셀은 동일가중)
+    name_cap: 종목당 최대 비중 (셀 종목 수 n 에 대해 1/n 미만이면 1/n), 초과분은 나머지에 비례 재분배 (water-filling)
+    names: 행별 종목 코드 (name_codes), 같은 셀의 같은 종목 행 (여러 헤드라인) 은 가중치를 합산해 cap 을 적용한 뒤
+    종목 비중을 행 가중치 비율로 다시 배분 (없으면 행마다 다른 종목)
+    """
+    rows, cell = cells['rows'], cells['cell']
+    size = cells['n_rows'].size
+    on = on_side[rows]
+    w = weights[rows]
+
+    valid = on & np.isfinite(w) & (w > 0)
+    valid_sum = np.bincount(cell, weights=np.where(valid, w, 0.0), minlength=size)
+    valid_count = np.bincount(cell, weights=valid, minlength=size)
+    fill = np.where(valid_count > 0, valid_sum / np.maximum(valid_count, 1), 1.0)
+    w = np.where(on, np.where(valid, w, fill[cell]), 0.0)
+
+    total = np.bincount(cell, weights=w, minlength=size)
+    frac = np.where(on, w / np.maximum(total[cell], 1e-300), 0.0)
+    if name_cap is None:
+        return frac
+
+    # (셀, 종목) 단위 가중치 합 → 종목 단위로 water-filling
+    if names is None:
+        group = np.arange(len(rows))
+    else:
+        name = names[rows]
+        _, group = np.unique(cell * (int(name.max(initial=0)) + 1) + name, return_inverse=True)
+    n_groups = int(group.max(initial=-1)) + 1
+    g_cell = np.zeros(n_groups, dtype=np.int64)
+    g_cell[group] = cell
+    g_w = np.bincount(group, weights=w, minlength=n_groups)
+    g_on = g_w > 0
+    g_frac = np.bincount(group, weights=frac, minlength=n_groups)
+
+    n_on = np.bincount(g_cell, weights=g_on, minlength=size)
+    cap = np.maximum(name_cap, 1.0 / np.maximum(n_on, 1))[g_cell]
+    capped = np.zeros(n_groups, dtype=bool)
+    for _ in range(max_iter):
+        over = g_on & ~capped & (g_frac > cap * (1 + 1e-12))
+        if not over.any():
+            break
+        capped |= over
+        free_mass = 1 - np.bincount(g_cell, weights=np.where(capped, cap, 0.0), minlength=size)
+        free_w = np.bincount(g_cell, weights=np.where(g_on & ~capped, g_w, 0.0), minlength=size)
+        g_frac = np.where(capped, cap, np.where(g_on, g_w * (free_mass / np.maximum(free_w, 1e-300))[g_cell], 0.0))
+
+    # 종목 비중 → 행 가중치 비율로 배분
+    return np.where(on, g_frac[group] * w / np.maximum(g_w[group], 1e-300), 0.0)
+
+
+def weighted_positions(df, cells, weights, name_cap=None):
+    """
+    가중치 방식 포지션: (행, 카테고리) 쌍별 부호 비중 (롱 +0.5 × 셀 안 비중, 숏 -0.5 × 셀 안 비중)
+    weighted_delta_neutral_by_category 와 같은 비중 (hedge_by_category 의 positions 로 사용)
+    """
+    weights = np.asarray(weights, dtype=float)
+    names = name_codes(df)
+    long_frac = _side_fractions(cells, df['long_return'].to_numpy(dtype=float) != 0, weights, name_cap, names)
+    short_frac = _side_fractions(cells, df['short_return'].to_numpy(dtype=float) != 0, weights, name_cap, names)
+    return 0.5 * (long_frac - short_frac)
+
+
+def weighted_delta_neutral_by_category(df, cells, weights, name_cap=None):
+    """
+    가중치 방식 델타-뉴트럴: 롱/숏 각 0.5 를 셀 안 가중치 비율로 배분 (weighting.row_weights)
+    weights 가 모두 1 이고 name_cap 이 없으면 delta_neutral_by_category 와 같음, 반환 컬럼도 동일
+    name_cap 은 종목 단위 (같은 날 같은 종목의 여러 헤드라인 행은 합산 비중으로 제한)
+    """
+    long_ret = df['long_return'].to_numpy(dtype=float)
+    short_ret = df['short_return'].to_numpy(dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    names = name_codes(df)
+    size = cells['n_rows'].size
+    shape = cells['n_rows'].shape
+
+    out = {}
+    for side, ret in (('long', long_ret), ('short', short_ret)):
+        on_side = ret != 0
+        frac = _side_fractions(cells, on_side, weights, name_cap, names)
+        out[f'n_{side}'] = _cell_sum(cells, on_side.astype(float)).astype(np.int64)
+        out[side] = 0.5 * np.bincount(cells['cell'], weights=frac * ret[cells['rows']],
+                                      minlength=size).reshape(shape)
+
+    return _split_categories(cells, lambda k, present: pd.DataFrame({
+        'long_return': out['long'][k, present],
+        'short_return': out['short'][k, present],
+        'long_short_return': out['long'][k, present] + out['short'][k, present],
+        'n_long': out['n_long'][k, present],
+        'n_short': out['n_short'][k, present],
+        'n_total': out['n_long'][k, present] + out['n_short'][k, present]
+    }, index=cells['dates'][present]))
+
+
+def neutral_group_codes(df, columns):
+    """
+    중립화 그룹 컬럼 (예: ['Sector'], ['규모구분'], ['Sector', '규모구분']) → 행별 결합 그룹 코드, 결측 행은 -1
+    """
+    codes = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    for col in columns:
+        col_codes, uniques = pd.factorize(df[col])
+        missing |= col_codes < 0
+        codes = codes * max(len(uniques), 1) + np.maximum(col_codes, 0)
+    return np.where(missing, -1, codes)
+
+
+def neutral_positions(df, cells, group_codes):
+    """
+    그룹 중립 포지션: (행, 카테고리) 쌍별 부호 비중, (카테고리 × 거래일 × 그룹) 안에서 롱 +1 / 숏 -1 을 평균 차감
+    그룹마다 롱 합 = 숏 합 (순노출 0), 롱/숏이 한쪽만 있는 그룹과 그룹 결측 행은 0, 셀마다 롱/숏 각 0.5 로 조정
+    """
+    rows, cell = cells['rows'], cells['cell']
+    size = cells['n_rows'].size
+    signal = (df['long_return'].to_numpy(dtype=float) != 0).astype(float) \
+        - (df['short_return'].to_numpy(dtype=float) != 0)
+    s = signal[rows]
+    g = group_codes[rows]
+    active = (s != 0) & (g >= 0)
+
+    # (셀, 그룹) 버킷별 평균 신호 차감
+    n_groups = int(group_codes.max(initial=-1)) + 1
+    _, bucket = np.unique(cell * max(n_groups, 1) + np.maximum(g, 0), return_inverse=True)
+    bucket_sum = np.bincount(bucket, weights=np.where(active, s, 0.0))
+    bucket_count = np.bincount(bucket, weights=active)
+    demeaned = np.where(active, s - (bucket_sum / np.maximum(bucket_count, 1))[bucket], 0.0)
+
+    gross = np.bincount(cell, weights=np.abs(demeaned), minlength=size)
+    return demeaned / np.where(gross > 0, gross, 1.0)[cell]
+
+
+def neutral_delta_neutral_by_category(df, cells, group_codes):
+    """
+    섹터 / 규모 중립 델타-뉴트럴: neutral_positions 비중으로 롱 / 숏 수익률 (반환 컬럼은 delta_neutral_by_category 와 같음)
+    n_long / n_short 는 중립화 후 비중이 남은 종목 수
+    """
+    long_ret = df['long_return'].to_numpy(dtype=float)[cells['rows']]
+    short_ret = df['short_return'].to_numpy(dtype=float)[cells['rows']]
+    position = neutral_positions(df, cells, group_codes)
+    size = cells['n_rows'].size
+    shape = cells['n_rows'].shape
+
+    def cell_total(weights):
+        return np.bincount(cells['cell'], weights=weights, minlength=size).reshape(shape)
+
+    weighted_long = cell_total(np.where(position > 0, position * long_ret, 0.0))
+    weighted_short = cell_total(np.where(position < 0, -position * short_ret, 0.0))
+    n_long = cell_total((position > 0).astype(float)).astype(np.int64)
+    n_short = cell_total((position < 0).astype(float)).astype(np.int64)
+
+    return _split_categories(cells, lambda k, present: pd.DataFrame({
+        'long_return': weighted_long[k, present],
+        'short_return': weighted_short[k, present],
+        'long_short_return': weighted_long[k, present] + weighted_short[k, present],
+        'n_long': n_long[k, present],
+        'n_short': n_short[k, present],
+        'n_total': n_long[k, present] + n_short[k, present]
+    }, index=cells['dates'][present]))
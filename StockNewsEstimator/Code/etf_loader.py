@@ -0,0 +1,81 @@
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# FnGuide 형식 ETF 엑셀 (행: ETF, 열: Symbol / Symbol Name / Kind / 날짜별 종가) → (거래일 × ETF) 종가 행렬
+# 날짜 열 판별/파싱은 열 이름 목록당 한 번 (캐시), 종가는 블록 전체를 한 번에 숫자 변환해 전치한다.
+
+# ETF 코드별 정확한 분류 (KODEX 기준, 없으면 원본 Kind 사용)
+ETF_CLASSIFICATION = {
+    'A325010': 'SSC',  # KODEX 성장주
+    'A275290': 'VSC',  # KODEX 가치주
+}
+
+
+def _is_date_column(col):
+    # 문자열 날짜 ('20xx-..' / '19xx-..'), Timestamp, strftime 이 있는 날짜 객체
+    if isinstance(col, str):
+        return '-' in col and (col.startswith('20') or col.startswith('19'))
+    return isinstance(col, pd.Timestamp) or hasattr(col, 'strftime')
+
+
+@lru_cache(maxsize=32)
+def parse_date_columns(columns):
+    """
+    열 이름 tuple → (날짜 열 위치 배열, 날짜 DatetimeIndex), 파싱 실패 열은 제외
+    같은 시트 형식이면 캐시된 결과 재사용
+    """
+    positions = np.array([i for i, col in enumerate(columns) if _is_date_column(col)], dtype=np.int64)
+    # 문자열 / 날짜 객체가 섞여 있으므로 형식은 값마다 추론
+    dates = pd.to_datetime(pd.Index([columns[i] for i in positions], dtype=object),
+                           errors='coerce', format='mixed')
+    ok = ~dates.isna()
+    return positions[ok], pd.DatetimeIndex(dates[ok])
+
+
+def etf_price_matrix(etf_df, classification=ETF_CLASSIFICATION):
+    """
+    ETF 시트 DataFrame → (종가 행렬 [거래일 × Symbol], ETF 정보 [Symbol → name, kind])
+    Symbol 중복은 첫 행만, 0 이하 / 숫자가 아닌 값은 NaN, 같은 날짜 열이 여러 개면 마지막 열
+    """
+    etf_df = etf_df.drop_duplicates(subset='Symbol', keep='first')
+    positions, dates = parse_date_columns(tuple(etf_df.columns))
+
+    block = etf_df.iloc[:, positions].to_numpy(dtype=object)
+    values = pd.to_numeric(pd.Series(block.ravel()), errors='coerce').to_numpy(dtype=float)\
+        .reshape(block.shape)
+    values = np.where(values > 0, values, np.nan)
+
+    prices = pd.DataFrame(values.T, index=dates, columns=etf_df['Symbol'].to_numpy())
+    prices = prices[~prices.index.duplicated(keep='last')].sort_index()
+
+    info = pd.DataFrame({
+        'name': etf_df['Symbol Name'].to_numpy(),
+        'kind': [classification.get(s, k) for s, k in zip(etf_df['Symbol'], etf_df['Kind'])]
+    }, index=prices.columns)
+
+    has_price = prices.notna().any().to_numpy()
+    return prices.loc[:, has_price], info[has_price]
+
+
+def period_slice(index, start_date, end_date):
+    """
+    정렬된 날짜 index 에서 [start_date, end_date] 구간의 위치 slice (이진 탐색)
+    """
+    lo = index.searchsorted(pd.to_datetime(start_date), side='left')
+    hi = index.searchsorted(pd.to_datetime(end_date), side='right')
+    return slice(lo, hi)
+
+
+def etf_data_from_matrix(prices, info):
+    """
+    (종가 행렬, ETF 정보) → 기존 load_etf_data 형식 dict {'<Symbol>_<Kind>': {name, kind, prices}}
+    """
+    return {
+        f"{symbol}_{info.at[symbol, 'kind']}": {
+            'name': info.at[symbol, 'name'],
+            'kind': info.at[symbol, 'kind'],
+            'prices': prices[symbol].dropna().rename(None)
+        }
+        for symbol in prices.columns
+    }
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+from metrics_kernel import annual_trading_days
+
+# 다중 팩터 알파/베타 회귀: 모든 전략 (거래일 × 전략) 을 하나의 팩터 행렬에 대해 한 번의 최소제곱으로 풀고
+# Newey-West (Bartlett) HAC 표준오차로 t 값을 계산한다.
+# 롤링 회귀는 X'X / X'y / y'y 누적합의 차 (창 이동 = 한 날 추가 + 한 날 제거) 로 모든 창을 한 번에 푼다.
+
+ROLLING_REG_WINDOW = 126   # 약 6개월
+
+# 팩터 이름 (시장 / 규모 / 가치)
+FACTOR_NAMES = ['MKT', 'SMB', 'HML']
+
+
+def newey_west_lags(n_obs):
+    """
+    Newey-West (1994) 자동 시차: floor(4 (T / 100)^(2/9))
+    """
+    return int(np.floor(4 * (n_obs / 100) ** (2 / 9)))
+
+
+def spread_factor(long_leg, short_leg):
+    """
+    두 수익률 시계열의 차 (예: 소형주 - 대형주, 가치주 ETF - 성장주 ETF), 공통 거래일만
+    """
+    long_leg, short_leg = long_leg.align(short_leg, join='inner')
+    return long_leg - short_leg
+
+
+def build_factor_matrix(**factors):
+    """
+    팩터 이름 → 일별 수익률 Series → (거래일 × 팩터) DataFrame, 모든 팩터가 있는 거래일만
+    None 인 팩터는 제외
+    """
+    return pd.DataFrame({name: series for name, series in factors.items()
+                         if series is not None}).dropna().sort_index()
+
+
+def align_returns(returns_df, factors_df):
+    """
+    전략 수익률을 팩터 거래일에 맞춤: 전략 기간 안의 팩터 거래일만, 전략에 없는 날은 포지션 없음 (0)
+    """
+    index = factors_df.index[(factors_df.index >= returns_df.index.min()) &
+                             (factors_df.index <= returns_df.index.max())]
+    return returns_df.reindex(index).fillna(0), factors_df.loc[index]
+
+
+def ols_batch(Y, X, nw_lags=None):
+    """
+    (T × S) 수익률, (T × K) 팩터 → 상수항 포함 OLS 를 모든 열에 한 번에 (lstsq 다중 우변)
+    nw_lags: Newey-West 시차 (None 이면 자동, 0 이면 White 이분산 강건)
+    반환: coef / se / tstat (K+1 × S, 첫 행이 상수항), r2 (S,), n_obs, nw_lags
+    """
+    Y = np.asarray(Y, dtype=float)
+    Y = Y[:, None] if Y.ndim == 1 else Y
+    X = np.column_stack([np.ones(len(Y)), np.asarray(X, dtype=float)])
+    n_obs, k = X.shape
+    nw_lags = newey_west_lags(n_obs) if nw_lags is None else nw_lags
+
+    coef = np.linalg.lstsq(X, Y, rcond=None)[0]
+    resid = Y - X @ coef
+    XtX_inv = np.linalg.pinv(X.T @ X)
+
+    # HAC 중간항: S = Γ0 + Σ_l w_l (Γl + Γl'), Γl = Σ_t u_t u_{t-l}' (u_t = x_t e_t), 전략별 (S × K × K)
+    u = X[:, :, None] * resid[:, None, :]
+    meat = np.einsum('tis,tjs->sij', u, u)
+    for lag in range(1, min(nw_lags, n_obs - 1) + 1):
+        gamma = np.einsum('tis,tjs->sij', u[lag:], u[:-lag])
+        meat += (1 - lag / (nw_lags + 1)) * (gamma + gamma.transpose(0, 2, 1))
+    cov = XtX_inv[None] @ meat @ XtX_inv[None] * n_obs / max(n_obs - k, 1)
+    se = np.sqrt(np.maximum(np.diagonal(cov, axis1=1, axis2=2), 0)).T
+
+    ss_tot = ((Y - Y.mean(axis=0)) ** 2).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tstat = np.where(se > 0, coef / se, np.nan)
+        r2 = np.where(ss_tot > 0, 1 - (resid ** 2).sum(axis=0) / ss_tot, np.nan)
+
+    return {'coef': coef, 'se': se, 'tstat': tstat, 'r2': r2, 'n_obs': n_obs, 'nw_lags': nw_lags}
+
+
+def factor_regression(returns_df, factors_df, nw_lags=None, annual_days=None):
+    """
+    (거래일 × 전략) 수익률, (거래일 × 팩터) 팩터 → (전략 × 결과) DataFrame
+    alpha: 일별 절편 × 연간 거래일 (metrics_kernel.benchmark_metrics 와 같은 연율화), alpha_t: Newey-West t 값
+    beta_<팩터>, t_<팩터>, r2, n_obs
+    """
+    if isinstance(returns_df, pd.Series):
+        returns_df = returns_df.to_frame()
+    Y, X = align_returns(returns_df, factors_df)
+    annual_days = annual_trading_days(Y.index) if annual_days is None else annual_days
+    fit = ols_batch(Y.to_numpy(), X.to_numpy(), nw_lags)
+
+    table = {'alpha': fit['coef'][0] * annual_days, 'alpha_t': fit['tstat'][0]}
+    for j, name in enumerate(X.columns, start=1):
+        table[f'beta_{name}'] = fit['coef'][j]
+        table[f't_{name}'] = fit['tstat'][j]
+    table['r2'] = fit['r2']
+    table['n_obs'] = fit['n_obs']
+    return pd.DataFrame(table, index=Y.columns)
+
+
+def _window_diff(cumulative, window):
+    # 누적합 (앞에 0 한 줄) → 창 합계 [t-window+1, t], t = window-1 ..
+    return cumulative[window:] - cumulative[:-window]
+
+
+def rolling_factor_regression(returns_df, factors_df, window=ROLLING_REG_WINDOW, annual_days=None):
+    """
+    창 길이 window 의 롤링 다중 팩터 회귀 (창 끝 거래일 기준), 창마다 (K+1 × K+1) 정규방정식을 배치로 풂
+    X'X, X'y, y'y 를 누적합 차이로 갱신하므로 창 하나 추가 비용은 O(K² S), 표준오차는 고전적 OLS
+    반환: {'alpha', 'alpha_t', 'beta_<팩터>', 't_<팩터>', 'r2'} → (창 끝 거래일 × 전략) DataFrame
+    """
+    if isinstance(returns_df, pd.Series):
+        returns_df = returns_df.to_frame()
+    Y_df, X_df = align_returns(returns_df, factors_df)
+    annual_days = annual_trading_days(Y_df.index) if annual_days is None else annual_days
+    Y = Y_df.to_numpy(dtype=float)
+    X = np.column_stack([np.ones(len(Y)), X_df.to_numpy(dtype=float)])
+    n_obs, k = X.shape
+    if n_obs < window or window <= k:
+        return {}
+
+    def cumulative(a):
+        return np.concatenate([np.zeros((1,) + a.shape[1:]), np.cumsum(a, axis=0)])
+
+    XtX = _window_diff(cumulative(X[:, :, None] * X[:, None, :]), window)    # (W × K × K)
+    XtY = _window_diff(cumulative(X[:, :, None] * Y[:, None, :]), window)    # (W × K × S)
+    YtY = _window_diff(cumulative(Y ** 2), window)                           # (W × S)
+    Ysum = _window_diff(cumulative(Y), window)
+
+    XtX_inv = np.linalg.pinv(XtX)
+    coef = XtX_inv @ XtY
+    ssr = np.maximum(YtY - np.einsum('wks,wks->ws', coef, XtY), 0)
+    sigma2 = ssr / (window - k)
+    se = np.sqrt(np.maximum(np.diagonal(XtX_inv, axis1=1, axis2=2), 0)[:, :, None] * sigma2[:, None, :])
+    ss_tot = YtY - Ysum ** 2 / window
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tstat = np.where(se > 0, coef / se, np.nan)
+        r2 = np.where(ss_tot > 1e-18, 1 - ssr / ss_tot, np.nan)
+
+    index = Y_df.index[window - 1:]
+
+    def frame(values):
+        return pd.DataFrame(values, index=index, columns=Y_df.columns)
+
+    out = {'alpha': frame(coef[:, 0] * annual_days), 'alpha_t': frame(tstat[:, 0])}
+    for j, name in enumerate(X_df.columns, start=1):
+        out[f'beta_{name}'] = frame(coef[:, j])
+        out[f't_{name}'] = frame(tstat[:, j])
+    out['r2'] = frame(r2)
+    return out
+
+
+def factor_regression_table(all_results, factors_df, columns=('long_return', 'short_return', 'long_short_return'),
+                            nw_lags=None):
+    """
+    all_results (카테고리 → {'daily': 일별 수익률}) 의 모든 카테고리 × 수익률 열을 한 번에 회귀
+    반환: ((카테고리, 수익률 열) × 결과) DataFrame
+    """
+    # 카테고리에 뉴스가 없는 날은 포지션이 없으므로 수익률 0
+    returns_df = pd.DataFrame({(category, column): data['daily'][column]
+                               for category, data in all_results.items() if 'daily' in data
+                               for column in columns}).sort_index().fillna(0)
+    table = factor_regression(returns_df, factors_df, nw_lags)
+    table.index.names = ['카테고리', '수익률']
+    return table
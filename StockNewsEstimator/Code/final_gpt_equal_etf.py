@@ -4,16 +4,31 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 import os
-from scipy import stats
+from daily_aggregates import (category_cells, category_membership, delta_neutral_by_category,
+                              delta_neutral_daily, equal_weight_by_category, equal_weight_daily,
+                              neutral_delta_neutral_by_category, neutral_group_codes,
+                              weighted_delta_neutral_by_category)
+from metrics_kernel import annual_trading_days, compute_metrics
+from etf_loader import etf_data_from_matrix, etf_price_matrix, parse_date_columns, period_slice
+from benchmark_store import cached_benchmark, equal_weight_benchmarks, file_provenance
+from factor_regression import build_factor_matrix, factor_regression_table, spread_factor
+from bootstrap_ci import BLOCK_SIZE, add_ci_columns, bootstrap_metric_draws
 
 # 한글 폰트 설정 (matplotlib)
 plt.rc('font', family='AppleGothic')
 plt.rcParams['axes.unicode_minus'] = False
 
+# 스타일 카테고리 소속 (혼합형 성장주+가치주는 양쪽에 모두 포함)
+STYLE_GROUPS = {
+    '성장주': ['성장주', '성장주+가치주'],
+    '가치주': ['가치주', '성장주+가치주']
+}
+
 
 def load_etf_data(etf_file_path):
     """
     ETF 데이터 로드 및 전처리
+    (거래일 × ETF) 종가 행렬로 한 번에 변환한 뒤 ETF 별 dict 로 반환 (etf_loader)
     """
     # ETF 데이터 읽기
     etf_df = pd.read_excel(etf_file_path)
@@ -22,67 +37,12 @@ def load_etf_data(etf_file_path):
     print(f"전체 컬럼 수: {len(etf_df.columns)}")
     print(f"처음 10개 컬럼: {list(etf_df.columns[:10])}")
 
-    # ETF 코드별 정확한 분류 (KODEX 기준)
-    etf_classification = {
-        'A325010': 'SSC',  # KODEX 성장주
-        'A275290': 'VSC',  # KODEX 가치주
-    }
-
-    # 날짜 컬럼 찾기 - 다양한 방법 시도
-    date_columns = []
-    for col in etf_df.columns:
-        # 문자열 형태의 날짜
-        if isinstance(col, str):
-            if '-' in col and (col.startswith('20') or col.startswith('19')):
-                date_columns.append(col)
-        # datetime 객체
-        elif isinstance(col, pd.Timestamp):
-            date_columns.append(col)
-        # numpy datetime
-        elif hasattr(col, 'strftime'):
-            date_columns.append(col)
-
-    print(f"찾은 날짜 컬럼 수: {len(date_columns)}")
-    if date_columns:
-        print(f"첫 번째 날짜 컬럼: {date_columns[0]}, 타입: {type(date_columns[0])}")
-
-    # ETF별 데이터 정리
-    etf_data = {}
-    processed_symbols = set()  # 중복 처리 방지
-
-    for idx, row in etf_df.iterrows():
-        symbol = row['Symbol']
-
-        # 중복 처리 방지
-        if symbol in processed_symbols:
-            continue
-        processed_symbols.add(symbol)
-
-        # ETF 분류 결정 (수동 매핑 우선, 없으면 원본 Kind 사용)
-        kind = etf_classification.get(symbol, row['Kind'])
-
-        # 종가 데이터만 추출
-        prices = {}
-        for date_col in date_columns:
-            try:
-                value = row[date_col]
-                if pd.notna(value) and float(value) > 0:
-                    # 날짜를 datetime으로 변환
-                    if isinstance(date_col, str):
-                        date_key = pd.to_datetime(date_col)
-                    else:
-                        date_key = pd.to_datetime(date_col)
-                    prices[date_key] = float(value)
-            except:
-                continue
-
-        if prices:
-            etf_data[f"{symbol}_{kind}"] = {
-                'name': row['Symbol Name'],
-                'kind': kind,
-                'prices': pd.Series(prices).sort_index()
-            }
-            print(f"로드된 ETF: {symbol} ({kind}), 가격 데이터 수: {len(prices)}")
+    prices, info = etf_price_matrix(etf_df)
+    print(f"찾은 날짜 컬럼 수: {len(parse_date_columns(tuple(etf_df.columns))[0])}")
+
+    etf_data = etf_data_from_matrix(prices, info)
+    for symbol, count in prices.count().items():
+        print(f"로드된 ETF: {symbol} ({info.at[symbol, 'kind']}), 가격 데이터 수: {count}")
 
     return etf_data
 
@@ -91,10 +51,8 @@ def calculate_etf_returns(etf_prices, start_date, end_date):
     """
     ETF 일별 수익률 계산
     """
-    # 기간 필터링
-    mask = (etf_prices.index >= pd.to_datetime(start_date)) & (
-        etf_prices.index <= pd.to_datetime(end_date))
-    prices_filtered = etf_prices[mask]
+    # 기간 필터링 (정렬된 날짜 index 이진 탐색)
+    prices_filtered = etf_prices.iloc[period_slice(etf_prices.index, start_date, end_date)]
 
     if len(prices_filtered) < 2:
         return None, None
@@ -108,29 +66,23 @@ def calculate_etf_returns(etf_prices, start_date, end_date):
     return daily_returns, cumulative_returns
 
 
-def calculate_equal_weighted_benchmark(df, category_col='스타일'):
+def calculate_equal_weighted_benchmark(df, category_col='스타일', groups=STYLE_GROUPS, source=None):
     """
     각 카테고리별 동일가중 벤치마크(EqualWeight) 수익률 계산
+    (전체 + 겹치는 스타일 그룹을 (카테고리 × 거래일) 셀 집계 한 번으로)
+    source: 뉴스 데이터 파일 경로, 있으면 벤치마크 저장소에서 (같은 파일이면 재계산 없음)
     """
-    equalweight_results = {}
-
-    # 전체 EqualWeight
-    all_equalweight = calculate_category_equalweight(df)
-    equalweight_results['전체'] = all_equalweight
-
-    # 성장주 EqualWeight (성장주 + 성장주+가치주 포함)
-    growth_df = df[df[category_col].isin(['성장주', '성장주+가치주'])].copy()
-    if len(growth_df) > 0:
-        growth_equalweight = calculate_category_equalweight(growth_df)
-        equalweight_results['성장주'] = growth_equalweight
-        print(f"성장주 EqualWeight 계산 완료: {len(growth_df)}개 데이터 (성장주+혼합형)")
-
-    # 가치주 EqualWeight (가치주 + 성장주+가치주 포함)
-    value_df = df[df[category_col].isin(['가치주', '성장주+가치주'])].copy()
-    if len(value_df) > 0:
-        value_equalweight = calculate_category_equalweight(value_df)
-        equalweight_results['가치주'] = value_equalweight
-        print(f"가치주 EqualWeight 계산 완료: {len(value_df)}개 데이터 (가치주+혼합형)")
+    # current_date를 datetime으로 변환
+    df['current_date'] = pd.to_datetime(df['current_date'])
+    membership = category_membership(df, category_col, groups)
+    if source is not None:
+        equalweight_results = equal_weight_benchmarks(df, category_col, groups, 'equalweight_return', source)
+    else:
+        equalweight_results = equal_weight_by_category(df, category_cells(df, membership), 'equalweight_return')
+
+    for category in groups:
+        if category in equalweight_results:
+            print(f"{category} EqualWeight 계산 완료: {membership[category].sum()}개 데이터 ({category}+혼합형)")
 
     return equalweight_results
 
@@ -143,76 +95,41 @@ def calculate_category_equalweight(df):
     # current_date를 datetime으로 변환
     df['current_date'] = pd.to_datetime(df['current_date'])
 
-    # 각 날짜별로 그룹화
-    grouped = df.groupby('current_date')
-
-    daily_equalweight = []
-
-    for date, group in grouped:
-        # 각 종목의 평균 수익률: (long_return + short_return) / 2
-        # 포지션 유무에 관계없이 모든 종목을 포함
-        group['avg_return'] = (group['long_return'] +
-                               group['short_return']) / 2
-
-        # 모든 종목의 평균 수익률을 동일가중으로 계산
-        all_returns = group['avg_return']
-        equalweight_return = all_returns.mean() if not all_returns.empty else 0
-
-        daily_equalweight.append({
-            'current_date': date,
-            'equalweight_return': equalweight_return,
-            'n_stocks': len(all_returns)  # 모든 종목 수
-        })
-
-    # 데이터프레임으로 변환
-    equalweight_df = pd.DataFrame(daily_equalweight).set_index('current_date')
-
-    # 누적 수익률 계산
-    equalweight_df['cumulative_return'] = (
-        1 + equalweight_df['equalweight_return']).cumprod()
-
-    return equalweight_df
+    # 날짜 정수 코드별 bincount 로 일별 평균 (daily_aggregates)
+    return equal_weight_daily(df, 'equalweight_return')
 
 
-def calculate_delta_neutral_by_category(df, category_col='스타일'):
+def calculate_delta_neutral_by_category(df, category_col='스타일', groups=STYLE_GROUPS, weights=None, name_cap=None,
+                                       neutralize=None):
     """
     카테고리별 델타-뉴트럴 방식으로 누적 수익률 계산
+    (전체 + 겹치는 스타일 그룹을 (카테고리 × 거래일) 셀 집계 한 번으로)
+    weights / name_cap: 행별 원시 가중치 (weighting.row_weights) / 종목당 최대 비중, 없으면 롱/숏 각 동일가중
+    neutralize: 중립화 그룹 컬럼 (예: ['Sector'], ['규모구분']), 있으면 날짜 × 그룹마다 롱 = 숏 노출
     """
+    if neutralize and (weights is not None or name_cap is not None):
+        raise ValueError("neutralize 는 롱 +1 / 숏 -1 신호의 그룹 평균 차감이므로 weights / name_cap 과 같이 쓸 수 없습니다.")
     # current_date를 datetime으로 변환
     df['current_date'] = pd.to_datetime(df['current_date'])
+    membership = category_membership(df, category_col, groups)
+    cells = category_cells(df, membership)
+    if neutralize:
+        daily_results = neutral_delta_neutral_by_category(df, cells, neutral_group_codes(df, neutralize))
+    elif weights is None and name_cap is None:
+        daily_results = delta_neutral_by_category(df, cells)
+    else:
+        daily_results = weighted_delta_neutral_by_category(
+            df, cells, np.ones(len(df)) if weights is None else weights, name_cap)
 
-    # 전체 결과 저장
     all_results = {}
-
-    # 1. 전체 포트폴리오 계산
-    all_cum, all_daily = calculate_delta_neutral_returns(df)
-    all_results['전체'] = {
-        'cumulative': all_cum,
-        'daily': all_daily,
-        'metrics': calculate_performance_metrics(all_daily)
-    }
-
-    # 2. 성장주 계산 (성장주 + 성장주+가치주 포함)
-    growth_df = df[df[category_col].isin(['성장주', '성장주+가치주'])].copy()
-    if len(growth_df) > 0:
-        growth_cum, growth_daily = calculate_delta_neutral_returns(growth_df)
-        all_results['성장주'] = {
-            'cumulative': growth_cum,
-            'daily': growth_daily,
-            'metrics': calculate_performance_metrics(growth_daily)
-        }
-        print(f"성장주 GPT 계산 완료: {len(growth_df)}개 데이터 (성장주+혼합형)")
-
-    # 3. 가치주 계산 (가치주 + 성장주+가치주 포함)
-    value_df = df[df[category_col].isin(['가치주', '성장주+가치주'])].copy()
-    if len(value_df) > 0:
-        value_cum, value_daily = calculate_delta_neutral_returns(value_df)
-        all_results['가치주'] = {
-            'cumulative': value_cum,
-            'daily': value_daily,
-            'metrics': calculate_performance_metrics(value_daily)
+    for category, daily in daily_results.items():
+        all_results[category] = {
+            'cumulative': calculate_cumulative_returns(daily),
+            'daily': daily,
+            'metrics': calculate_performance_metrics(daily)
         }
-        print(f"가치주 GPT 계산 완료: {len(value_df)}개 데이터 (가치주+혼합형)")
+        if category in groups:
+            print(f"{category} GPT 계산 완료: {membership[category].sum()}개 데이터 ({category}+혼합형)")
 
     return all_results
 
@@ -224,223 +141,91 @@ def calculate_delta_neutral_returns(df):
     # current_date를 datetime으로 변환
     df['current_date'] = pd.to_datetime(df['current_date'])
 
-    # 각 날짜별로 그룹화
-    grouped = df.groupby('current_date')
-
-    # 일별 수익률 저장할 리스트
-    daily_results = []
-
-    for date, group in grouped:
-        # 롱 포지션과 숏 포지션 분리
-        long_positions = group[group['long_return'] != 0]
-        short_positions = group[group['short_return'] != 0]
+    # 날짜 정수 코드별 bincount 로 롱/숏 종목 수와 0.5/n 가중 수익률 (daily_aggregates)
+    daily_returns = delta_neutral_daily(df)
 
-        # 롱과 숏 종목 수
-        n_long = len(long_positions)
-        n_short = len(short_positions)
+    return calculate_cumulative_returns(daily_returns), daily_returns
 
-        # 델타-뉴트럴 가중치 계산
-        if n_long > 0:
-            long_weight = 0.5 / n_long
-            weighted_long_return = (
-                long_positions['long_return'] * long_weight).sum()
-        else:
-            weighted_long_return = 0
-
-        if n_short > 0:
-            short_weight = 0.5 / n_short
-            weighted_short_return = (
-                short_positions['short_return'] * short_weight).sum()
-        else:
-            weighted_short_return = 0
 
-        # 롱숏 합산 수익률
-        long_short_return = weighted_long_return + weighted_short_return
-
-        daily_results.append({
-            'current_date': date,
-            'long_return': weighted_long_return,
-            'short_return': weighted_short_return,
-            'long_short_return': long_short_return,
-            'n_long': n_long,
-            'n_short': n_short,
-            'n_total': n_long + n_short
-        })
-
-    # 데이터프레임으로 변환
-    daily_returns = pd.DataFrame(daily_results).set_index('current_date')
-
-    # 누적 수익률 계산
+def calculate_cumulative_returns(daily_returns):
+    """
+    일별 델타-뉴트럴 수익률 → Long / Short / Long+Short 누적 수익률
+    """
     cumulative_returns = pd.DataFrame(index=daily_returns.index)
     cumulative_returns['Long'] = (1 + daily_returns['long_return']).cumprod()
     cumulative_returns['Short'] = (1 + daily_returns['short_return']).cumprod()
     cumulative_returns['Long+Short'] = (1 +
                                         daily_returns['long_short_return']).cumprod()
 
-    return cumulative_returns, daily_returns
+    return cumulative_returns
+
 
+# 각 지표 함수가 반환하는 키 (metrics_kernel.compute_metrics 결과에서 선택)
+PERFORMANCE_METRIC_KEYS = ['total_return', 'annual_return', 'annual_vol', 'sharpe_ratio',
+                           'sortino_ratio', 'max_drawdown', 'mean_daily_return',
+                           'std_daily_return', 'skewness', 'kurtosis']
 
-def calculate_performance_metrics(daily_returns):
+
+def calculate_performance_metrics(daily_returns, annual_days=None):
     """
-    성과 지표 계산
+    성과 지표 계산 (롱 / 숏 / 롱숏 세 열을 한 번에)
+    annual_days: None 이면 실제 기간으로 연간 거래일 수 추정
     """
-    metrics = {}
-
-    # 실제 거래일 수 계산
-    start_date = daily_returns.index.min()
-    end_date = daily_returns.index.max()
-    total_days = (end_date - start_date).days
-    trading_days = len(daily_returns)
-
-    # 연간 거래일 수 추정
-    annual_trading_days = trading_days * 365 / total_days if total_days > 0 else 252
-
-    for column in ['long_return', 'short_return', 'long_short_return']:
-        returns = daily_returns[column]
-
-        # 기본 지표들
-        mean_daily_return = returns.mean()
-        std_daily_return = returns.std()
-        annual_return = (1 + mean_daily_return) ** annual_trading_days - 1
-        annual_vol = std_daily_return * np.sqrt(annual_trading_days)
-        sharpe_ratio = annual_return / annual_vol if annual_vol != 0 else 0
-
-        # 최대 낙폭
-        cumulative = (1 + returns).cumprod()
-        running_max = cumulative.cummax()
-        drawdown = (cumulative - running_max) / running_max
-        max_drawdown = drawdown.min()
-
-        # 누적 수익률
-        total_return = (1 + returns).prod() - 1
-
-        # 소르티노 비율 (Sortino Ratio)
-        downside_returns = returns[returns < 0]
-        downside_vol = downside_returns.std(
-        ) * np.sqrt(annual_trading_days) if len(downside_returns) > 0 else 0
-        sortino_ratio = annual_return / downside_vol if downside_vol != 0 else 0
-
-        # 왜도와 첨도
-        skewness = returns.skew()
-        kurtosis = returns.kurtosis()
-
-        metrics[column] = {
-            'total_return': total_return,
-            'annual_return': annual_return,
-            'annual_vol': annual_vol,
-            'sharpe_ratio': sharpe_ratio,
-            'sortino_ratio': sortino_ratio,
-            'max_drawdown': max_drawdown,
-            'mean_daily_return': mean_daily_return,
-            'std_daily_return': std_daily_return,
-            'skewness': skewness,
-            'kurtosis': kurtosis
-        }
+    columns = ['long_return', 'short_return', 'long_short_return']
+    table = compute_metrics(daily_returns[columns], annual_days=annual_days)
+    return {column: table.loc[column, PERFORMANCE_METRIC_KEYS].to_dict() for column in columns}
 
-    return metrics
 
-
-def calculate_etf_metrics(daily_returns):
+def calculate_series_metrics(daily_returns, annual_days=None):
     """
-    ETF 성과 지표 계산
+    단일 일별 수익률 Series 성과 지표 (ETF / EqualWeight 공통)
+    annual_days: None 이면 실제 기간으로 연간 거래일 수 추정 (GPT 전략과 같은 기준)
     """
     if daily_returns is None or len(daily_returns) == 0:
         return None
+    table = compute_metrics(daily_returns.rename('series'), annual_days=annual_days)
+    return table.loc['series', PERFORMANCE_METRIC_KEYS].to_dict()
 
-    # 연율화 계수 (252 거래일 가정)
-    annual_factor = np.sqrt(252)
-
-    # 기본 지표
-    mean_daily_return = daily_returns.mean()
-    std_daily_return = daily_returns.std()
-    total_return = (1 + daily_returns).prod() - 1
-    annual_return = (1 + mean_daily_return) ** 252 - 1
-    annual_vol = std_daily_return * annual_factor
-    sharpe_ratio = annual_return / annual_vol if annual_vol != 0 else 0
-
-    # 최대 낙폭
-    cumulative = (1 + daily_returns).cumprod()
-    running_max = cumulative.cummax()
-    drawdown = (cumulative - running_max) / running_max
-    max_drawdown = drawdown.min()
-
-    # 하방 변동성
-    downside_returns = daily_returns[daily_returns < 0]
-    downside_vol = downside_returns.std(
-    ) * annual_factor if len(downside_returns) > 0 else 0
-    sortino_ratio = annual_return / downside_vol if downside_vol != 0 else 0
-
-    # 왜도와 첨도
-    skewness = daily_returns.skew()
-    kurtosis = daily_returns.kurtosis()
-
-    return {
-        'total_return': total_return,
-        'annual_return': annual_return,
-        'annual_vol': annual_vol,
-        'sharpe_ratio': sharpe_ratio,
-        'sortino_ratio': sortino_ratio,
-        'max_drawdown': max_drawdown,
-        'mean_daily_return': mean_daily_return,
-        'std_daily_return': std_daily_return,
-        'skewness': skewness,
-        'kurtosis': kurtosis
-    }
-
-
-def calculate_equalweight_metrics(daily_returns):
+
+def calculate_etf_metrics(daily_returns, annual_days=None):
     """
-    EqualWeight 성과 지표 계산
+    ETF 성과 지표 계산
     """
-    if daily_returns is None or len(daily_returns) == 0:
-        return None
+    return calculate_series_metrics(daily_returns, annual_days)
+
 
-    # 연율화 계수 (252 거래일 가정)
-    annual_factor = np.sqrt(252)
-
-    # 기본 지표
-    mean_daily_return = daily_returns.mean()
-    std_daily_return = daily_returns.std()
-    total_return = (1 + daily_returns).prod() - 1
-    annual_return = (1 + mean_daily_return) ** 252 - 1
-    annual_vol = std_daily_return * annual_factor
-    sharpe_ratio = annual_return / annual_vol if annual_vol != 0 else 0
-
-    # 최대 낙폭
-    cumulative = (1 + daily_returns).cumprod()
-    running_max = cumulative.cummax()
-    drawdown = (cumulative - running_max) / running_max
-    max_drawdown = drawdown.min()
-
-    # 하방 변동성
-    downside_returns = daily_returns[daily_returns < 0]
-    downside_vol = downside_returns.std(
-    ) * annual_factor if len(downside_returns) > 0 else 0
-    sortino_ratio = annual_return / downside_vol if downside_vol != 0 else 0
-
-    # 왜도와 첨도
-    skewness = daily_returns.skew()
-    kurtosis = daily_returns.kurtosis()
-
-    return {
-        'total_return': total_return,
-        'annual_return': annual_return,
-        'annual_vol': annual_vol,
-        'sharpe_ratio': sharpe_ratio,
-        'sortino_ratio': sortino_ratio,
-        'max_drawdown': max_drawdown,
-        'mean_daily_return': mean_daily_return,
-        'std_daily_return': std_daily_return,
-        'skewness': skewness,
-        'kurtosis': kurtosis
-    }
-
-
-def create_comprehensive_comparison_table(gpt_results, etf_data, equalweight_results, start_date, end_date):
+def calculate_equalweight_metrics(daily_returns, annual_days=None):
+    """
+    EqualWeight 성과 지표 계산
+    """
+    return calculate_series_metrics(daily_returns, annual_days)
+
+
+# 비교 테이블 컬럼 → 지표 키 (부트스트랩 신뢰구간 대상)
+COMPARISON_METRIC_KEYS = {
+    '최종 누적수익률': 'total_return',
+    '연율화 수익률': 'annual_return',
+    '연율화 변동성': 'annual_vol',
+    '샤프 비율': 'sharpe_ratio',
+    '소르티노 비율': 'sortino_ratio',
+    '최대 낙폭': 'max_drawdown',
+    '일별 평균수익률': 'mean_daily_return',
+    '일별 표준편차': 'std_daily_return',
+    '왜도': 'skewness',
+    '첨도': 'kurtosis'
+}
+
+
+def create_comprehensive_comparison_table(gpt_results, etf_data, equalweight_results, start_date, end_date,
+                                          n_bootstrap=0, block_size=BLOCK_SIZE):
     """
     GPT, ETF, EqualWeight 종합 비교 테이블 생성
+    n_bootstrap > 0 이면 정상 부트스트랩 95% 신뢰구간 컬럼 추가
+    (연율화는 모든 행이 실제 기간으로 추정한 연간 거래일 수 사용)
     """
     comparison_data = []
+    # 행 이름('구분') → 지표별 부트스트랩 표본
+    ci_draws = {}
 
     # 카테고리 순서 정의
     categories = ['전체', '성장주', '가치주']
@@ -452,6 +237,16 @@ def create_comprehensive_comparison_table(gpt_results, etf_data, equalweight_res
 
             # GPT LongShort
             if 'metrics' in gpt_data:
+                if n_bootstrap > 0:
+                    daily = gpt_data['daily']
+                    draws = bootstrap_metric_draws(
+                        {c: daily[c].to_numpy() for c in [
+                            'long_short_return', 'long_return', 'short_return']},
+                        annual_trading_days(daily.index), n_bootstrap, block_size)
+                    ci_draws[f'GPT_{category}_LongShort'] = draws['long_short_return']
+                    ci_draws[f'GPT_{category}_Long'] = draws['long_return']
+                    ci_draws[f'GPT_{category}_Short'] = draws['short_return']
+
                 metrics = gpt_data['metrics']['long_short_return']
                 comparison_data.append({
                     '구분': f'GPT_{category}_LongShort',
@@ -508,6 +303,10 @@ def create_comprehensive_comparison_table(gpt_results, etf_data, equalweight_res
             ew_metrics = calculate_equalweight_metrics(
                 ew_data['equalweight_return'])
             if ew_metrics:
+                if n_bootstrap > 0:
+                    ci_draws[f'EqualWeight_{category}'] = bootstrap_metric_draws(
+                        {'ew': ew_data['equalweight_return'].to_numpy()},
+                        annual_trading_days(ew_data.index), n_bootstrap, block_size)['ew']
                 comparison_data.append({
                     '구분': f'EqualWeight_{category}',
                     '유형': 'EqualWeight',
@@ -527,6 +326,7 @@ def create_comprehensive_comparison_table(gpt_results, etf_data, equalweight_res
         if category == '전체':
             # ETF 전체 평균 계산
             etf_metrics_list = []
+            etf_draws_list = []
             for etf_name, etf_info in etf_data.items():
                 daily_returns, _ = calculate_etf_returns(
                     etf_info['prices'], start_date, end_date
@@ -535,6 +335,10 @@ def create_comprehensive_comparison_table(gpt_results, etf_data, equalweight_res
                     metrics = calculate_etf_metrics(daily_returns)
                     if metrics:
                         etf_metrics_list.append(metrics)
+                        if n_bootstrap > 0:
+                            etf_draws_list.append(bootstrap_metric_draws(
+                                {'etf': daily_returns.to_numpy()}, annual_trading_days(daily_returns.index),
+                                n_bootstrap, block_size)['etf'])
 
             if etf_metrics_list:
                 # 평균 계산
@@ -543,6 +347,13 @@ def create_comprehensive_comparison_table(gpt_results, etf_data, equalweight_res
                     avg_metrics[key] = np.mean(
                         [m[key] for m in etf_metrics_list])
 
+                # 표본마다 ETF 지표를 평균한 분포 (점추정과 같은 평균 방식)
+                if etf_draws_list:
+                    ci_draws['ETF_전체'] = {
+                        key: np.mean([d[key] for d in etf_draws_list], axis=0)
+                        for key in COMPARISON_METRIC_KEYS.values()
+                    }
+
                 comparison_data.append({
                     '구분': 'ETF_전체',
                     '유형': 'ETF',
@@ -572,6 +383,10 @@ def create_comprehensive_comparison_table(gpt_results, etf_data, equalweight_res
                         if daily_returns is not None:
                             metrics = calculate_etf_metrics(daily_returns)
                             if metrics:
+                                if n_bootstrap > 0:
+                                    ci_draws[f'ETF_{category}'] = bootstrap_metric_draws(
+                                        {'etf': daily_returns.to_numpy()}, annual_trading_days(daily_returns.index),
+                                        n_bootstrap, block_size)['etf']
                                 comparison_data.append({
                                     '구분': f'ETF_{category}',
                                     '유형': 'ETF',
@@ -588,6 +403,14 @@ def create_comprehensive_comparison_table(gpt_results, etf_data, equalweight_res
                                 })
                                 break
 
+    if ci_draws:
+        comparison_data = [
+            add_ci_columns(row, {col: ci_draws[row['구분']][key]
+                                 for col, key in COMPARISON_METRIC_KEYS.items()})
+            if row['구분'] in ci_draws else row
+            for row in comparison_data
+        ]
+
     comparison_df = pd.DataFrame(comparison_data)
     return comparison_df
 
@@ -703,11 +526,35 @@ def print_formatted_table_enhanced(df, title):
     print('='*140)
 
 
+def build_style_factors(equalweight_results, etf_data, start_date, end_date):
+    """
+    팩터 행렬: MKT = 전체 EqualWeight, HML = KODEX 가치주(VSC) - 성장주(SSC) ETF 일별 수익률
+    (스타일 데이터에는 규모 구분이 없어 SMB 는 marketbench-delta.py 에서만)
+    """
+    etf_returns = {}
+    for etf_info in etf_data.values():
+        if etf_info['kind'] in ('SSC', 'VSC') and etf_info['kind'] not in etf_returns:
+            etf_returns[etf_info['kind']] = calculate_etf_returns(
+                etf_info['prices'], start_date, end_date)[0]
+
+    value, growth = etf_returns.get('VSC'), etf_returns.get('SSC')
+    return build_factor_matrix(
+        MKT=equalweight_results['전체']['equalweight_return'],
+        HML=spread_factor(value, growth) if value is not None and growth is not None else None
+    )
+
+
+# 부트스트랩 신뢰구간 표본 수 (0 이면 점추정만)
+N_BOOTSTRAP = 1000
+# 섹터 / 규모 중립화 그룹 컬럼 (None: 중립화 없음, 예: ['Sector'], ['규모구분'])
+NEUTRALIZE = None
+
+
 # 메인 실행 코드
 if __name__ == "__main__":
     # 1. 데이터 불러오기
-    df = pd.read_csv(
-        '/Users/imdonghyeon/Desktop/Quantlab/final_수정/news_with_style.csv')
+    data_path = '/Users/imdonghyeon/Desktop/Quantlab/final_수정/news_with_style.csv'
+    df = pd.read_csv(data_path)
 
     # 데이터 타입 변환
     df['long_return'] = pd.to_numeric(
@@ -735,24 +582,28 @@ if __name__ == "__main__":
 
     # 3. GPT (델타-뉴트럴) 분석
     print("\n📈 GPT (델타-뉴트럴) 분석 시작...")
-    gpt_results = calculate_delta_neutral_by_category(df)
+    gpt_results = calculate_delta_neutral_by_category(df, neutralize=NEUTRALIZE)
+    if NEUTRALIZE:
+        print(f"⚖️ 중립화: {' × '.join(NEUTRALIZE)} 그룹마다 롱 = 숏 노출")
     print("✓ GPT 분석 완료: 전체, 성장주(혼합형 포함), 가치주(혼합형 포함)")
 
     # 4. EqualWeight 분석
     print("\n📊 EqualWeight 분석 시작...")
-    equalweight_results = calculate_equal_weighted_benchmark(df)
+    equalweight_results = calculate_equal_weighted_benchmark(df, source=data_path)
     print("✓ EqualWeight 분석 완료: 전체, 성장주(혼합형 포함), 가치주(혼합형 포함)")
 
     # 5. ETF 데이터 로드
     etf_file_path = '/Users/imdonghyeon/Desktop/Quantlab/final_수정/KODEX_섹터.xlsx'
 
     try:
-        etf_data = load_etf_data(etf_file_path)
+        # 같은 엑셀 파일이면 벤치마크 저장소에서 (엑셀 재파싱 없음)
+        etf_data = cached_benchmark('etf_prices', file_provenance(etf_file_path),
+                                    lambda: load_etf_data(etf_file_path))
         print(f"\n✅ ETF 데이터 로드 완료: {len(etf_data)}개 ETF")
 
         # 6. 종합 비교 테이블 생성
         comparison_df = create_comprehensive_comparison_table(
-            gpt_results, etf_data, equalweight_results, start_date, end_date
+            gpt_results, etf_data, equalweight_results, start_date, end_date, N_BOOTSTRAP
         )
 
         # 7. 테이블 출력
@@ -768,9 +619,17 @@ if __name__ == "__main__":
         comparison_df.to_csv('gpt_equalweight_etf_comparison.csv',
                              encoding='utf-8-sig', index=False)
 
+        # 10. 다중 팩터 회귀 (전 카테고리 × 롱/숏/롱숏 한 번에, Newey-West t 값)
+        factors = build_style_factors(equalweight_results, etf_data, start_date, end_date)
+        regression_df = factor_regression_table(gpt_results, factors)
+        print(f"\n📐 팩터 회귀 ({', '.join(factors.columns)}):")
+        print(regression_df.round(4).to_string())
+        regression_df.to_csv('factor_regression.csv', encoding='utf-8-sig')
+
         print("\n✅ 통합 분석 완료!")
         print("📁 생성된 파일:")
         print("  - gpt_equalweight_etf_comparison.csv")
+        print("  - factor_regression.csv")
         print("  - comprehensive_analysis/gpt_vs_equalweight_vs_etf_전체.png")
         print("  - comprehensive_analysis/gpt_vs_equalweight_vs_etf_성장주.png")
         print("  - comprehensive_analysis/gpt_vs_equalweight_vs_etf_가치주.png")
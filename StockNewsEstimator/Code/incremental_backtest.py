@@ -0,0 +1,315 @@
+import os
+import numpy as np
+import pandas as pd
+from position_engine import SESSION_RULES, PRICE_FIELDS, prepare_news_arrays, resolve_offsets
+from cost_model import position_costs
+
+# 하루씩 뉴스/가격을 추가하며 백테스트 상태를 갱신 (전체 기간 재계산 없음)
+# 상태: 보유 중(또는 진입 대기) 포지션, 일별 수익률 시계열, 누적곱, 최고점/최대낙폭, 스트리밍 적률
+# 하루 추가 비용은 O(보유 포지션 + 새 뉴스 + 종목 수), 결과는 param_sweep 의 보유일 기준 델타-뉴트럴 집계와 동일
+# (진입/청산 가격 결측 포지션은 진입일/청산일에 제외. 단, exit_shift > 0 으로 여러 날 보유한 포지션의 청산 가격이
+#  결측이면 이전 보유일 수익률은 이미 확정되어 전체 재계산과 다름 — 동일성 확인은 benchmark_aggregates.py)
+
+state_path = '/Users/imdonghyeon/Desktop/Quantlab/portfolio_results/incremental_state.pkl'
+
+SERIES_COLUMNS = ['long_return', 'short_return', 'long_short_return']
+
+POSITION_KEYS = ['sec', 'sign', 'entry_day', 'exit_day', 'entry_field', 'exit_field']
+
+
+def _empty_running():
+    return {
+        'n': 0, 'mean': 0.0, 'M2': 0.0, 'M3': 0.0, 'M4': 0.0,
+        'cum': 1.0, 'peak': 1.0, 'max_drawdown': 0.0,
+        'down_n': 0, 'down_mean': 0.0, 'down_M2': 0.0
+    }
+
+
+def init_state(rules=SESSION_RULES, exit_shift=0, cost_params=None, market=None):
+    """
+    빈 증분 백테스트 상태 생성
+    """
+    return {
+        'rules': rules,
+        'exit_shift': exit_shift,
+        'fields': list(PRICE_FIELDS),
+        'cost_params': cost_params,
+        'market': np.zeros(0, dtype=np.int64) if market is None else np.asarray(market, dtype=np.int64),
+        'dates': [],
+        'prev_log_close': np.zeros(0),
+        'filled_log_close': np.zeros(0),
+        'positions': {k: np.zeros(0, dtype=np.int64) for k in POSITION_KEYS},
+        'series': {c: [] for c in SERIES_COLUMNS + ['n_long', 'n_short']},
+        'running': {c: _empty_running() for c in SERIES_COLUMNS}
+    }
+
+
+def save_state(state, path=state_path):
+    pd.to_pickle(state, path)
+
+
+def load_state(path=state_path):
+    return pd.read_pickle(path)
+
+
+def _grow(state, n_sec):
+    # 새 종목이 생기면 종목별 배열을 NaN / 0 으로 확장
+    k = n_sec - len(state['prev_log_close'])
+    if k > 0:
+        state['prev_log_close'] = np.concatenate(
+            [state['prev_log_close'], np.full(k, np.nan)])
+        state['filled_log_close'] = np.concatenate(
+            [state['filled_log_close'], np.full(k, np.nan)])
+    k = n_sec - len(state['market'])
+    if k > 0:
+        state['market'] = np.concatenate(
+            [state['market'], np.zeros(k, dtype=np.int64)])
+
+
+def _update_running(run, r):
+    """
+    스트리밍 적률 (Welford / Pébay 갱신), 누적곱, 최고점, 최대낙폭, 하방 분산
+    """
+    n1 = run['n']
+    n = n1 + 1
+    delta = r - run['mean']
+    delta_n = delta / n
+    term1 = delta * delta_n * n1
+    run['M4'] += term1 * delta_n * delta_n * (n * n - 3 * n + 3) \
+        + 6 * delta_n * delta_n * run['M2'] - 4 * delta_n * run['M3']
+    run['M3'] += term1 * delta_n * (n - 2) - 3 * delta_n * run['M2']
+    run['M2'] += term1
+    run['mean'] += delta_n
+    run['n'] = n
+
+    run['cum'] *= 1 + r
+    run['peak'] = max(run['peak'], run['cum']) if n1 else run['cum']
+    run['max_drawdown'] = min(run['max_drawdown'],
+                              (run['cum'] - run['peak']) / run['peak'])
+
+    if r < 0:
+        run['down_n'] += 1
+        d = r - run['down_mean']
+        run['down_mean'] += d / run['down_n']
+        run['down_M2'] += d * (r - run['down_mean'])
+
+
+def add_news(state, news_df, date_col='거래일', score_col='GPT_SCORE'):
+    """
+    마지막으로 추가된 거래일까지의 달력으로 뉴스를 해석해 포지션 추가
+    (PRE 뉴스는 해당 거래일, DAY-OFF 뉴스는 다음 거래일 append_day 호출 시 함께 전달)
+    반환: 추가된 포지션 수
+    """
+    dates = pd.DatetimeIndex(state['dates'])
+    arrays = prepare_news_arrays(news_df, {'dates': dates}, date_col, score_col)
+    res = resolve_offsets(arrays, state['fields'], state['rules'], state['exit_shift'])
+
+    # 이미 지나간 진입일(늦게 들어온 뉴스)은 제외
+    today = len(dates) - 1
+    ok = (res['reason'] < 0) & (res['entry_day'] >= today)
+    new = {
+        'sec': arrays['sec'][ok],
+        'sign': np.sign(arrays['score'][ok]).astype(np.int64),
+        'entry_day': res['entry_day'][ok],
+        'exit_day': res['exit_day'][ok],
+        'entry_field': res['entry_field'][ok],
+        'exit_field': res['exit_field'][ok]
+    }
+    pos = state['positions']
+    for k in POSITION_KEYS:
+        pos[k] = np.concatenate([pos[k], new[k].astype(np.int64)])
+    return int(ok.sum())
+
+
+def append_day(state, date, open_prices, close_prices, news_df=None, **news_kwargs):
+    """
+    거래일 하나 추가: 당일 가격(security_id 위치 배열) + 당일까지 들어온 뉴스
+    → 보유 포지션의 당일 구간 수익률 집계 후 시계열/누적 지표 갱신
+    반환: 당일 (롱, 숏, 롱숏) 수익률
+    """
+    open_prices = np.asarray(open_prices, dtype=float)
+    close_prices = np.asarray(close_prices, dtype=float)
+    n_sec = len(close_prices)
+    _grow(state, n_sec)
+
+    t = len(state['dates'])
+    state['dates'].append(pd.Timestamp(date))
+    if news_df is not None and len(news_df):
+        add_news(state, news_df, **news_kwargs)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_close = np.log(np.where(close_prices > 0, close_prices, np.nan))
+        log_open = np.log(np.where(open_prices > 0, open_prices, np.nan))
+    prev = state['prev_log_close'][:n_sec]
+    filled_prev = state['filled_log_close'][:n_sec]
+    filled = np.where(np.isnan(log_close), filled_prev, log_close)
+
+    # 일별 구간 수익률 (build_return_cube 와 같은 정의)
+    cc = np.nan_to_num(np.expm1(filled - filled_prev))
+    oc = np.nan_to_num(np.expm1(log_close - log_open))
+    co = np.nan_to_num(np.expm1(log_open - prev))
+
+    pos = state['positions']
+    # 당일 진입 포지션 중 진입 가격이 없는 것, 당일 청산 포지션 중 청산 가격이 없는 것은 제외
+    # (resolve_entry_exit 의 missing_price 와 같은 기준, 구간 수익률 / 비용 / 보유 수 계산 전에 제거)
+    price_rows = np.vstack([open_prices, close_prices])
+    sec_in = np.clip(pos['sec'], 0, n_sec - 1)
+    entry_px = price_rows[pos['entry_field'], sec_in]
+    exit_px = price_rows[pos['exit_field'], sec_in]
+    bad = ((pos['entry_day'] == t) | (pos['exit_day'] == t)) & (pos['sec'] >= n_sec)
+    bad |= (pos['entry_day'] == t) & (np.isnan(entry_px) | (entry_px == 0))
+    bad |= (pos['exit_day'] == t) & (np.isnan(exit_px) | (exit_px == 0))
+    if bad.any():
+        for k in POSITION_KEYS:
+            pos[k] = pos[k][~bad]
+        sec_in = sec_in[~bad]
+
+    # 포지션별 당일 구간 (daily_portfolio_returns 와 같은 규칙)
+    open_idx = state['fields'].index('Open')
+    e, x = pos['entry_day'], pos['exit_day']
+    open_entry = pos['entry_field'] == open_idx
+    open_exit = pos['exit_field'] == open_idx
+    in_cc = (e + 1 <= t) & (t <= x - open_exit)
+    in_oc = open_entry & (e == t) & ~(open_exit & (x == e))
+    in_co = open_exit & (x == t) & (x > e)
+    seg = np.where(in_cc, cc[sec_in], 0.0) + np.where(in_oc, oc[sec_in], 0.0) \
+        + np.where(in_co, co[sec_in], 0.0)
+    active = in_cc | in_oc | in_co
+
+    # 청산일 비용 (진입 + 청산 비용 일괄)
+    cost = np.zeros(len(seg))
+    exiting = x == t
+    if state['cost_params'] is not None and exiting.any():
+        entry_cost, exit_cost = position_costs(
+            pd.DatetimeIndex(state['dates']), sec_in[exiting], pos['sign'][exiting],
+            e[exiting], x[exiting], state['market'], state['cost_params'])
+        cost[exiting] = entry_cost + exit_cost
+
+    out = {}
+    for col, side in (('long_return', 1), ('short_return', -1)):
+        book = pos['sign'] == side
+        pnl = (side * seg - cost)[book & (active | exiting)].sum()
+        gross = (book & active).sum()
+        out[col] = 0.5 * pnl / gross if gross > 0 else 0.0
+    out['long_short_return'] = out['long_return'] + out['short_return']
+
+    for col in SERIES_COLUMNS:
+        state['series'][col].append(out[col])
+        _update_running(state['running'][col], out[col])
+    state['series']['n_long'].append(int(((pos['sign'] > 0) & active).sum()))
+    state['series']['n_short'].append(int(((pos['sign'] < 0) & active).sum()))
+
+    # 청산 완료 포지션 제거, 가격 상태 갱신
+    done = x <= t
+    for k in POSITION_KEYS:
+        pos[k] = pos[k][~done]
+    state['prev_log_close'][:n_sec] = log_close
+    state['filled_log_close'][:n_sec] = filled
+    return out
+
+
+def daily_frame(state):
+    """
+    일별 수익률 시계열 DataFrame (index: current_date)
+    """
+    return pd.DataFrame(state['series'],
+                        index=pd.DatetimeIndex(state['dates'], name='current_date'))
+
+
+def state_metrics(state):
+    """
+    누적 상태만으로 성과 지표 계산 (calculate_performance_metrics 와 같은 정의, O(1))
+    """
+    dates = state['dates']
+    total_days = (dates[-1] - dates[0]).days if dates else 0
+    trading_days = len(dates)
+    annual_trading_days = trading_days * 365 / total_days if total_days > 0 else 252
+
+    metrics = {}
+    for column in SERIES_COLUMNS:
+        run = state['running'][column]
+        n = run['n']
+        mean_daily_return = run['mean'] if n else np.nan
+        std_daily_return = np.sqrt(run['M2'] / (n - 1)) if n > 1 else np.nan
+        annual_return = (1 + mean_daily_return) ** annual_trading_days - 1
+        annual_vol = std_daily_return * np.sqrt(annual_trading_days)
+        sharpe_ratio = annual_return / annual_vol if annual_vol != 0 else 0
+
+        if run['down_n'] > 0:
+            down_std = np.sqrt(run['down_M2'] / (run['down_n'] - 1)) \
+                if run['down_n'] > 1 else np.nan
+            downside_vol = down_std * np.sqrt(annual_trading_days)
+        else:
+            downside_vol = 0
+        sortino_ratio = annual_return / downside_vol if downside_vol != 0 else 0
+
+        # pandas skew / kurt 와 같은 편향 보정
+        m2, M2, M3, M4 = run['M2'] / n if n else 0, run['M2'], run['M3'], run['M4']
+        if n < 3:
+            skewness = np.nan
+        else:
+            skewness = np.sqrt(n * (n - 1)) / (n - 2) * (M3 / n) / m2 ** 1.5 if m2 > 0 else 0.0
+        if n < 4:
+            kurtosis = np.nan
+        elif M2 == 0:
+            kurtosis = 0.0
+        else:
+            kurtosis = n * (n + 1) * (n - 1) * M4 / ((n - 2) * (n - 3) * M2 ** 2) \
+                - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+
+        metrics[column] = {
+            'total_return': run['cum'] - 1,
+            'annual_return': annual_return,
+            'annual_vol': annual_vol,
+            'sharpe_ratio': sharpe_ratio,
+            'sortino_ratio': sortino_ratio,
+            'max_drawdown': run['max_drawdown'],
+            'mean_daily_return': mean_daily_return,
+            'std_daily_return': std_daily_return,
+            'skewness': skewness,
+            'kurtosis': kurtosis
+        }
+    return metrics
+
+
+# 메인 실행 코드: 저장된 상태 이후의 거래일만 추가
+if __name__ == "__main__":
+    import glob
+    from simu import load_price_data, load_news, stock_path, news_folder
+    from position_engine import build_price_cube
+    from cost_model import COST_PARAMS, market_codes
+
+    price_df, master = load_price_data(stock_path)
+    cube = build_price_cube(price_df)
+    n_sec = cube['prices'].shape[2]
+
+    if os.path.exists(state_path):
+        state = load_state()
+        print(f"📂 상태 로드: {state['dates'][-1].date()} 까지 {len(state['dates'])}일")
+    else:
+        state = init_state(cost_params=COST_PARAMS,
+                           market=market_codes(master, n_sec))
+        print("🆕 새 상태 생성")
+
+    last = state['dates'][-1] if state['dates'] else pd.Timestamp.min
+    new_days = np.flatnonzero(cube['dates'] > last)
+    if len(new_days) == 0:
+        print("⚠️ 추가할 거래일 없음 – 종료")
+        exit()
+
+    # 뉴스는 자신의 날짜 이상인 첫 거래일에 전달 (DAY-OFF 는 다음 거래일)
+    news_df = pd.concat([load_news(p, master) for p in sorted(glob.glob(os.path.join(news_folder, '*.xlsx')))],
+                        ignore_index=True)
+    news_day = np.searchsorted(cube['dates'].to_numpy(),
+                               pd.to_datetime(news_df['거래일']).to_numpy(dtype='datetime64[ns]'))
+    by_day = news_df.groupby(news_day)
+
+    open_idx, close_idx = cube['fields'].index('Open'), cube['fields'].index('Close')
+    for d in new_days:
+        append_day(state, cube['dates'][d], cube['prices'][open_idx, d], cube['prices'][close_idx, d],
+                   by_day.get_group(d) if d in by_day.groups else None)
+    save_state(state)
+
+    m = state_metrics(state)['long_short_return']
+    print(f"✅ {len(new_days)}일 추가 ({cube['dates'][new_days[0]].date()} ~ {cube['dates'][new_days[-1]].date()})")
+    print(f"   누적수익률 {m['total_return']:.2%}, 샤프 {m['sharpe_ratio']:.2f}, MDD {m['max_drawdown']:.2%}")
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+from cost_model import MARKETS
+
+# 지수 헤지: 로컬 KOSPI / KOSDAQ 지수 파일과 가격 큐브로 종목별 롤링 베타를 추정하고,
+# 델타-뉴트럴 북(롱/숏 각 0.5 / n)의 날짜별 순베타만큼 해당 시장 지수를 반대로 보유한다.
+# 롤링 OLS 는 (거래일 × 종목) 누적합 차이로 모든 종목 / 모든 창을 O(거래일 × 종목) 에 계산한다.
+# 수익률 구간: news_with_sector 의 long_return / short_return 은 current_date 의 전일 종가 → 종가 수익률
+# (ETF / 동일가중 벤치마크와 같은 기준) 이고 행에 진입/청산 시각이 없으므로, 헤지도 같은 날 지수 종가 → 종가
+# 수익률을 쓴다. 지수 파일은 종가만 있어 시가 진입 구간 (시가 → 종가) 은 헤지할 수 없다.
+
+index_paths = {
+    'KOSPI': '/Users/imdonghyeon/Desktop/Quantlab/final_수정/KOSPI.csv',
+    'KOSDAQ': '/Users/imdonghyeon/Desktop/Quantlab/final_수정/KOSDAQ.csv'
+}
+
+BETA_WINDOW = 120     # 베타 추정 창 (거래일)
+MIN_BETA_OBS = 60     # 창 안 최소 유효 관측 수 (미만이면 DEFAULT_BETA)
+DEFAULT_BETA = 1.0
+
+# 종목 시장 → 헤지 지수 (코넥스는 코스닥 지수로)
+MARKET_INDEX = {'KOSPI': 'KOSPI', 'KOSDAQ': 'KOSDAQ', 'KONEX': 'KOSDAQ'}
+
+DATE_COLUMNS = ['Date', 'date', '일자', '날짜']
+CLOSE_COLUMNS = ['Close', 'close', '종가', '현재지수']
+
+
+def load_index_file(path):
+    """
+    지수 파일 (csv / xlsx, 날짜 + 종가 컬럼) → 날짜 index 종가 Series
+    """
+    df = pd.read_excel(path) if str(path).endswith(('.xlsx', '.xls')) else pd.read_csv(path)
+    date_col = next((c for c in DATE_COLUMNS if c in df.columns), None)
+    close_col = next((c for c in CLOSE_COLUMNS if c in df.columns), None)
+    if date_col is None or close_col is None:
+        raise KeyError(f"{path}: 날짜 {DATE_COLUMNS} / 종가 {CLOSE_COLUMNS} 컬럼이 필요합니다.")
+
+    close = pd.to_numeric(df[close_col].astype(str).str.replace(',', ''), errors='coerce')
+    series = pd.Series(close.to_numpy(), index=pd.to_datetime(df[date_col])).dropna()
+    return series[~series.index.duplicated(keep='last')].sort_index()
+
+
+def load_index_prices(paths=index_paths):
+    """
+    지수 이름 → 파일 경로 → (거래일 × 지수) 종가 DataFrame
+    """
+    return pd.DataFrame({name: load_index_file(path) for name, path in paths.items()}).sort_index()
+
+
+def index_return_matrix(index_prices, dates):
+    """
+    지수 종가 → 가격 큐브 거래일 기준 전일 종가 대비 수익률 (거래일 × 지수), 지수가 없는 날은 직전 종가 유지
+    행 수익률과 같은 종가 → 종가 구간 (당일 시가 → 종가가 아님)
+    """
+    aligned = index_prices.reindex(index_prices.index.union(pd.DatetimeIndex(dates))).ffill()\
+        .reindex(pd.DatetimeIndex(dates))
+    return (aligned / aligned.shift(1) - 1).to_numpy(dtype=float)
+
+
+def security_index_codes(market, index_names, market_index=MARKET_INDEX):
+    """
+    종목별 시장 코드 (cost_model.MARKETS 순서) → 헤지 지수 열 위치
+    """
+    lookup = np.array([index_names.index(market_index[m]) for m in MARKETS])
+    return lookup[np.asarray(market, dtype=np.int64)]
+
+
+def trailing_window_sum(a, window):
+    """
+    (거래일 × 종목) → 행 t 에 [t-window, t-1] 합 (당일 미포함, t < window 이면 처음부터), 누적합 차이
+    """
+    c = np.cumsum(np.vstack([np.zeros((1, a.shape[1])), a]), axis=0)
+    start = np.maximum(np.arange(len(a)) - window, 0)
+    return c[np.arange(len(a))] - c[start]
+
+
+def rolling_betas(stock_ret, market_ret, window=BETA_WINDOW, min_obs=MIN_BETA_OBS):
+    """
+    (거래일 × 종목) 종목 수익률, 같은 모양의 지수 수익률 → 거래일 t 의 베타 (t-window ~ t-1 창, 당일 미포함)
+    두 수익률이 모두 있는 날만 사용, 누적합 차이로 창 합계 (창 길이와 무관하게 O(거래일 × 종목))
+    유효 관측이 min_obs 미만이거나 지수 분산이 0 이면 NaN
+    """
+    valid = ~(np.isnan(stock_ret) | np.isnan(market_ret))
+    y = np.where(valid, stock_ret, 0.0)
+    x = np.where(valid, market_ret, 0.0)
+
+    n = trailing_window_sum(valid.astype(float), window)
+    sx, sy = trailing_window_sum(x, window), trailing_window_sum(y, window)
+    sxx, sxy = trailing_window_sum(x * x, window), trailing_window_sum(x * y, window)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var_x = sxx - sx ** 2 / n
+        beta = (sxy - sx * sy / n) / var_x
+    return np.where((n >= min_obs) & (var_x > 1e-12), beta, np.nan)
+
+
+def traded_returns(ret_cube):
+    """
+    전일 종가 대비 수익률 (거래일 × 종목), 종가가 없는 날 (거래정지 등) 은 큐브에서 수익률 0 으로 이어지므로 NaN
+    """
+    close = ret_cube['log_price'][ret_cube['fields'].index('Close')]
+    return np.where(np.isnan(close), np.nan, ret_cube['cc'])
+
+
+def build_beta_state(ret_cube, dates, index_prices, market, window=BETA_WINDOW, min_obs=MIN_BETA_OBS):
+    """
+    가격 큐브 수익률 (position_engine.build_return_cube) + 지수 종가 → 헤지 상태
+    beta: (거래일 × 종목) 롤링 베타, index_ret: (거래일 × 지수) 지수 수익률, index_code: 종목별 헤지 지수
+    """
+    index_names = list(index_prices.columns)
+    index_ret = index_return_matrix(index_prices, dates)
+    index_code = security_index_codes(market, index_names)
+    stock_ret = traded_returns(ret_cube)
+
+    return {
+        'dates': pd.DatetimeIndex(dates),
+        'index_names': index_names,
+        'index_ret': index_ret,
+        'index_code': index_code,
+        'beta': rolling_betas(stock_ret, index_ret[:, index_code], window, min_obs)
+    }
+
+
+def row_cube_positions(df, dates, n_sec, id_col='security_id', date_col='current_date'):
+    """
+    행 → (거래일 위치, 거래일 일치 여부, 종목 위치, 종목 유효 여부), 불일치 행의 위치는 0
+    """
+    row_dates = pd.to_datetime(df[date_col]).to_numpy()
+    cube_dates = pd.DatetimeIndex(dates).to_numpy()
+    day = np.searchsorted(cube_dates, row_dates)
+    day_ok = (day < len(cube_dates)) & (cube_dates[np.minimum(day, len(cube_dates) - 1)] == row_dates)
+
+    sec = df[id_col].to_numpy(dtype=np.int64) if id_col in df.columns else np.full(len(df), -1)
+    sec_ok = (sec >= 0) & (sec < n_sec)
+    return np.where(day_ok, day, 0), day_ok, np.where(sec_ok, sec, 0), sec_ok
+
+
+def row_hedge_inputs(df, state, id_col='security_id', date_col='current_date', default_beta=DEFAULT_BETA):
+    """
+    news_with_sector 형식 행 → (행별 베타, 행별 헤지 지수 수익률)
+    지수 수익률은 current_date 의 전일 종가 → 종가 (행의 long_return / short_return 과 같은 구간)
+    베타가 없으면 default_beta, 종목을 모르면 첫 번째 지수 (KOSPI), 거래일이 큐브에 없으면 헤지 없음 (지수 수익률 0)
+    """
+    day, day_ok, sec_c, sec_ok = row_cube_positions(df, state['dates'], state['beta'].shape[1], id_col, date_col)
+
+    beta = np.where(sec_ok & day_ok, state['beta'][day, sec_c], np.nan)
+    beta = np.where(np.isnan(beta), default_beta, beta)
+    index_code = np.where(sec_ok, state['index_code'][sec_c], 0)
+    index_ret = np.where(day_ok, state['index_ret'][day, index_code], 0.0)
+    return beta, np.nan_to_num(index_ret)
@@ -4,32 +4,36 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 import os
-from scipy import stats
+from cost_model import COST_PARAMS, apply_row_costs
+from daily_aggregates import (category_cells, category_membership, delta_neutral_by_category,
+                              delta_neutral_daily, equal_weight_by_category, equal_weight_daily,
+                              hedge_by_category, neutral_delta_neutral_by_category, neutral_group_codes,
+                              neutral_positions, weighted_delta_neutral_by_category, weighted_positions)
+from metrics_kernel import annual_trading_days, compute_metrics
+from weighting import WEIGHT_SCHEMES, rolling_volatility, row_weights, scheme_sweep
+from benchmark_store import equal_weight_benchmarks
+from factor_regression import build_factor_matrix, factor_regression_table, spread_factor
+from bootstrap_ci import BLOCK_SIZE, add_ci_columns, bootstrap_metric_draws
 
 # 한글 폰트 설정 (matplotlib)
 plt.rc('font', family='AppleGothic')
 plt.rcParams['axes.unicode_minus'] = False
 
 
-def calculate_equal_weighted_benchmark(df, category_col='Sector'):
+def calculate_equal_weighted_benchmark(df, category_col='Sector', cells=None, source=None):
     """
     각 카테고리별 동일가중 벤치마크 수익률 계산
+    (전체 + 카테고리 전부를 (카테고리 × 거래일) 셀 집계 한 번으로)
+    source: 뉴스 데이터 파일 경로, 있으면 벤치마크 저장소에서 (같은 파일이면 재계산 없음)
     """
-    benchmark_results = {}
-
-    # 전체 벤치마크
-    all_benchmark = calculate_category_benchmark(df)
-    benchmark_results['전체'] = all_benchmark
-
-    # 카테고리별 벤치마크
-    categories = df[category_col].unique()
-    for category in categories:
-        category_df = df[df[category_col] == category].copy()
-        if len(category_df) > 0:
-            category_benchmark = calculate_category_benchmark(category_df)
-            benchmark_results[category] = category_benchmark
+    # current_date를 datetime으로 변환
+    df['current_date'] = pd.to_datetime(df['current_date'])
+    if source is not None:
+        return equal_weight_benchmarks(df, category_col, return_col='benchmark_return', source=source)
+    if cells is None:
+        cells = category_cells(df, category_membership(df, category_col))
 
-    return benchmark_results
+    return equal_weight_by_category(df, cells, 'benchmark_return')
 
 
 def calculate_category_benchmark(df):
@@ -40,72 +44,61 @@ def calculate_category_benchmark(df):
     # current_date를 datetime으로 변환
     df['current_date'] = pd.to_datetime(df['current_date'])
 
-    # 각 날짜별로 그룹화
-    grouped = df.groupby('current_date')
-
-    daily_benchmark = []
-
-    for date, group in grouped:
-        # 각 종목의 평균 수익률: (long_return + short_return) / 2
-        # 포지션 유무에 관계없이 모든 종목을 포함
-        group['avg_return'] = (group['long_return'] +
-                               group['short_return']) / 2
-
-        # 모든 종목의 평균 수익률을 동일가중으로 계산
-        all_returns = group['avg_return']
-        benchmark_return = all_returns.mean() if not all_returns.empty else 0
-
-        daily_benchmark.append({
-            'current_date': date,
-            'benchmark_return': benchmark_return,
-            'n_stocks': len(all_returns)  # 모든 종목 수
-        })
-
-    # 데이터프레임으로 변환
-    benchmark_df = pd.DataFrame(daily_benchmark).set_index('current_date')
-
-    # 누적 수익률 계산
-    benchmark_df['cumulative_return'] = (
-        1 + benchmark_df['benchmark_return']).cumprod()
+    # 날짜 정수 코드별 bincount 로 일별 평균 (daily_aggregates)
+    return equal_weight_daily(df, 'benchmark_return')
 
-    return benchmark_df
 
-
-def calculate_delta_neutral_by_category_with_benchmark(df, category_col='규모구분'):
+def calculate_delta_neutral_by_category_with_benchmark(df, category_col='규모구분', cost_params=None, source=None,
+                                                      hedge_inputs=None, weights=None, name_cap=None,
+                                                      neutralize=None):
     """
     카테고리별 델타-뉴트럴 방식으로 누적 수익률 계산 (벤치마크 포함)
+    cost_params 가 있으면 전략 수익률에서만 거래비용 차감 (벤치마크는 비용 없는 시장 평균)
+    source: 뉴스 데이터 파일 경로, 있으면 벤치마크는 저장소에서
+    hedge_inputs: (행별 베타, 행별 지수 수익률) (index_hedge.row_hedge_inputs), 있으면 순베타 지수 헤지 열 추가
+                  (순베타는 weights / name_cap / neutralize 를 반영한 실제 북 비중 기준)
+    weights / name_cap: 행별 원시 가중치 (weighting.row_weights) / 종목당 최대 비중, 없으면 롱/숏 각 동일가중
+    neutralize: 중립화 그룹 컬럼 (예: ['Sector'], ['Sector', '규모구분']), 있으면 날짜 × 그룹마다 롱 = 숏 노출
     """
+    if neutralize and (weights is not None or name_cap is not None):
+        raise ValueError("neutralize 는 롱 +1 / 숏 -1 신호의 그룹 평균 차감이므로 weights / name_cap 과 같이 쓸 수 없습니다.")
     # current_date를 datetime으로 변환
     df['current_date'] = pd.to_datetime(df['current_date'])
 
+    # 카테고리 소속 (전체 포함) → 셀 인덱스는 한 번만 만들어 벤치마크/전략에 같이 사용
+    cells = category_cells(df, category_membership(df, category_col))
+
     # 벤치마크 데이터 계산
-    benchmark_results = calculate_equal_weighted_benchmark(df, category_col)
+    benchmark_results = calculate_equal_weighted_benchmark(df, category_col, cells, source)
+    if cost_params is not None:
+        df = apply_row_costs(df, cost_params)
+
+    # 전체 + 카테고리별 일별 수익률 (행 순서가 같으므로 비용 차감 후에도 같은 셀 사용)
+    positions = None
+    if neutralize:
+        group_codes = neutral_group_codes(df, neutralize)
+        daily_results = neutral_delta_neutral_by_category(df, cells, group_codes)
+        positions = neutral_positions(df, cells, group_codes)
+    elif weights is None and name_cap is None:
+        daily_results = delta_neutral_by_category(df, cells)
+    else:
+        weights = np.ones(len(df)) if weights is None else weights
+        daily_results = weighted_delta_neutral_by_category(df, cells, weights, name_cap)
+        positions = weighted_positions(df, cells, weights, name_cap)
+    if hedge_inputs is not None:
+        hedge_results = hedge_by_category(df, cells, *hedge_inputs, positions=positions)
+        for category, daily in daily_results.items():
+            daily[['net_beta', 'hedge_return']] = hedge_results[category]
+            daily['hedged_return'] = daily['long_short_return'] + daily['hedge_return']
 
-    # 전체 결과 저장
     all_results = {}
-
-    # 1. 전체 포트폴리오 계산
-    all_cum, all_daily = calculate_delta_neutral_returns(df)
-    all_results['전체'] = {
-        'cumulative': all_cum,
-        'daily': all_daily,
-        'benchmark': benchmark_results['전체'],
-        'metrics': calculate_performance_metrics_with_benchmark(all_daily, benchmark_results['전체'])
-    }
-
-    # 2. 카테고리별 계산
-    categories = df[category_col].unique()
-
-    for category in categories:
-        category_df = df[df[category_col] == category].copy()
-        if len(category_df) > 0:
-            cat_cum, cat_daily = calculate_delta_neutral_returns(category_df)
-            all_results[category] = {
-                'cumulative': cat_cum,
-                'daily': cat_daily,
-                'benchmark': benchmark_results[category],
-                'metrics': calculate_performance_metrics_with_benchmark(cat_daily, benchmark_results[category])
-            }
+    for category, daily in daily_results.items():
+        all_results[category] = {
+            'cumulative': calculate_cumulative_returns(daily),
+            'daily': daily,
+            'benchmark': benchmark_results[category],
+            'metrics': calculate_performance_metrics_with_benchmark(daily, benchmark_results[category])
+        }
 
     return all_results
 
@@ -117,182 +110,73 @@ def calculate_delta_neutral_returns(df):
     # current_date를 datetime으로 변환
     df['current_date'] = pd.to_datetime(df['current_date'])
 
-    # 각 날짜별로 그룹화
-    grouped = df.groupby('current_date')
-
-    # 일별 수익률 저장할 리스트
-    daily_results = []
-
-    for date, group in grouped:
-        # 롱 포지션과 숏 포지션 분리
-        long_positions = group[group['long_return'] != 0]
-        short_positions = group[group['short_return'] != 0]
-
-        # 롱과 숏 종목 수
-        n_long = len(long_positions)
-        n_short = len(short_positions)
-
-        # 델타-뉴트럴 가중치 계산
-        if n_long > 0:
-            long_weight = 0.5 / n_long
-            weighted_long_return = (
-                long_positions['long_return'] * long_weight).sum()
-        else:
-            weighted_long_return = 0
-
-        if n_short > 0:
-            short_weight = 0.5 / n_short
-            weighted_short_return = (
-                short_positions['short_return'] * short_weight).sum()
-        else:
-            weighted_short_return = 0
-
-        # 롱숏 합산 수익률
-        long_short_return = weighted_long_return + weighted_short_return
-
-        daily_results.append({
-            'current_date': date,
-            'long_return': weighted_long_return,
-            'short_return': weighted_short_return,
-            'long_short_return': long_short_return,
-            'n_long': n_long,
-            'n_short': n_short,
-            'n_total': n_long + n_short
-        })
-
-    # 데이터프레임으로 변환
-    daily_returns = pd.DataFrame(daily_results).set_index('current_date')
-
-    # 누적 수익률 계산
+    # 날짜 정수 코드별 bincount 로 롱/숏 종목 수와 0.5/n 가중 수익률 (daily_aggregates)
+    daily_returns = delta_neutral_daily(df)
+
+    return calculate_cumulative_returns(daily_returns), daily_returns
+
+
+def calculate_cumulative_returns(daily_returns):
+    """
+    일별 델타-뉴트럴 수익률 → Long / Short / Long+Short 누적 수익률
+    """
     cumulative_returns = pd.DataFrame(index=daily_returns.index)
     cumulative_returns['Long'] = (1 + daily_returns['long_return']).cumprod()
     cumulative_returns['Short'] = (1 + daily_returns['short_return']).cumprod()
     cumulative_returns['Long+Short'] = (1 +
                                         daily_returns['long_short_return']).cumprod()
+    if 'hedged_return' in daily_returns.columns:
+        cumulative_returns['Long+Short (Hedged)'] = (1 + daily_returns['hedged_return']).cumprod()
 
-    return cumulative_returns, daily_returns
+    return cumulative_returns
 
 
-def calculate_performance_metrics_with_benchmark(daily_returns, benchmark_data):
-    """
-    벤치마크를 포함한 성과 지표 계산
-    """
-    metrics = {}
+# 전략 / 벤치마크 지표 키 (metrics_kernel.compute_metrics 결과에서 선택)
+STRATEGY_METRIC_KEYS = ['total_return', 'annual_return', 'annual_vol', 'sharpe_ratio',
+                        'sortino_ratio', 'calmar_ratio', 'max_drawdown', 'beta', 'alpha',
+                        'information_ratio', 'tracking_error', 'var_95', 'cvar_95',
+                        'downside_volatility', 'correlation']
+BENCHMARK_METRIC_KEYS = ['total_return', 'annual_return', 'annual_vol', 'sharpe_ratio',
+                         'max_drawdown', 'var_95', 'cvar_95']
 
-    # 실제 거래일 수 계산
-    start_date = daily_returns.index.min()
-    end_date = daily_returns.index.max()
-    total_days = (end_date - start_date).days
-    trading_days = len(daily_returns)
 
-    # 연간 거래일 수 추정
-    annual_trading_days = trading_days * 365 / total_days if total_days > 0 else 252
+def calculate_performance_metrics_with_benchmark(daily_returns, benchmark_data, annual_days=None):
+    """
+    벤치마크를 포함한 성과 지표 계산 (롱 / 숏 / 롱숏 / 벤치마크 네 열을 한 번에)
+    annual_days: None 이면 실제 기간으로 연간 거래일 수 추정
+    """
+    columns = [c for c in ['long_return', 'short_return', 'long_short_return', 'hedged_return']
+               if c in daily_returns.columns]
 
     # 벤치마크 수익률 (날짜 매칭)
     benchmark_returns = benchmark_data['benchmark_return'].reindex(
         daily_returns.index).fillna(0)
 
-    for column in ['long_return', 'short_return', 'long_short_return']:
-        returns = daily_returns[column]
-
-        # 기본 지표들
-        annual_return = (1 + returns.mean()) ** annual_trading_days - 1
-        annual_vol = returns.std() * np.sqrt(annual_trading_days)
-        sharpe_ratio = annual_return / annual_vol if annual_vol != 0 else 0
-
-        # 최대 낙폭
-        cumulative = (1 + returns).cumprod()
-        running_max = cumulative.cummax()
-        drawdown = (cumulative - running_max) / running_max
-        max_drawdown = drawdown.min()
-
-        # 누적 수익률
-        total_return = (1 + returns).prod() - 1
-
-        # 벤치마크 대비 지표들
-        excess_returns = returns - benchmark_returns
-
-        # 알파, 베타 (CAPM)
-        if len(returns) > 1 and benchmark_returns.std() != 0:
-            try:
-                beta, alpha_intercept, r_value, p_value, std_err = stats.linregress(
-                    benchmark_returns, returns)
-                alpha = alpha_intercept * annual_trading_days
-            except:
-                beta, alpha, r_value = 0, 0, 0
-        else:
-            beta, alpha, r_value = 0, 0, 0
-
-        # 정보비율 (Information Ratio)
-        tracking_error = excess_returns.std() * np.sqrt(annual_trading_days)
-        information_ratio = (annual_return - benchmark_returns.mean() *
-                             annual_trading_days) / tracking_error if tracking_error != 0 else 0
-
-        # 소르티노 비율 (Sortino Ratio)
-        downside_returns = returns[returns < 0]
-        downside_vol = downside_returns.std(
-        ) * np.sqrt(annual_trading_days) if len(downside_returns) > 0 else 0
-        sortino_ratio = annual_return / downside_vol if downside_vol != 0 else 0
-
-        # 칼마 비율 (Calmar Ratio)
-        calmar_ratio = annual_return / \
-            abs(max_drawdown) if max_drawdown != 0 else 0
-
-        # VaR & CVaR (95% 신뢰수준)
-        var_95 = np.percentile(returns, 5)
-        cvar_95 = returns[returns <= var_95].mean() if len(
-            returns[returns <= var_95]) > 0 else var_95
-
-        # 하향 변동성 (연율화)
-        downside_volatility = downside_vol
-
-        metrics[column] = {
-            'total_return': total_return,
-            'annual_return': annual_return,
-            'annual_vol': annual_vol,
-            'sharpe_ratio': sharpe_ratio,
-            'sortino_ratio': sortino_ratio,
-            'calmar_ratio': calmar_ratio,
-            'max_drawdown': max_drawdown,
-            'beta': beta,
-            'alpha': alpha,
-            'information_ratio': information_ratio,
-            'tracking_error': tracking_error,
-            'var_95': var_95,
-            'cvar_95': cvar_95,
-            'downside_volatility': downside_volatility,
-            'correlation': r_value
-        }
-
-    # 벤치마크 지표도 추가
-    benchmark_annual_return = (
-        1 + benchmark_returns.mean()) ** annual_trading_days - 1
-    benchmark_annual_vol = benchmark_returns.std() * np.sqrt(annual_trading_days)
-    benchmark_sharpe = benchmark_annual_return / \
-        benchmark_annual_vol if benchmark_annual_vol != 0 else 0
-    benchmark_cumulative = (1 + benchmark_returns).cumprod()
-    benchmark_running_max = benchmark_cumulative.cummax()
-    benchmark_drawdown = (benchmark_cumulative -
-                          benchmark_running_max) / benchmark_running_max
-    benchmark_max_drawdown = benchmark_drawdown.min()
-    benchmark_total_return = (1 + benchmark_returns).prod() - 1
-
-    metrics['benchmark'] = {
-        'total_return': benchmark_total_return,
-        'annual_return': benchmark_annual_return,
-        'annual_vol': benchmark_annual_vol,
-        'sharpe_ratio': benchmark_sharpe,
-        'max_drawdown': benchmark_max_drawdown,
-        'var_95': np.percentile(benchmark_returns, 5),
-        'cvar_95': benchmark_returns[benchmark_returns <= np.percentile(benchmark_returns, 5)].mean()
-    }
+    frame = daily_returns[columns].assign(benchmark=benchmark_returns)
+    table = compute_metrics(frame, benchmark=benchmark_returns, annual_days=annual_days)
 
+    metrics = {column: table.loc[column, STRATEGY_METRIC_KEYS].to_dict() for column in columns}
+    metrics['benchmark'] = table.loc['benchmark', BENCHMARK_METRIC_KEYS].to_dict()
     return metrics
 
 
-def create_comprehensive_summary_table(all_results):
+def bootstrap_category_draws(data, n_bootstrap, block_size=BLOCK_SIZE):
+    """
+    카테고리 하나의 롱숏/벤치마크 일별 수익률 → 같은 인덱스로 재표집한 지표 표본
+    """
+    daily = data['daily']
+    benchmark_returns = data['benchmark']['benchmark_return'].reindex(
+        daily.index).fillna(0)
+    return bootstrap_metric_draws({
+        'long_short_return': daily['long_short_return'].to_numpy(),
+        'benchmark': benchmark_returns.to_numpy()
+    }, annual_trading_days(daily.index), n_bootstrap, block_size)
+
+
+def create_comprehensive_summary_table(all_results, n_bootstrap=0, block_size=BLOCK_SIZE):
     """
     벤치마크를 포함한 종합 요약 테이블 생성 (Long, Short, Long+Short, Benchmark)
+    n_bootstrap > 0 이면 정상 부트스트랩 95% 신뢰구간 컬럼 추가
     """
     summary_data = []
 
@@ -310,7 +194,7 @@ def create_comprehensive_summary_table(all_results):
             # 일평균 전체 종목 수 (벤치마크에 포함된 모든 종목)
             avg_total_stocks = data['benchmark']['n_stocks'].mean()
 
-            summary_data.append({
+            row = {
                 '전략 유형': category,
                 '최종 누적수익률': longshort_metrics['total_return'],
                 '연율화 수익률': longshort_metrics['annual_return'],
@@ -323,7 +207,22 @@ def create_comprehensive_summary_table(all_results):
                 '첨도': daily['long_short_return'].kurtosis(),
                 '최대 수익': daily['long_short_return'].max(),
                 '최소 수익': daily['long_short_return'].min()
-            })
+            }
+            if n_bootstrap > 0:
+                draws = bootstrap_category_draws(data, n_bootstrap, block_size)
+                ls, bm = draws['long_short_return'], draws['benchmark']
+                row = add_ci_columns(row, {
+                    '최종 누적수익률': ls['total_return'],
+                    '연율화 수익률': ls['annual_return'],
+                    '벤치마크 대비 초과수익률': ls['annual_return'] - bm['annual_return'],
+                    '일 표준편차': ls['std_daily_return'],
+                    '일 분산': ls['var_daily_return'],
+                    '왜도': ls['skewness'],
+                    '첨도': ls['kurtosis'],
+                    '최대 수익': ls['max_daily_return'],
+                    '최소 수익': ls['min_daily_return']
+                })
+            summary_data.append(row)
 
     summary_df = pd.DataFrame(summary_data)
 
@@ -350,13 +249,18 @@ def create_four_strategy_comparison_table(all_results):
             longshort_metrics = data['metrics']['long_short_return']
             benchmark_metrics = data['metrics']['benchmark']
 
-            comparison_data.append({
+            row = {
                 '전략 유형': category,
                 'Long (50%)': long_metrics['total_return'],
                 'Short (50%)': short_metrics['total_return'],
                 'Long+Short (Delta-Neutral)': longshort_metrics['total_return'],
                 'Market Average Benchmark': benchmark_metrics['total_return']
-            })
+            }
+            # 지수 헤지 결과가 있으면 헤지 후 롱숏과 평균 순베타
+            if 'hedged_return' in data['metrics']:
+                row['Long+Short (Index-Hedged)'] = data['metrics']['hedged_return']['total_return']
+                row['평균 순베타'] = data['daily']['net_beta'].mean()
+            comparison_data.append(row)
 
     comparison_df = pd.DataFrame(comparison_data)
 
@@ -370,9 +274,10 @@ def create_four_strategy_comparison_table(all_results):
     return comparison_df
 
 
-def create_risk_adjusted_metrics_table(all_results):
+def create_risk_adjusted_metrics_table(all_results, n_bootstrap=0, block_size=BLOCK_SIZE):
     """
     위험조정 지표 테이블 생성
+    n_bootstrap > 0 이면 정상 부트스트랩 95% 신뢰구간 컬럼 추가
     """
     risk_data = []
 
@@ -383,7 +288,7 @@ def create_risk_adjusted_metrics_table(all_results):
             longshort_metrics = data['metrics']['long_short_return']
             benchmark_metrics = data['metrics']['benchmark']
 
-            risk_data.append({
+            row = {
                 '전략 유형': category,
                 '샤프 비율': longshort_metrics['sharpe_ratio'],
                 '소르티노 비율': longshort_metrics['sortino_ratio'],
@@ -391,7 +296,19 @@ def create_risk_adjusted_metrics_table(all_results):
                 'VaR (95%)': longshort_metrics['var_95'],
                 'CVaR (95%)': longshort_metrics['cvar_95'],
                 '하향 변동성(연율화)': longshort_metrics['downside_volatility']
-            })
+            }
+            if n_bootstrap > 0 and 'daily' in data:
+                ls = bootstrap_category_draws(data, n_bootstrap, block_size)[
+                    'long_short_return']
+                row = add_ci_columns(row, {
+                    '샤프 비율': ls['sharpe_ratio'],
+                    '소르티노 비율': ls['sortino_ratio'],
+                    '칼마 비율': ls['calmar_ratio'],
+                    'VaR (95%)': ls['var_95'],
+                    'CVaR (95%)': ls['cvar_95'],
+                    '하향 변동성(연율화)': ls['downside_volatility']
+                })
+            risk_data.append(row)
 
     risk_df = pd.DataFrame(risk_data)
 
@@ -458,6 +375,9 @@ def plot_comprehensive_analysis(all_results, save_dir='comprehensive_analysis'):
                     label='Short (50%)', linewidth=2.5, color='red')
             ax.plot(data['cumulative'].index, data['cumulative']['Long+Short'],
                     label='Long+Short (Delta-Neutral)', linewidth=2.5, color='green')
+            if 'Long+Short (Hedged)' in data['cumulative'].columns:
+                ax.plot(data['cumulative'].index, data['cumulative']['Long+Short (Hedged)'],
+                        label='Long+Short (Index-Hedged)', linewidth=2.5, color='purple')
 
             # 벤치마크
             ax.plot(data['benchmark'].index, data['benchmark']['cumulative_return'],
@@ -494,11 +414,12 @@ def print_formatted_table_enhanced(df, title):
             df_formatted[col] = df_formatted[col].apply(
                 lambda x: f"{x:,.1f}" if pd.notna(x) else '')
         elif col in ['최종 누적수익률', '연율화 수익률', '벤치마크 대비 초과수익률',
-                     'Long (50%)', 'Short (50%)', 'Long+Short (Delta-Neutral)', 'Market Average Benchmark']:
+                     'Long (50%)', 'Short (50%)', 'Long+Short (Delta-Neutral)', 'Market Average Benchmark',
+                     'Long+Short (Index-Hedged)']:
             df_formatted[col] = df_formatted[col].apply(
                 lambda x: f"{x:.2%}" if isinstance(x, (int, float)) else x)
         elif col in ['일 표준편차', '일 분산', '왜도', '첨도', '최대 수익', '최소 수익',
-                     'VaR (95%)', 'CVaR (95%)', '하향 변동성(연율화)']:
+                     'VaR (95%)', 'CVaR (95%)', '하향 변동성(연율화)', '평균 순베타']:
             df_formatted[col] = df_formatted[col].apply(
                 lambda x: f"{x:.4f}" if isinstance(x, (int, float)) else x)
         elif col in ['샤프 비율', '소르티노 비율', '칼마 비율']:
@@ -509,11 +430,41 @@ def print_formatted_table_enhanced(df, title):
     print('='*100)
 
 
+def build_size_factors(all_results, small='소형주', large='대형주'):
+    """
+    팩터 행렬: MKT = 전체 시장 평균 벤치마크, SMB = 소형주 - 대형주 시장 평균 (규모구분 분석일 때)
+    """
+    benchmark = {category: data['benchmark']['benchmark_return'] for category, data in all_results.items()}
+    return build_factor_matrix(
+        MKT=benchmark['전체'],
+        SMB=spread_factor(benchmark[small], benchmark[large]) if small in benchmark and large in benchmark else None
+    )
+
+
+# 거래비용 (수수료/스프레드/매도세/대차비용) 차감 여부
+APPLY_COSTS = False
+# KOSPI/KOSDAQ 지수 헤지 (가격 큐브 롤링 베타 × 일별 순베타) 열 추가 여부, 지수 파일은 index_hedge.index_paths
+# (행 수익률을 current_date 종가 → 종가로 보고 같은 날 지수 종가 → 종가 수익률로 헤지)
+HEDGE_INDEX = False
+# 롱/숏 북 안 가중치 ('equal' / 'inverse_vol' / 'market_cap' / 'score', weighting.WEIGHT_SCHEMES) 와 종목당 최대 비중
+WEIGHTING = 'equal'
+NAME_CAP = None
+# 사용 가능한 모든 가중치 방식을 카테고리 전체에 대해 비교
+COMPARE_WEIGHTINGS = False
+# 섹터 / 규모 중립화 그룹 컬럼 (None: 중립화 없음, ['Sector'], ['규모구분'], ['Sector', '규모구분'])
+NEUTRALIZE = None
+# 평균-분산 최적화 북 (mv_optimizer, 증분 Ledoit-Wolf 공분산 + 총/순/종목/섹터 제약) 을 전체 카테고리와 비교
+OPTIMIZE = False
+stock_path = '/Users/imdonghyeon/Desktop/Quantlab/stockdata.xlsx'
+# 부트스트랩 신뢰구간 표본 수 (0 이면 점추정만)
+N_BOOTSTRAP = 1000
+
+
 # 메인 실행 코드
 if __name__ == "__main__":
     # 1. 데이터 불러오기
-    df = pd.read_csv(
-        '/Users/imdonghyeon/Desktop/Quantlab/final_수정/news_with_sector.csv')
+    data_path = '/Users/imdonghyeon/Desktop/Quantlab/final_수정/news_with_sector.csv'
+    df = pd.read_csv(data_path)
 
     # 데이터 타입 변환
     df['long_return'] = pd.to_numeric(
@@ -529,8 +480,74 @@ if __name__ == "__main__":
     print(f"규모구분 종류: {df['규모구분'].nunique()}개")
     print(f"규모구분 목록: {sorted(df['규모구분'].dropna().unique())}")
 
+    # 가격 큐브 (지수 헤지 베타 / 역변동성 가중치용)
+    price_cube = ret_cube = None
+    if HEDGE_INDEX or WEIGHTING == 'inverse_vol' or COMPARE_WEIGHTINGS or OPTIMIZE:
+        from simu import load_price_data
+        from position_engine import build_price_cube, build_return_cube
+        from security_ids import attach_security_id
+        from index_hedge import traded_returns
+
+        price_df, master = load_price_data(stock_path)
+        price_cube = build_price_cube(price_df)
+        ret_cube = build_return_cube(price_cube)
+        df = attach_security_id(df, master)
+
+    # 지수 헤지 입력: 종목별 롤링 베타 (가격 큐브) 와 시장 지수 수익률을 행 단위로
+    hedge_inputs = None
+    if HEDGE_INDEX:
+        from cost_model import market_codes
+        from index_hedge import build_beta_state, load_index_prices, row_hedge_inputs
+
+        beta_state = build_beta_state(ret_cube, price_cube['dates'], load_index_prices(),
+                                      market_codes(master, price_cube['prices'].shape[2]))
+        hedge_inputs = row_hedge_inputs(df, beta_state)
+        print(f"🛡️ 지수 헤지: {beta_state['index_names']}, 행별 평균 베타 {hedge_inputs[0].mean():.3f}")
+
+    # 가중치 방식별 행 가중치 (사용 가능한 방식만)
+    volatility = rolling_volatility(traded_returns(ret_cube)) if ret_cube is not None else None
+    available = {'equal': True, 'inverse_vol': volatility is not None,
+                 'market_cap': '시가총액' in df.columns, 'score': 'GPT_SCORE' in df.columns}
+    if WEIGHTING not in available:
+        raise ValueError(f"WEIGHTING 은 {WEIGHT_SCHEMES} 중 하나: {WEIGHTING}")
+    if not available[WEIGHTING]:
+        required = {'inverse_vol': '가격 큐브 (stock_path)', 'market_cap': "'시가총액' 컬럼", 'score': "'GPT_SCORE' 컬럼"}
+        raise ValueError(f"WEIGHTING = '{WEIGHTING}' 에 필요한 {required[WEIGHTING]} 이 없습니다: {data_path}")
+    scheme_weights = {scheme: row_weights(df, scheme, price_cube['dates'] if price_cube is not None else None, volatility)
+                      for scheme in WEIGHT_SCHEMES if available[scheme] and (COMPARE_WEIGHTINGS or scheme == WEIGHTING)}
+
     # 3. 벤치마크를 포함한 카테고리별 델타-뉴트럴 분석
-    all_results = calculate_delta_neutral_by_category_with_benchmark(df)
+    all_results = calculate_delta_neutral_by_category_with_benchmark(
+        df, cost_params=COST_PARAMS if APPLY_COSTS else None, source=data_path, hedge_inputs=hedge_inputs,
+        weights=None if WEIGHTING == 'equal' else scheme_weights[WEIGHTING], name_cap=NAME_CAP,
+        neutralize=NEUTRALIZE)
+    if NEUTRALIZE:
+        print(f"⚖️ 중립화: {' × '.join(NEUTRALIZE)} 그룹마다 롱 = 숏 노출")
+
+    # 가중치 방식 비교 (모든 카테고리 × 방식, 롱숏 수익률 기준)
+    if COMPARE_WEIGHTINGS:
+        cells = category_cells(df, category_membership(df, '규모구분'))
+        weighting_df = scheme_sweep(df, cells, scheme_weights, NAME_CAP)
+        print("\n⚖️ 가중치 방식 비교 (Long+Short):")
+        print(weighting_df.round(4).to_string())
+        weighting_df.to_csv('weighting_comparison.csv', encoding='utf-8-sig')
+
+    # 평균-분산 최적화 북 vs 0.5/n 델타-뉴트럴 (전체)
+    if OPTIMIZE:
+        from mv_optimizer import optimized_daily
+
+        # 델타-뉴트럴 결과와 같은 기준으로 비교: APPLY_COSTS 이면 최적화 북도 행 수익률에서 비용 차감 (|비중| 비례)
+        optimizer_input = apply_row_costs(df, COST_PARAMS) if APPLY_COSTS else df
+        optimized = optimized_daily(optimizer_input, traded_returns(ret_cube), price_cube['dates'])
+        optimizer_df = compute_metrics(pd.DataFrame({
+            'Delta-Neutral (0.5/n)': all_results['전체']['daily']['long_short_return'],
+            'Mean-Variance': optimized['long_short_return']
+        }).sort_index().fillna(0))
+        print(f"\n🧮 평균-분산 최적화 ({'비용 차감' if APPLY_COSTS else '비용 전'}, "
+              f"평균 총노출 {optimized['gross'].mean():.3f}, "
+              f"평균 축소 강도 {optimized['shrinkage'].mean():.3f}):")
+        print(optimizer_df.round(4).to_string())
+        optimized.to_csv('mv_optimized_daily.csv', encoding='utf-8-sig')
 
     # 4. Long Only, Short Only, Long+Short, Market Average Benchmark 비교 테이블
     four_strategy_df = create_four_strategy_comparison_table(all_results)
@@ -538,11 +555,11 @@ if __name__ == "__main__":
         four_strategy_df, "Delta-Neutral Portfolio vs Market Average Benchmark 최종 누적수익률 비교")
 
     # 5. 종합 요약 테이블 (Statistical Measures)
-    summary_df = create_comprehensive_summary_table(all_results)
+    summary_df = create_comprehensive_summary_table(all_results, N_BOOTSTRAP)
     print_formatted_table_enhanced(summary_df, "Statistical Measures")
 
     # 6. 위험조정 지표 테이블 (Risk-Adjusted Metrics)
-    risk_df = create_risk_adjusted_metrics_table(all_results)
+    risk_df = create_risk_adjusted_metrics_table(all_results, N_BOOTSTRAP)
     print_formatted_table_enhanced(risk_df, "Risk-Adjusted Metrics")
 
     # 7. 종합 분석 그래프 생성
@@ -556,6 +573,13 @@ if __name__ == "__main__":
     risk_df.to_csv('risk_adjusted_metrics.csv',
                    encoding='utf-8-sig', index=False)
 
+    # 다중 팩터 회귀 (전 카테고리 × 롱/숏/롱숏 한 번에, Newey-West t 값)
+    factors = build_size_factors(all_results)
+    regression_df = factor_regression_table(all_results, factors)
+    print(f"\n📐 팩터 회귀 ({', '.join(factors.columns)}):")
+    print(regression_df.round(4).to_string())
+    regression_df.to_csv('factor_regression.csv', encoding='utf-8-sig')
+
     # 9. 각 카테고리별 상세 성과 분석
     print("\n" + "="*100)
     print("카테고리별 상세 성과 분석")
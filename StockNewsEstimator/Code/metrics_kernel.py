@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+# 성과 지표를 (시계열 × 거래일) 행렬에 대해 한 번에 계산하는 커널
+# 행 하나가 수익률 시계열 하나 (전략, 순열, 부트스트랩 표본 등), 정의는 calculate_performance_metrics 계열과 동일
+
+
+def annual_trading_days(dates):
+    """
+    실제 기간으로 추정한 연간 거래일 수 (기간이 0 이면 252)
+    """
+    dates = pd.DatetimeIndex(dates)
+    total_days = (dates.max() - dates.min()).days if len(dates) else 0
+    return len(dates) * 365 / total_days if total_days > 0 else 252
+
+
+def matrix_metrics(returns, annual_days=252):
+    """
+    (시계열 × 거래일) 수익률 행렬 → 지표별 배열 dict
+    표본 표준편차(ddof=1), 왜도/첨도는 pandas 와 같은 편향 보정, VaR 는 5% 분위수(선형 보간)
+    """
+    returns = np.atleast_2d(np.asarray(returns, dtype=float))
+    n = returns.shape[1]
+
+    mean = returns.mean(axis=1)
+    dev = returns - mean[:, None]
+    M2 = (dev ** 2).sum(axis=1)
+    M3 = (dev ** 3).sum(axis=1)
+    M4 = (dev ** 4).sum(axis=1)
+    var = M2 / (n - 1) if n > 1 else np.full(len(mean), np.nan)
+    std = np.sqrt(var)
+
+    annual_return = (1 + mean) ** annual_days - 1
+    annual_vol = std * np.sqrt(annual_days)
+
+    # 하방 변동성: 음수 수익률만의 표본 표준편차 (없으면 0, 하나면 NaN)
+    neg = returns < 0
+    n_neg = neg.sum(axis=1)
+    neg_mean = np.where(neg, returns, 0).sum(axis=1) / np.maximum(n_neg, 1)
+    neg_var = np.where(neg, (returns - neg_mean[:, None]) ** 2, 0).sum(axis=1) \
+        / np.maximum(n_neg - 1, 1)
+    downside_vol = np.where(n_neg > 1, np.sqrt(neg_var), np.where(n_neg == 1, np.nan, 0.0)) \
+        * np.sqrt(annual_days)
+
+    cumulative = np.cumprod(1 + returns, axis=1)
+    running_max = np.maximum.accumulate(cumulative, axis=1)
+    max_drawdown = ((cumulative - running_max) / running_max).min(axis=1)
+
+    var_95 = np.percentile(returns, 5, axis=1)
+    tail = returns <= var_95[:, None]
+    cvar_95 = np.where(tail, returns, 0).sum(axis=1) / np.maximum(tail.sum(axis=1), 1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        m2 = M2 / n
+        skewness = np.where(m2 > 0, np.sqrt(n * (n - 1)) / (n - 2) * (M3 / n) / m2 ** 1.5, 0.0) \
+            if n >= 3 else np.full(len(mean), np.nan)
+        kurtosis = np.where(M2 > 0, n * (n + 1) * (n - 1) * M4 / ((n - 2) * (n - 3) * M2 ** 2)
+                            - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3)), 0.0) \
+            if n >= 4 else np.full(len(mean), np.nan)
+
+        return {
+            'total_return': cumulative[:, -1] - 1,
+            'annual_return': annual_return,
+            'annual_vol': annual_vol,
+            'sharpe_ratio': np.where(annual_vol != 0, annual_return / annual_vol, 0.0),
+            'sortino_ratio': np.where(downside_vol != 0, annual_return / downside_vol, 0.0),
+            'calmar_ratio': np.where(max_drawdown != 0, annual_return / np.abs(max_drawdown), 0.0),
+            'max_drawdown': max_drawdown,
+            'var_95': var_95,
+            'cvar_95': cvar_95,
+            'downside_volatility': downside_vol,
+            'mean_daily_return': mean,
+            'std_daily_return': std,
+            'var_daily_return': var,
+            'skewness': skewness,
+            'kurtosis': kurtosis,
+            'max_daily_return': returns.max(axis=1),
+            'min_daily_return': returns.min(axis=1)
+        }
+
+
+def benchmark_metrics(returns, benchmark, annual_days=252):
+    """
+    (시계열 × 거래일) 수익률과 같은 모양(또는 한 줄)의 벤치마크 → 벤치마크 대비 지표 배열 dict
+    beta / alpha(절편 × 연간 거래일) / correlation 은 scipy.stats.linregress 와 같은 정의
+    """
+    returns = np.atleast_2d(np.asarray(returns, dtype=float))
+    benchmark = np.broadcast_to(np.atleast_2d(np.asarray(benchmark, dtype=float)), returns.shape)
+    n = returns.shape[1]
+
+    mean_r, mean_b = returns.mean(axis=1), benchmark.mean(axis=1)
+    dr, db = returns - mean_r[:, None], benchmark - mean_b[:, None]
+    cov = (dr * db).sum(axis=1)
+    ss_r, ss_b = (dr ** 2).sum(axis=1), (db ** 2).sum(axis=1)
+    usable = (n > 1) & (ss_b > 0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        beta = np.where(usable, cov / ss_b, 0.0)
+        alpha = np.where(usable, (mean_r - beta * mean_b) * annual_days, 0.0)
+        correlation = np.where(usable & (ss_r > 0), cov / np.sqrt(ss_r * ss_b), 0.0)
+
+        excess = returns - benchmark
+        tracking_error = excess.std(axis=1, ddof=1) * np.sqrt(annual_days) if n > 1 \
+            else np.full(len(mean_r), np.nan)
+        annual_return = (1 + mean_r) ** annual_days - 1
+        information_ratio = np.where(tracking_error != 0,
+                                     (annual_return - mean_b * annual_days) / tracking_error, 0.0)
+
+    return {
+        'beta': beta,
+        'alpha': alpha,
+        'correlation': correlation,
+        'tracking_error': tracking_error,
+        'information_ratio': information_ratio
+    }
+
+
+def compute_metrics(returns_df, benchmark=None, annual_days=None):
+    """
+    (거래일 × 전략) 수익률 DataFrame → (전략 × 지표) DataFrame, 모든 열을 한 번에 계산
+    benchmark: 거래일 index 의 Series (모든 전략 공통) 또는 같은 모양의 DataFrame, 결측일은 0
+    annual_days: None 이면 returns_df 의 실제 기간으로 추정 (모든 열에 같은 값 적용)
+    (결측 없는 행렬 가정: 포지션이 없는 날은 0 으로 채워 전달)
+    """
+    if isinstance(returns_df, pd.Series):
+        returns_df = returns_df.to_frame()
+    annual_days = annual_trading_days(returns_df.index) if annual_days is None else annual_days
+    x = returns_df.to_numpy(dtype=float).T
+    metrics = matrix_metrics(x, annual_days)
+
+    if benchmark is not None:
+        b = benchmark.reindex(returns_df.index).fillna(0).to_numpy(dtype=float)
+        metrics.update(benchmark_metrics(x, b.T if b.ndim == 2 else b, annual_days))
+
+    return pd.DataFrame(metrics, index=returns_df.columns)
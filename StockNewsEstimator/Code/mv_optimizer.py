@@ -0,0 +1,248 @@
+import numpy as np
+import pandas as pd
+from scipy.linalg import cho_factor, cho_solve
+from index_hedge import row_cube_positions
+
+# 평균-분산 최적화 북: 매 거래일 GPT 신호 노출 - 위험을 최대화 (총/순 노출, 종목당, 섹터 순노출 제약)
+# 공분산은 종목 유니버스의 창 2차 적률 (X'X) 을 하루씩 더하고 빼는 증분 갱신으로 유지하고 (창 전체 재추정 없음),
+# Ledoit-Wolf 축소 강도는 창 안 거래일 Gram 행렬 (XX') 로 O(창 × 종목) 에 계산한다.
+# 일별 QP 는 작은 ADMM (OSQP 방식, KKT 행렬 촐레스키 분해 한 번) 으로 푼다.
+
+COV_WINDOW = 120        # 공분산 창 (거래일)
+MIN_COV_OBS = 60        # 종목별 창 안 최소 유효 관측 수 (미만이면 그날 최적화에서 제외)
+
+RISK_AVERSION = 100.0   # 위험 회피 계수 (일별 수익률 단위)
+SIGNAL_IC = 0.05        # 알파 = IC × 종목 변동성 × 표준화 신호 (Grinold)
+
+# 제약 기본값 (총노출 1 = 롱/숏 각 0.5, 순노출 0 = 델타-뉴트럴)
+GROSS_LIMIT = 1.0
+NET_LIMIT = 0.0
+NAME_CAP = 0.05
+SECTOR_NET_CAP = 0.05
+
+# ADMM
+ADMM_RHO = 0.1
+ADMM_SIGMA = 1e-6
+ADMM_ALPHA = 1.6
+ADMM_MAX_ITER = 4000
+ADMM_TOL = 1e-6
+
+OPTIMIZER_COLUMNS = ['long_return', 'short_return', 'long_short_return', 'n_long', 'n_short', 'n_total',
+                     'gross', 'net', 'ex_ante_vol', 'shrinkage', 'iterations']
+
+
+def init_covariance_state(n_sec, window=COV_WINDOW):
+    """
+    빈 증분 공분산 상태: 창 수익률 링 버퍼, 2차 적률 (종목 × 종목), 거래일 Gram (창 × 창), 종목별 유효 관측 수
+    """
+    return {
+        'window': window,
+        'buffer': np.zeros((window, n_sec)),
+        'valid': np.zeros((window, n_sec), dtype=bool),
+        'm2': np.zeros((n_sec, n_sec)),
+        'gram': np.zeros((window, window)),
+        'count': np.zeros(n_sec, dtype=np.int64),
+        'n_obs': 0,
+        'slot': 0
+    }
+
+
+def update_covariance(state, returns):
+    """
+    하루 수익률 (종목별, 결측 NaN) 추가: 창에서 가장 오래된 날을 빼고 새 날을 더함 (순위 2 갱신, O(종목²))
+    결측 수익률은 0 (정보 없음) 으로 넣고 유효 관측 수만 따로 센다.
+    """
+    valid = ~np.isnan(returns)
+    x = np.where(valid, returns, 0.0)
+    slot = state['slot']
+    old = state['buffer'][slot]
+
+    update = np.stack([x, old], axis=1)
+    state['m2'] += update @ (update * np.array([1.0, -1.0])).T
+    state['count'] += valid.astype(np.int64) - state['valid'][slot]
+
+    state['buffer'][slot] = x
+    state['valid'][slot] = valid
+    g = state['buffer'] @ x
+    state['gram'][slot, :] = g
+    state['gram'][:, slot] = g
+
+    state['n_obs'] = min(state['n_obs'] + 1, state['window'])
+    state['slot'] = (slot + 1) % state['window']
+
+
+def shrinkage_target(state):
+    """
+    Ledoit-Wolf (2004) 단위행렬 축소: (평균 분산 mu, 축소 강도)
+    2차 적률은 평균 0 가정 (일별 수익률), ||S||² 와 Σ_t ||x_t||⁴ 는 Gram 행렬에서
+    """
+    n_obs = state['n_obs']
+    p = state['m2'].shape[0]
+    if n_obs == 0 or p == 0:
+        return 0.0, 1.0
+    norms = np.diagonal(state['gram'])
+    mu = norms.sum() / (n_obs * p)
+    fro2 = (state['gram'] ** 2).sum() / n_obs ** 2
+    delta = (fro2 - p * mu ** 2) / p
+    beta = min(((norms ** 2).sum() / n_obs - fro2) / (n_obs * p), delta)
+    return mu, (beta / delta if delta > 0 else 1.0)
+
+
+def shrunk_covariance(state, idx):
+    """
+    종목 위치 idx 의 축소 공분산 부분행렬: (1 - 강도) × 표본 + 강도 × mu × I
+    """
+    mu, shrink = shrinkage_target(state)
+    sample = state['m2'][np.ix_(idx, idx)] / max(state['n_obs'], 1)
+    return (1 - shrink) * sample + shrink * mu * np.eye(len(idx)), shrink
+
+
+def solve_qp(P, q, C, lo, hi, rho=ADMM_RHO, sigma=ADMM_SIGMA, alpha=ADMM_ALPHA,
+             max_iter=ADMM_MAX_ITER, tol=ADMM_TOL):
+    """
+    min ½ x'Px + q'x  s.t.  lo <= Cx <= hi  (OSQP 방식 ADMM, 등식 행은 rho × 1e3)
+    반환: (x, 반복 수), x 는 제약 범위로 투영하지 않은 값 (허용 오차 안)
+    """
+    rho_vec = np.where(lo == hi, rho * 1e3, rho)
+    kkt = cho_factor(P + sigma * np.eye(len(q)) + C.T @ (rho_vec[:, None] * C))
+    x = np.zeros(len(q))
+    z = np.clip(np.zeros(len(lo)), lo, hi)
+    y = np.zeros(len(lo))
+    for it in range(1, max_iter + 1):
+        x_tilde = cho_solve(kkt, sigma * x - q + C.T @ (rho_vec * z - y))
+        z_tilde = C @ x_tilde
+        x = alpha * x_tilde + (1 - alpha) * x
+        z_relaxed = alpha * z_tilde + (1 - alpha) * z
+        z_new = np.clip(z_relaxed + y / rho_vec, lo, hi)
+        y += rho_vec * (z_relaxed - z_new)
+        z = z_new
+        if it % 10 == 0:
+            Cx = C @ x
+            primal = np.abs(Cx - z).max()
+            dual = np.abs(P @ x + q + C.T @ y).max()
+            if primal <= tol * (1 + np.abs(z).max()) and dual <= tol * (1 + np.abs(q).max()):
+                break
+    return x, it
+
+
+def optimize_weights(alpha, cov, side, sector=None, risk_aversion=RISK_AVERSION, gross_limit=GROSS_LIMIT,
+                     net_limit=NET_LIMIT, name_cap=NAME_CAP, sector_net_cap=SECTOR_NET_CAP):
+    """
+    하루 최적 비중: max α'w - (λ/2) w'Σw
+    s.t. 롱 종목 0 <= w <= name_cap, 숏 종목 -name_cap <= w <= 0, Σ|w| <= gross_limit, |Σw| <= net_limit,
+         섹터별 |Σw| <= sector_net_cap (sector 코드 -1 은 제외)
+    반환: (비중, ADMM 반복 수)
+    """
+    n = len(alpha)
+    rows = [np.eye(n), side[None, :].astype(float), np.ones((1, n))]
+    lo = [np.where(side > 0, 0.0, -name_cap), [0.0], [-net_limit]]
+    hi = [np.where(side > 0, name_cap, 0.0), [gross_limit], [net_limit]]
+    if sector is not None and sector_net_cap is not None:
+        codes, sector_idx = np.unique(sector[sector >= 0], return_inverse=True)
+        membership = np.zeros((len(codes), n))
+        membership[sector_idx, np.nonzero(sector >= 0)[0]] = 1.0
+        rows.append(membership)
+        lo.append(np.full(len(codes), -sector_net_cap))
+        hi.append(np.full(len(codes), sector_net_cap))
+
+    # 위험 항 대각 평균이 1 이 되도록 목적함수 스케일 (ADMM 수렴 속도)
+    P = risk_aversion * cov
+    scale = max(np.diagonal(P).mean(), 1e-12)
+    w, iterations = solve_qp(P / scale, -alpha / scale, np.vstack(rows),
+                             np.concatenate(lo), np.concatenate(hi))
+    return np.clip(w, np.concatenate(lo)[:n], np.concatenate(hi)[:n]), iterations
+
+
+def daily_signals(df, dates, n_sec, score_col='GPT_SCORE', sector_col='Sector',
+                  id_col='security_id', date_col='current_date'):
+    """
+    news_with_sector 형식 행 → (거래일, 종목) 단위 신호 (거래일 순 정렬)
+    signal: 롱 +1 / 숏 -1 × |score_col| (컬럼이 없으면 1) 합, stock_return: 행별 종목 수익률 평균
+    (롱 행은 long_return, 숏 행은 -short_return), sector: 첫 행 섹터 코드 (없으면 -1)
+    포지션이 없거나 거래일 / 종목을 모르는 행, 순신호가 0 인 (거래일, 종목) 은 제외
+    """
+    long_ret = df['long_return'].to_numpy(dtype=float)
+    short_ret = df['short_return'].to_numpy(dtype=float)
+    sign = (long_ret != 0).astype(float) - (short_ret != 0)
+    strength = np.abs(pd.to_numeric(df[score_col], errors='coerce').fillna(0).to_numpy(dtype=float)) \
+        if score_col in df.columns else np.ones(len(df))
+    day, day_ok, sec, sec_ok = row_cube_positions(df, dates, n_sec, id_col, date_col)
+    sector_codes = pd.factorize(df[sector_col])[0] if sector_col in df.columns else np.full(len(df), -1)
+
+    keep = day_ok & sec_ok & (sign != 0)
+    key, inverse = np.unique(day[keep] * n_sec + sec[keep], return_inverse=True)
+    signal = np.bincount(inverse, weights=(sign * strength)[keep], minlength=len(key))
+    count = np.bincount(inverse, minlength=len(key))
+    stock_return = np.bincount(inverse, weights=np.where(sign > 0, long_ret, -short_ret)[keep],
+                               minlength=len(key)) / count
+    first = np.full(len(key), keep.sum(), dtype=np.int64)
+    np.minimum.at(first, inverse, np.arange(keep.sum()))
+
+    out = {
+        'day': key // n_sec,
+        'sec': key % n_sec,
+        'signal': signal,
+        'stock_return': stock_return,
+        'sector': sector_codes[keep][first]
+    }
+    nonzero = out['signal'] != 0
+    return {k: v[nonzero] for k, v in out.items()}
+
+
+def optimized_daily(df, stock_ret, dates, universe=None, window=COV_WINDOW, min_obs=MIN_COV_OBS,
+                    signal_ic=SIGNAL_IC, score_col='GPT_SCORE', sector_col='Sector', **constraints):
+    """
+    (거래일 × 종목) 종가 수익률 (index_hedge.traded_returns) + 뉴스 행 → 거래일별 최적화 북 수익률
+    거래일 t 의 비중은 t-window ~ t-1 공분산으로 정하고 (당일 미포함), 실현 수익률은 행 수익률로 계산
+    universe: 공분산을 유지할 종목 위치 (None 이면 신호가 한 번이라도 있는 종목)
+    constraints: optimize_weights 의 제약 / 위험 회피 계수
+    반환: 신호가 있는 거래일 × OPTIMIZER_COLUMNS DataFrame (공분산 관측이 부족한 날은 포지션 없음)
+    """
+    n_days, n_sec = stock_ret.shape
+    signals = daily_signals(df, dates, n_sec, score_col, sector_col)
+    if universe is None:
+        universe = np.unique(signals['sec'])
+    position = np.full(n_sec, -1, dtype=np.int64)
+    position[universe] = np.arange(len(universe))
+    state = init_covariance_state(len(universe), window)
+
+    bounds = np.searchsorted(signals['day'], np.arange(n_days + 1))
+    records = {}
+    for t in range(n_days):
+        lo, hi = bounds[t], bounds[t + 1]
+        if hi > lo:
+            idx = position[signals['sec'][lo:hi]]
+            ok = idx >= 0
+            ok[ok] = state['count'][idx[ok]] >= min_obs
+            row = dict.fromkeys(OPTIMIZER_COLUMNS, 0.0)
+            if ok.any():
+                cov, shrink = shrunk_covariance(state, idx[ok])
+                signal = signals['signal'][lo:hi][ok]
+                side = np.sign(signal)
+                scale = signal.std()
+                z = signal / scale if scale > 0 else side
+                alpha = signal_ic * np.sqrt(np.diagonal(cov)) * z
+                w, iterations = optimize_weights(alpha, cov, side, signals['sector'][lo:hi][ok], **constraints)
+
+                r = signals['stock_return'][lo:hi][ok]
+                long_pnl = (np.where(w > 0, w, 0.0) * r).sum()
+                short_pnl = (np.where(w < 0, w, 0.0) * r).sum()
+                row.update({
+                    'long_return': long_pnl,
+                    'short_return': short_pnl,
+                    'long_short_return': long_pnl + short_pnl,
+                    'n_long': int((w > 1e-8).sum()),
+                    'n_short': int((w < -1e-8).sum()),
+                    'gross': np.abs(w).sum(),
+                    'net': w.sum(),
+                    'ex_ante_vol': np.sqrt(max(w @ cov @ w, 0.0)),
+                    'shrinkage': shrink,
+                    'iterations': iterations
+                })
+                row['n_total'] = row['n_long'] + row['n_short']
+            records[dates[t]] = row
+        update_covariance(state, stock_ret[t, universe])
+
+    out = pd.DataFrame.from_dict(records, orient='index', columns=OPTIMIZER_COLUMNS)
+    out.index = pd.DatetimeIndex(out.index, name='current_date')
+    return out.astype({'n_long': np.int64, 'n_short': np.int64, 'n_total': np.int64, 'iterations': np.int64})
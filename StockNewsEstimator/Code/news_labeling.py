@@ -0,0 +1,150 @@
+import os
+import json
+import pandas as pd
+import numpy as np
+from sentiment_records import ensure_article_ids, explode_sentiment
+from security_ids import attach_security_id, load_security_master, security_master_path, MISSING_ID
+
+# 5-DayIN?OFF.py, 6-PRE?IN?AFTER.py, 7-Tags.py 를 한 번에 처리하는 라벨링 단계
+# 일자 문자열에 태그를 붙였다 다시 정규식으로 떼어내는 대신,
+# 점수가 매겨진 뉴스에서 tag1, tag2, date, time, company, GPT_SCORE 를 바로 만든다.
+# 1-GPTScore.py 의 기업별 감성 레코드(*_records.xlsx)가 있으면 정규식 없이 결합한다.
+
+input_dir = '/Users/imdonghyeon/Desktop/Quantlab/checked_newsdata'
+output_dir = '/Users/imdonghyeon/Desktop/Quantlab/news_labeled'
+calendar_path = '/Users/imdonghyeon/Desktop/Quantlab/calender.json'
+
+# 기존 스크립트 출력 형식(일자 = 'DAY-IN:2023-02-01 08:30:00_PRE')도 함께 저장할지 여부
+WRITE_LEGACY_VIEW = False
+legacy_output_dir = '/Users/imdonghyeon/Desktop/Quantlab/PRA_DAY'
+
+# 장 시작/마감 (초 단위, 6-PRE?IN?AFTER.py 와 동일한 기준)
+MARKET_OPEN_SEC = 9 * 3600
+MARKET_CLOSE_SEC = 15 * 3600
+
+LABEL_COLUMNS = ['article_id', 'tag1', 'tag2', 'date', 'time',
+                 'security_id', 'company', 'ticker', 'GPT_SCORE', 'confidence']
+
+
+def load_off_dates(cal_path):
+    """
+    calendar.json 에서 주말/휴일 날짜 집합 생성
+    """
+    with open(cal_path, 'r', encoding='utf-8') as f:
+        cal = json.load(f)
+
+    off_dates = set()
+    for year_info in cal.values():
+        off_dates.update(year_info.get('weekends', []))
+        off_dates.update(year_info.get('holidays', []))
+    return off_dates
+
+
+def label_news(df, off_dates, records=None, date_col='일자', sentiment_col='GPT_기업별감성'):
+    """
+    뉴스 데이터에 세션 태그와 타입이 지정된 컬럼을 한 번에 추가
+    (tag1: DAY-IN/DAY-OFF, tag2: PRE/IN/AFTER, DAY-OFF 는 결측)
+    records 가 주어지면 article_id 컬럼 (1-GPTScore.py 가 저장한 기사 id) 으로 기업별 감성 레코드와 결합,
+    없으면 GPT_기업별감성 문자열을 레코드로 펼쳐서 기업마다 한 행으로 만든다.
+    """
+    if records is not None and 'article_id' not in df.columns:
+        raise ValueError("records 결합에는 입력 파일의 article_id 컬럼이 필요합니다 (1-GPTScore.py 출력). "
+                         "행 위치로 결합하면 중간 단계에서 행이 빠지거나 순서가 바뀔 때 다른 기사에 붙습니다.")
+    # article_id 가 없으면 같은 파일의 문자열을 펼치므로 행 위치로 충분
+    df = ensure_article_ids(df.reset_index(drop=True))
+
+    # 이미 태그가 붙은 파일이 들어와도 동일하게 처리되도록 태그 제거
+    raw = df[date_col].astype(str).str.strip()\
+        .str.replace(r'^DAY-(?:IN|OFF):', '', regex=True)\
+        .str.replace(r'_(?:PRE|IN|AFTER)$', '', regex=True)
+    dt = pd.to_datetime(raw, format='%Y-%m-%d %H:%M:%S', errors='coerce')
+
+    date = dt.dt.normalize()
+    is_off = date.dt.strftime('%Y-%m-%d').isin(off_dates).to_numpy()
+    seconds = (dt - date).dt.total_seconds().to_numpy()
+
+    df['tag1'] = np.where(is_off, 'DAY-OFF', 'DAY-IN')
+    df['tag2'] = np.select(
+        [is_off, seconds < MARKET_OPEN_SEC, seconds <= MARKET_CLOSE_SEC],
+        [None, 'PRE', 'IN'],
+        default='AFTER'
+    )
+    df.loc[dt.isna().to_numpy(), ['tag1', 'tag2']] = None
+    df['date'] = date
+    df['time'] = dt.dt.strftime('%H:%M:%S')
+
+    # 6-PRE?IN?AFTER.py 와 동일하게 시간순 정렬
+    order = np.argsort(dt.to_numpy(), kind='stable')
+    df = df.iloc[order]
+
+    # 기업별 감성 레코드 결합 (정수 키 article_id)
+    if records is None and sentiment_col in df.columns:
+        records = explode_sentiment(
+            df.set_index('article_id'), sentiment_col)
+    if records is not None:
+        records = records.rename(columns={'score': 'GPT_SCORE'})
+        df = df.merge(records, on='article_id', how='left', sort=False)
+        if 'security_id' in df.columns:
+            df['security_id'] = df['security_id'].fillna(
+                MISSING_ID).astype(np.int64)
+
+    return df.reset_index(drop=True)
+
+
+def to_legacy_view(labeled, date_col='일자', sentiment_col='GPT_기업별감성'):
+    """
+    라벨링 결과를 기존 스크립트 출력 형식으로 변환 (기사당 한 행)
+    (6-PRE?IN?AFTER.py 의 일자 문자열, 4-new_stock.py 의 첫 기업 GPT_SCORE,
+    7-Tags.py 의 기업명 컬럼)
+    """
+    legacy = labeled.drop_duplicates('article_id').copy()
+    suffix = ('_' + legacy['tag2']).fillna('')
+    legacy[date_col] = legacy['tag1'] + ':' + \
+        legacy['date'].dt.strftime('%Y-%m-%d') + ' ' + legacy['time'] + suffix
+
+    if 'company' in labeled.columns:
+        names = labeled.dropna(subset=['company'])\
+            .groupby('article_id', sort=False)['company'].agg(', '.join)
+        legacy['기업명'] = legacy['article_id'].map(names)
+
+    drop_cols = ['article_id', 'date', 'time', 'security_id',
+                 'company', 'ticker', 'confidence']
+    return legacy.drop(columns=[c for c in drop_cols if c in legacy.columns])\
+        .reset_index(drop=True)
+
+
+# 메인 실행 코드
+if __name__ == "__main__":
+    os.makedirs(output_dir, exist_ok=True)
+    off_dates = load_off_dates(calendar_path)
+    master = load_security_master(security_master_path) \
+        if os.path.exists(security_master_path) else None
+
+    for fname in sorted(os.listdir(input_dir)):
+        if not fname.lower().endswith(('.xlsx', '.csv')) or '_records' in fname:
+            continue
+        in_path = os.path.join(input_dir, fname)
+        if fname.lower().endswith('.xlsx'):
+            df = pd.read_excel(in_path, dtype=str)
+        else:
+            df = pd.read_csv(in_path, dtype=str)
+
+        base, ext = os.path.splitext(fname)
+        records_path = os.path.join(input_dir, f'{base}_records.xlsx')
+        records = pd.read_excel(
+            records_path) if os.path.exists(records_path) else None
+
+        labeled = label_news(df, off_dates, records)
+        if master is not None and 'security_id' not in labeled.columns:
+            labeled = attach_security_id(labeled, master)
+
+        out_path = os.path.join(output_dir, f'{base}_labeled.xlsx')
+        labeled.to_excel(out_path, index=False)
+        print(f'라벨링 완료: {fname} >> {os.path.basename(out_path)}')
+
+        if WRITE_LEGACY_VIEW:
+            os.makedirs(legacy_output_dir, exist_ok=True)
+            legacy_path = os.path.join(
+                legacy_output_dir, f'{base}_PRA_exploded.xlsx')
+            to_legacy_view(labeled).to_excel(legacy_path, index=False)
+            print(f'호환 형식 저장: {os.path.basename(legacy_path)}')
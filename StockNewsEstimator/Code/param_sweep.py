@@ -0,0 +1,250 @@
+import os
+import glob
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+from tqdm import tqdm
+from position_engine import (SESSION_RULES, build_price_cube, build_return_cube, daily_portfolio_returns,
+                             prepare_news_arrays, resolve_entry_exit)
+from metrics_kernel import compute_metrics
+from cost_model import COST_PARAMS, daily_costs, market_codes, position_costs
+
+# 진입/청산 규칙, 보유 기간, 점수/신뢰도 기준, 세션 필터 조합을 한 번에 평가하는 스윕
+# 뉴스/가격 배열은 한 번만 만들고, 설정마다 인덱스 조회 + 보유 행렬로 일별 수익률을 계산한다.
+# horizon: 기본 청산일 이후 추가로 보유하는 거래일 수 (보유 기간이 겹치는 포지션은 거래일별로 집계)
+
+news_folder = '/Users/imdonghyeon/Desktop/Quantlab/news_tags'
+output_folder = '/Users/imdonghyeon/Desktop/Quantlab/portfolio_results'
+stock_path = '/Users/imdonghyeon/Desktop/Quantlab/stockdata.xlsx'
+MAX_WORKERS = None  # None 이면 CPU 코어 수
+
+# 규칙 세트: (tag1, tag2) → (진입 오프셋, 청산 오프셋, 진입 가격, 청산 가격)
+RULE_SETS = {
+    # simu.py 기본 규칙
+    'baseline': SESSION_RULES,
+    # 모든 뉴스를 다음 거래일 시가 진입 → 당일 종가 청산 (하루 지연)
+    'next_day_open': {
+        ('DAY-OFF', None): (1, 1, 'Open', 'Close'),
+        ('DAY-IN', 'PRE'): (1, 1, 'Open', 'Close'),
+        ('DAY-IN', 'IN'): (1, 1, 'Open', 'Close'),
+        ('DAY-IN', 'AFTER'): (1, 1, 'Open', 'Close'),
+    },
+    # 뉴스 이후 첫 종가 진입 → 다음 거래일 종가 청산
+    'close_to_close': {
+        ('DAY-OFF', None): (1, 2, 'Close', 'Close'),
+        ('DAY-IN', 'PRE'): (0, 1, 'Close', 'Close'),
+        ('DAY-IN', 'IN'): (0, 1, 'Close', 'Close'),
+        ('DAY-IN', 'AFTER'): (1, 2, 'Close', 'Close'),
+    },
+}
+
+# 스윕 그리드 (sessions: None 이면 전체, 아니면 PRE/IN/AFTER/DAY-OFF 중 포함할 세션)
+SWEEP_GRID = {
+    'rule_set': list(RULE_SETS),
+    'horizon': [0, 1, 2, 4, 9, 19],
+    'min_abs_score': [0.5],
+    'min_confidence': [0.0, 0.6, 0.8, 0.9],
+    'sessions': [None, ('PRE',), ('IN',), ('AFTER',), ('DAY-OFF',), ('PRE', 'DAY-OFF')],
+}
+
+METRIC_COLUMNS = ['total_return', 'annual_return', 'annual_vol', 'sharpe_ratio',
+                  'sortino_ratio', 'max_drawdown', 'skewness', 'kurtosis']
+# 비용 차감 후 지표 (결과 컬럼명: net_<지표>)
+NET_METRIC_COLUMNS = ['total_return', 'annual_return', 'sharpe_ratio', 'max_drawdown']
+
+
+def expand_grid(grid):
+    """
+    그리드 dict → 설정 dict 목록 (같은 rule_set/horizon 이 연속되도록 정렬)
+    """
+    keys = list(grid)
+    configs = [dict(zip(keys, values))
+               for values in itertools.product(*grid.values())]
+    return sorted(configs, key=lambda c: (c.get('rule_set'), c.get('horizon', 0)))
+
+
+def prepare_sweep(news_df, cube, rule_sets=RULE_SETS, master=None, cost_params=COST_PARAMS):
+    """
+    모든 설정이 공유하는 배열 준비 (뉴스 배열, 세션 라벨, 누적 로그수익률 행렬, 비용 파라미터)
+    """
+    n_sec = cube['prices'].shape[2]
+    arrays = prepare_news_arrays(news_df, cube)
+    arrays['session'] = np.where(arrays['tag1'] == 'DAY-OFF', 'DAY-OFF',
+                                 pd.Series(arrays['tag2']).fillna('').to_numpy(dtype=object))
+    return {
+        'arrays': arrays,
+        'cube': cube,
+        'ret_cube': build_return_cube(cube),
+        'rule_sets': rule_sets,
+        'cost_params': cost_params,
+        'market': market_codes(master, n_sec) if master is not None else np.zeros(n_sec, dtype=np.int64)
+    }
+
+
+def daily_delta_neutral(ret_cube, res, sec, is_long, is_short, costs=None):
+    """
+    거래일별 델타-뉴트럴 수익률 (보유 중인 롱/숏 포지션 각각 0.5 / n 가중)
+    costs: 포지션별 (진입 비용, 청산 비용) 이 있으면 비용 차감 수익률도 같은 보유 행렬로 계산
+    반환: (롱, 숏, 롱 순수익률, 숏 순수익률) — costs 가 없으면 순수익률 = 총수익률
+    """
+    books = []
+    for mask, weight in ((is_long, 1.0), (is_short, -1.0)):
+        w = np.full(mask.sum(), weight)
+        pnl, gross = daily_portfolio_returns(
+            ret_cube, sec[mask], res['entry_day'][mask], res['exit_day'][mask],
+            res['entry_field'][mask], res['exit_field'][mask], w)
+        cost = daily_costs(res['exit_day'][mask], w, costs[0][mask], costs[1][mask],
+                           len(pnl)) if costs is not None else 0.0
+        scale = np.where(gross > 0, 0.5 / np.maximum(gross, 1e-12), 0.0)
+        books.append((scale * pnl, scale * (pnl - cost)))
+    (long_return, long_net), (short_return, short_net) = books
+    return long_return, short_return, long_net, short_net
+
+
+def evaluate_config(state, config, _cache=None):
+    """
+    설정 하나 평가 → 결과 행 dict (유효 포지션이 없으면 None)
+    """
+    arrays = state['arrays']
+    key = (config['rule_set'], config.get('horizon', 0))
+    if _cache is not None and key in _cache:
+        res = _cache[key]
+    else:
+        res = resolve_entry_exit(arrays, state['cube'],
+                                 state['rule_sets'][key[0]], exit_shift=key[1])
+        if _cache is not None:
+            _cache.clear()
+            _cache[key] = res
+
+    score = arrays['score']
+    valid = res['reason'] < 0
+    valid &= np.abs(np.nan_to_num(score)) >= config.get('min_abs_score', 0)
+    min_conf = config.get('min_confidence', 0)
+    if min_conf > 0:
+        # 신뢰도가 없는 행(기존 문자열 형식)은 통과
+        conf = arrays['confidence']
+        valid &= np.isnan(conf) | (conf >= min_conf)
+    sessions = config.get('sessions')
+    if sessions:
+        valid &= np.isin(arrays['session'], list(sessions))
+
+    is_long = valid & (score > 0)
+    is_short = valid & (score < 0)
+    if not valid.any():
+        return None
+
+    # 포지션별 비용 (유효하지 않은 행의 인덱스는 0 으로 채워 계산 후 무시)
+    costs = None
+    if state.get('cost_params') is not None:
+        costs = position_costs(state['cube']['dates'], np.where(valid, arrays['sec'], 0),
+                               np.sign(np.nan_to_num(score)),
+                               np.where(valid, res['entry_day'], 0),
+                               np.where(valid, res['exit_day'], 0),
+                               state['market'], state['cost_params'])
+    long_return, short_return, long_net, short_net = daily_delta_neutral(
+        state['ret_cube'], res, arrays['sec'], is_long, is_short, costs)
+
+    # 평가 구간: 첫 진입일 ~ 마지막 청산일 (포지션 없는 날은 수익률 0)
+    first, last = res['entry_day'][valid].min(), res['exit_day'][valid].max()
+    window = slice(first, last + 1)
+    index = state['cube']['dates'][window].rename('current_date')
+    daily = pd.DataFrame({
+        'long_return': long_return[window],
+        'short_return': short_return[window],
+        'long_short_return': (long_return + short_return)[window]
+    }, index=index)
+    # (열 × 지표) 표 → 열별 지표 조회 (metrics[열][지표])
+    metrics = compute_metrics(daily).T
+    net_metrics = compute_metrics(pd.DataFrame({
+        'long_return': long_net[window],
+        'short_return': short_net[window],
+        'long_short_return': (long_net + short_net)[window]
+    }, index=index)).T
+
+    row = {k: (','.join(v) if isinstance(v, tuple) else ('ALL' if v is None else v))
+           for k, v in config.items()}
+    row['n_trades'] = int(is_long.sum() + is_short.sum())
+    row['n_long'] = int(is_long.sum())
+    row['n_short'] = int(is_short.sum())
+    for m in METRIC_COLUMNS:
+        row[m] = metrics['long_short_return'][m]
+    row['long_total_return'] = metrics['long_return']['total_return']
+    row['short_total_return'] = metrics['short_return']['total_return']
+    for m in NET_METRIC_COLUMNS:
+        row[f'net_{m}'] = net_metrics['long_short_return'][m]
+    if costs is not None:
+        traded = is_long | is_short
+        row['avg_cost_bps'] = float(
+            (costs[0] + costs[1])[traded].mean() * 1e4)
+    return row
+
+
+def result_columns(configs, with_costs=False):
+    """
+    evaluate_config 결과 행의 컬럼 순서 (설정 키 → 거래 수 → 지표 → 비용 차감 지표)
+    """
+    keys = list(dict.fromkeys(k for c in configs for k in c))
+    columns = keys + ['n_trades', 'n_long', 'n_short'] + METRIC_COLUMNS + \
+        ['long_total_return', 'short_total_return'] + [f'net_{m}' for m in NET_METRIC_COLUMNS]
+    return columns + (['avg_cost_bps'] if with_costs else [])
+
+
+# 워커 프로세스마다 공유 배열을 한 번만 전달받아 재사용
+_worker_state = {}
+_worker_cache = {}
+
+
+def _init_worker(state):
+    _worker_state.update(state)
+
+
+def _evaluate(config):
+    return evaluate_config(_worker_state, config, _worker_cache)
+
+
+def run_sweep(state, configs, max_workers=None, rank_by='sharpe_ratio'):
+    """
+    설정 목록을 프로세스 풀에서 평가 후 rank_by 기준으로 순위를 매긴 결과 테이블 반환
+    """
+    chunksize = max(1, len(configs) // (4 * (max_workers or os.cpu_count() or 1)))
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(state,)) as pool:
+        rows = list(tqdm(pool.map(_evaluate, configs, chunksize=chunksize),
+                         total=len(configs)))
+
+    rows = [r for r in rows if r is not None]
+    if not rows:
+        # 모든 설정에서 유효 포지션이 없으면 같은 컬럼의 빈 테이블
+        return pd.DataFrame(columns=['rank'] + result_columns(configs, state.get('cost_params') is not None))
+    results = pd.DataFrame(rows).sort_values(
+        rank_by, ascending=False, kind='stable').reset_index(drop=True)
+    results.insert(0, 'rank', np.arange(1, len(results) + 1))
+    return results
+
+
+# 메인 실행 코드
+if __name__ == "__main__":
+    from simu import load_price_data, load_news
+
+    os.makedirs(output_folder, exist_ok=True)
+
+    # 1. 가격/뉴스 로드 (한 번만)
+    price_df, master = load_price_data(stock_path)
+    cube = build_price_cube(price_df)
+    news_paths = sorted(glob.glob(os.path.join(news_folder, '*.xlsx')))
+    news_df = pd.concat([load_news(p, master)
+                        for p in news_paths], ignore_index=True)
+    print(f"📊 뉴스 {len(news_df)}건, 거래일 {len(cube['dates'])}일")
+
+    # 2. 공유 배열 준비 후 스윕
+    state = prepare_sweep(news_df, cube, master=master)
+    configs = expand_grid(SWEEP_GRID)
+    print(f"🔍 설정 {len(configs)}개 평가 시작...")
+    results = run_sweep(state, configs, MAX_WORKERS)
+
+    # 3. 결과 저장
+    out_path = os.path.join(output_folder, 'sweep_results.csv')
+    results.to_csv(out_path, index=False, encoding='utf-8-sig')
+    print(results.head(20).to_string(index=False))
+    print(f"\n✅ 스윕 결과 저장: {out_path}")
@@ -0,0 +1,165 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from metrics_kernel import annual_trading_days, matrix_metrics
+
+# 플라시보(순열) 검정: 같은 날짜(선택 시 같은 섹터/규모 버킷) 안에서 GPT 롱/숏 신호를 섞어
+# 델타-뉴트럴 일별 수익률과 성과 지표를 (순열 × 거래일) 행렬로 한 번에 다시 계산한다.
+# 날짜별 롱/숏 종목 수는 그대로 유지되므로 관측 전략과 같은 가중 구조의 무작위 신호가 된다.
+
+data_path = '/Users/imdonghyeon/Desktop/Quantlab/final_수정/news_with_sector.csv'
+N_PERMUTATIONS = 10000
+BATCH_SIZE = 100
+MAX_WORKERS = None  # None 이면 CPU 코어 수
+
+SERIES_COLUMNS = ['long_return', 'short_return', 'long_short_return']
+# 지표 → 단측 검정 방향 (+1: 클수록 좋음, -1: 작을수록 좋음 / max_drawdown 은 음수라 클수록 좋음)
+PLACEBO_METRICS = {'total_return': 1, 'annual_return': 1, 'annual_vol': -1, 'sharpe_ratio': 1,
+                   'sortino_ratio': 1, 'max_drawdown': 1}
+
+
+def prepare_placebo(df, bucket_col=None):
+    """
+    news_with_sector/style 형식 → 포지션 배열
+    롱(long_return != 0) / 숏(short_return != 0) 행을 각각 포지션 하나로 보고
+    종목 수익률 r (숏은 -short_return), 신호 부호, 거래일 번호, 섞는 그룹 번호를 만든다.
+    """
+    dates = pd.to_datetime(df['current_date'])
+    day, day_index = pd.factorize(dates, sort=True)
+    long_ret = pd.to_numeric(df['long_return'], errors='coerce').fillna(0).to_numpy()
+    short_ret = pd.to_numeric(df['short_return'], errors='coerce').fillna(0).to_numpy()
+
+    is_long, is_short = long_ret != 0, short_ret != 0
+    rows = np.concatenate([np.flatnonzero(is_long), np.flatnonzero(is_short)])
+    sign = np.concatenate([np.ones(is_long.sum()), -np.ones(is_short.sum())])
+    r = np.concatenate([long_ret[is_long], -short_ret[is_short]])
+
+    # 섞는 그룹: 거래일 (+ 버킷)
+    group = day[rows].astype(np.int64)
+    if bucket_col is not None:
+        bucket = pd.factorize(df[bucket_col])[0][rows]
+        group = group * (bucket.max() + 2) + bucket + 1
+
+    base = np.argsort(group, kind='stable')
+    n_days = len(day_index)
+    day_sorted = day[rows][base]
+    return {
+        'dates': day_index,
+        'group': group[base].astype(float),
+        'sign': sign[base],
+        'r': r[base],
+        'day': day_sorted,
+        'n_long': np.bincount(day_sorted, weights=sign[base] > 0, minlength=n_days),
+        'n_short': np.bincount(day_sorted, weights=sign[base] < 0, minlength=n_days)
+    }
+
+
+def daily_returns_batch(state, signs):
+    """
+    (순열 × 포지션) 신호 행렬 → (순열 × 거래일) 롱 / 숏 / 롱숏 수익률 (0.5 / n 가중)
+    """
+    B = signs.shape[0]
+    n_days = len(state['dates'])
+    flat = (np.arange(B)[:, None] * n_days + state['day'][None, :]).ravel()
+
+    out = {}
+    for col, side, n in (('long_return', 1, state['n_long']), ('short_return', -1, state['n_short'])):
+        pnl = np.bincount(flat, weights=(side * state['r'] * (signs == side)).ravel(),
+                          minlength=B * n_days).reshape(B, n_days)
+        out[col] = np.where(n > 0, 0.5 * pnl / np.maximum(n, 1), 0.0)
+    out['long_short_return'] = out['long_return'] + out['short_return']
+    return out
+
+
+def batch_metrics(returns, dates):
+    """
+    (순열 × 거래일) 수익률 행렬 → 지표 배열 dict (calculate_performance_metrics 와 같은 정의)
+    """
+    metrics = matrix_metrics(returns, annual_trading_days(dates))
+    return {m: metrics[m] for m in PLACEBO_METRICS}
+
+
+def permutation_batch(state, n, seed):
+    """
+    그룹 내 무작위 순열 n 개 → 시리즈별 지표 배열
+    그룹 번호 + [0, 1) 난수로 정렬하면 그룹 경계는 유지되고 그룹 안의 순서만 섞인다.
+    """
+    rng = np.random.default_rng(seed)
+    order = np.argsort(state['group'][None, :] + rng.random((n, len(state['sign']))), axis=1)
+    signs = np.empty((n, len(state['sign'])))
+    np.put_along_axis(signs, order, np.broadcast_to(state['sign'], signs.shape), axis=1)
+
+    daily = daily_returns_batch(state, signs)
+    return {col: batch_metrics(daily[col], state['dates']) for col in SERIES_COLUMNS}
+
+
+# 워커 프로세스마다 포지션 배열을 한 번만 전달받아 재사용
+_worker_state = {}
+
+
+def _init_worker(state):
+    _worker_state.update(state)
+
+
+def _run_batch(args):
+    n, seed = args
+    return permutation_batch(_worker_state, n, seed)
+
+
+def run_placebo(df, n_permutations=N_PERMUTATIONS, bucket_col=None, batch_size=BATCH_SIZE,
+                max_workers=None, seed=0):
+    """
+    관측 지표 vs 순열 귀무분포
+    반환: (요약 DataFrame [series, metric, observed, null_mean, null_std, p_value],
+           귀무분포 DataFrame [series_metric 컬럼, 순열별 행])
+    p_value: 단측 (지표 방향 기준으로 순열 지표가 관측 지표 이상으로 좋은 경우), (1 + 개수) / (1 + 순열 수)
+    """
+    state = prepare_placebo(df, bucket_col)
+    observed = {col: {m: v[0] for m, v in metrics.items()} for col, metrics in
+                ((c, batch_metrics(d, state['dates']))
+                 for c, d in daily_returns_batch(state, state['sign'][None, :]).items())}
+
+    sizes = [batch_size] * (n_permutations // batch_size)
+    if n_permutations % batch_size:
+        sizes.append(n_permutations % batch_size)
+    tasks = [(n, [seed, k]) for k, n in enumerate(sizes)]
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(state,)) as pool:
+        batches = list(tqdm(pool.map(_run_batch, tasks), total=len(tasks)))
+
+    null = pd.DataFrame({
+        f'{col}_{m}': np.concatenate([b[col][m] for b in batches])
+        for col in SERIES_COLUMNS for m in PLACEBO_METRICS
+    })
+
+    summary = []
+    for col in SERIES_COLUMNS:
+        for m, direction in PLACEBO_METRICS.items():
+            dist = null[f'{col}_{m}'].to_numpy()
+            summary.append({
+                'series': col,
+                'metric': m,
+                'observed': observed[col][m],
+                'null_mean': np.nanmean(dist),
+                'null_std': np.nanstd(dist),
+                'p_value': (1 + np.sum(direction * dist >= direction * observed[col][m])) / (1 + len(dist))
+            })
+    return pd.DataFrame(summary), null
+
+
+# 메인 실행 코드
+if __name__ == "__main__":
+    df = pd.read_csv(data_path)
+    df['long_return'] = pd.to_numeric(df['long_return'], errors='coerce').fillna(0)
+    df['short_return'] = pd.to_numeric(df['short_return'], errors='coerce').fillna(0)
+
+    # 전체 (날짜 내 셔플) + 날짜·규모구분 내 셔플
+    for name, bucket in [('date', None), ('date_size', '규모구분')]:
+        print(f"\n🎲 플라시보 검정 ({name}): 순열 {N_PERMUTATIONS}개")
+        summary, null = run_placebo(df, N_PERMUTATIONS, bucket, max_workers=MAX_WORKERS)
+        print(summary.to_string(index=False))
+        summary.to_csv(f'placebo_summary_{name}.csv', encoding='utf-8-sig', index=False)
+        null.to_csv(f'placebo_null_{name}.csv', encoding='utf-8-sig', index=False)
+        print(f"✅ 저장: placebo_summary_{name}.csv, placebo_null_{name}.csv")
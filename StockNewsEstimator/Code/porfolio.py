@@ -1,5 +1,10 @@
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
+from signal_netting import net_signals
+
+# 같은 날 같은 기업 헤드라인 점수 합산 방식 ('sum' / 'mean' / 'latest' / 'confidence', None 이면 헤드라인별 포지션)
+NETTING = None
 
 # 1. Load stock data and parse company and item names
 stock_df = pd.read_excel(
@@ -25,6 +30,13 @@ news_df = news_df[news_df['GPT_SCORE'].isin([1.0, -1.0])]
 news_df['기업명'] = news_df['기업명'].astype(str).str.strip()
 news_df['Company'] = news_df['기업명']
 
+# 같은 날 같은 기업은 점수를 합산해 포지션 하나로 (상계되면 제외)
+if NETTING is not None:
+    news_df['Date'] = pd.to_datetime(news_df['일자']).dt.date
+    news_df = net_signals(news_df, ['Date', 'Company'], NETTING)
+    news_df = news_df[news_df['GPT_SCORE'] != 0]
+    news_df['GPT_SCORE'] = np.sign(news_df['GPT_SCORE'])
+
 # 3. Use open and close prices from news data
 news_df['Open'] = news_df['시가']
 news_df['Close'] = news_df['수정종가']
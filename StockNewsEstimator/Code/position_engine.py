@@ -0,0 +1,378 @@
+import pandas as pd
+import numpy as np
+from security_ids import security_names
+from cost_model import daily_costs, position_costs
+from signal_netting import net_scores, signal_groups
+
+# 뉴스 (tag1, tag2, 거래일) → 진입/청산 거래일 인덱스와 가격 필드를 배열 연산으로 계산
+# 가격은 (거래일 × security_id) 행렬에서 인덱스로 바로 가져온다.
+
+# (tag1, tag2) → (진입 오프셋, 청산 오프셋, 진입 가격, 청산 가격)
+# 오프셋 기준일은 뉴스 날짜 이하의 마지막 거래일 (DAY-OFF 이면 +1 이 다음 거래일)
+SESSION_RULES = {
+    ('DAY-OFF', None): (1, 1, 'Open', 'Close'),
+    ('DAY-IN', 'PRE'): (0, 0, 'Open', 'Close'),
+    ('DAY-IN', 'IN'): (0, 1, 'Close', 'Close'),
+    ('DAY-IN', 'AFTER'): (1, 1, 'Open', 'Close'),
+}
+
+PRICE_FIELDS = ['Open', 'Close']
+
+SKIP_REASONS = ['no_score', 'unknown_security', 'unknown_tag',
+                'not_trading_day', 'out_of_range', 'missing_price']
+
+OUTPUT_COLUMNS = ['Date', 'Company', 'Security ID', 'Action', 'Entry Date',
+                  'Exit Date', 'Entry Field', 'Exit Field', 'Entry', 'Exit', 'Return']
+
+
+def build_price_cube(price_df, fields=PRICE_FIELDS):
+    """
+    (security_id, Date, Open, Close) long 형식 → (거래일 × security_id) 가격 행렬
+    security_id 가 0부터 연속된 정수이므로 열 위치 == security_id
+    """
+    dates = np.sort(price_df['Date'].unique())
+    day_idx = np.searchsorted(dates, price_df['Date'].to_numpy())
+    sec_idx = price_df['security_id'].to_numpy(dtype=np.int64)
+    valid = sec_idx >= 0
+    n_sec = int(sec_idx.max()) + 1 if valid.any() else 0
+
+    prices = np.full((len(fields), len(dates), n_sec), np.nan)
+    for k, field in enumerate(fields):
+        prices[k, day_idx[valid], sec_idx[valid]] = price_df[field].to_numpy(
+            dtype=float)[valid]
+
+    return {
+        'dates': pd.DatetimeIndex(dates),
+        'fields': list(fields),
+        'prices': prices
+    }
+
+
+def build_return_cube(cube):
+    """
+    가격 행렬 → 누적 로그수익률 행렬 (보유 기간과 무관하게 O(1) 수익률 조회)
+    cum_log[t]: 수정종가 기준 누적 로그수익률 (결측일은 0 으로 이어붙임)
+    log_price[필드][t]: 같은 기준의 로그 가격 (시가 = 종가 - log(종가/시가))
+    일별 구간 수익률: cc (전일 종가 → 종가), oc (시가 → 종가), co (전일 종가 → 시가)
+    """
+    fields = cube['fields']
+    close = cube['prices'][fields.index('Close')]
+    open_ = cube['prices'][fields.index('Open')]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_close = np.log(np.where(close > 0, close, np.nan))
+        log_open = np.log(np.where(open_ > 0, open_, np.nan))
+
+    # 종목별로 마지막 유효 종가를 이어서 일별 로그수익률 계산
+    filled = pd.DataFrame(log_close).ffill().to_numpy()
+    daily_log = np.diff(filled, axis=0, prepend=filled[:1])
+    cum_log = np.cumsum(np.nan_to_num(daily_log), axis=0)
+
+    log_price = np.full((len(fields),) + close.shape, np.nan)
+    log_price[fields.index('Close')] = np.where(
+        np.isnan(log_close), np.nan, cum_log)
+    log_price[fields.index('Open')] = cum_log - (log_close - log_open)
+
+    prev_close = np.vstack([np.full((1, close.shape[1]), np.nan), log_close[:-1]])
+    prev_cum = np.vstack([np.full((1, close.shape[1]), np.nan), cum_log[:-1]])
+    return {
+        'fields': fields,
+        'log_price': log_price,
+        'cc': np.expm1(cum_log - prev_cum),
+        'oc': np.expm1(log_close - log_open),
+        'co': np.expm1(log_open - prev_close)
+    }
+
+
+def map_session_rules(tag1, tag2, rules=SESSION_RULES):
+    """
+    (tag1, tag2) 배열 → 규칙 번호 배열 (-1 은 규칙 없음)
+    tag2 가 None 인 규칙은 tag2 와 관계없이 적용
+    """
+    tag1 = pd.Series(tag1, dtype=object).fillna('').to_numpy()
+    tag2 = pd.Series(tag2, dtype=object).fillna('').to_numpy()
+    rule_id = np.full(len(tag1), -1, dtype=np.int64)
+    for k, (t1, t2) in enumerate(rules):
+        mask = (tag1 == t1) if t2 is None else (tag1 == t1) & (tag2 == t2)
+        rule_id[(rule_id < 0) & mask] = k
+    return rule_id
+
+
+def prepare_news_arrays(news_df, cube, date_col='거래일', score_col='GPT_SCORE'):
+    """
+    뉴스 DataFrame → 배열 (점수, security_id, 기준 거래일 인덱스, 태그 등)
+    같은 뉴스에 규칙/파라미터만 바꿔 여러 번 계산할 때 한 번만 만든다.
+    """
+    n = len(news_df)
+    dates = cube['dates'].to_numpy()
+    n_days = len(dates)
+
+    news_date = pd.to_datetime(news_df[date_col]).to_numpy(
+        dtype='datetime64[ns]')
+    # 기준 거래일: 뉴스 날짜 이하의 마지막 거래일
+    base = np.searchsorted(dates, news_date, side='right') - 1
+    on_day = (base >= 0) & (dates[np.clip(base, 0, n_days - 1)] == news_date)
+
+    empty = pd.Series([''] * n, index=news_df.index)
+    confidence = news_df['confidence'] if 'confidence' in news_df.columns \
+        else pd.Series(np.nan, index=news_df.index)
+    return {
+        'news_date': news_date,
+        'score': pd.to_numeric(news_df[score_col], errors='coerce').to_numpy(dtype=float),
+        'confidence': pd.to_numeric(confidence, errors='coerce').to_numpy(dtype=float),
+        'sec': news_df['security_id'].to_numpy(dtype=np.int64),
+        'tag1': news_df.get('tag1', empty).to_numpy(dtype=object),
+        'tag2': news_df.get('tag2', empty).to_numpy(dtype=object),
+        'base': base,
+        'on_day': on_day
+    }
+
+
+def resolve_offsets(arrays, fields, rules=SESSION_RULES, exit_shift=0, n_days=None, n_sec=None):
+    """
+    규칙 적용 → 진입/청산 거래일 인덱스, 가격 필드 번호, 가격 조회 전 스킵 사유 (-1 이면 유효)
+    n_days 가 None 이면 기간 초과 검사 생략 (청산일이 아직 오지 않은 증분 계산용)
+    """
+    score, sec = arrays['score'], arrays['sec']
+
+    # 규칙 테이블 (규칙 번호 → 오프셋/필드 번호)
+    rule_id = map_session_rules(arrays['tag1'], arrays['tag2'], rules)
+    rule_table = np.array([[e, x, fields.index(fi), fields.index(fo)]
+                           for e, x, fi, fo in rules.values()], dtype=np.int64).reshape(-1, 4)
+    on_day_required = np.array([t1 == 'DAY-IN' for t1, _ in rules], dtype=bool)
+
+    r = np.clip(rule_id, 0, None)
+    entry_day = arrays['base'] + rule_table[r, 0]
+    exit_day = arrays['base'] + rule_table[r, 1] + exit_shift
+
+    # 스킵 사유 (앞의 사유가 우선)
+    reason = np.full(len(score), -1, dtype=np.int64)
+
+    def mark(k, mask):
+        reason[(reason < 0) & mask] = k
+
+    mark(0, np.isnan(score) | (score == 0))
+    mark(1, (sec < 0) | ((sec >= n_sec) if n_sec is not None else False))
+    mark(2, rule_id < 0)
+    mark(3, on_day_required[r] & ~arrays['on_day'])
+    mark(4, (entry_day < 0) | ((exit_day >= n_days) if n_days is not None else False))
+
+    return {
+        'entry_day': entry_day,
+        'exit_day': exit_day,
+        'entry_field': rule_table[r, 2],
+        'exit_field': rule_table[r, 3],
+        'reason': reason
+    }
+
+
+def resolve_entry_exit(arrays, cube, rules=SESSION_RULES, exit_shift=0):
+    """
+    규칙 적용 → 진입/청산 거래일 인덱스, 가격, 스킵 사유 (-1 이면 유효)
+    exit_shift: 청산일을 추가로 미루는 거래일 수
+    """
+    prices = cube['prices']
+    res = resolve_offsets(arrays, cube['fields'], rules, exit_shift,
+                          n_days=prices.shape[1], n_sec=prices.shape[2])
+    reason = res['reason']
+
+    # 가격 조회 (인덱스 기반)
+    ok = reason < 0
+    s = np.where(ok, arrays['sec'], 0)
+    ed = np.where(ok, res['entry_day'], 0)
+    xd = np.where(ok, res['exit_day'], 0)
+    entry = prices[res['entry_field'], ed, s]
+    exit_ = prices[res['exit_field'], xd, s]
+    reason[ok & (np.isnan(entry) | np.isnan(exit_) | (entry == 0) | (exit_ == 0))] = 5
+
+    res['entry'] = entry
+    res['exit'] = exit_
+    return res
+
+
+def net_news_arrays(arrays, rules=SESSION_RULES, mode='sum'):
+    """
+    같은 (security_id, 기준 거래일, 세션 규칙) 의 뉴스를 하나로 합산한 배열
+    대표 행은 그룹의 마지막 뉴스, 'n_signals' 에 합산된 헤드라인 수
+    """
+    rule_id = map_session_rules(arrays['tag1'], arrays['tag2'], rules)
+    group = signal_groups(arrays['sec'], arrays['base'], rule_id, arrays['on_day'])
+    rep, net, count = net_scores(group, arrays['score'], mode, arrays['confidence'])
+    order = np.argsort(rep, kind='stable')
+    rep = rep[order]
+
+    netted = {k: v[rep] for k, v in arrays.items()}
+    netted['score'] = net[order]
+    netted['n_signals'] = count[order]
+    return netted
+
+
+def count_skips(reason):
+    return pd.Series(np.bincount(reason[reason >= 0], minlength=len(SKIP_REASONS)),
+                     index=SKIP_REASONS, name='skipped')
+
+
+def calculate_positions(news_df, cube, rules=SESSION_RULES, master=None,
+                        date_col='거래일', score_col='GPT_SCORE', exit_shift=0, ret_cube=None,
+                        cost_params=None, market=None, netting=None):
+    """
+    벡터화된 포지션 계산
+    exit_shift 만큼 청산일을 미루면 N 거래일 보유 (수익률은 누적 로그수익률 배열에서 조회)
+    cost_params 가 있으면 'Cost', 'Net Return' 컬럼 추가 (market: security_id 별 시장 코드)
+    netting ('sum' / 'mean' / 'latest' / 'confidence') 이 있으면 같은 기업·세션 뉴스를
+    포지션 하나로 합산 후 계산 ('Signals' 컬럼 추가, 스킵 건수는 합산 후 기준)
+    반환: (포지션 DataFrame, 사유별 스킵 건수 Series)
+    """
+    arrays = prepare_news_arrays(news_df, cube, date_col, score_col)
+    if netting is not None:
+        arrays = net_news_arrays(arrays, rules, netting)
+    res = resolve_entry_exit(arrays, cube, rules, exit_shift)
+    skip_counts = count_skips(res['reason'])
+
+    keep = res['reason'] < 0
+    if not keep.any():
+        return pd.DataFrame(columns=OUTPUT_COLUMNS), skip_counts
+
+    if ret_cube is None:
+        ret_cube = build_return_cube(cube)
+    sign = np.sign(arrays['score'][keep])
+    entry, exit_ = res['entry'][keep], res['exit'][keep]
+    sec_keep = arrays['sec'][keep]
+    log_ret = holding_log_returns(ret_cube, sec_keep, res['entry_day'][keep], res['exit_day'][keep],
+                                  res['entry_field'][keep], res['exit_field'][keep])
+
+    # 진입일 종가가 없어 누적 배열에 이을 수 없는 다일 보유 포지션은 가격 결측으로 처리
+    gap = np.isnan(log_ret)
+    if gap.any():
+        skip_counts['missing_price'] += int(gap.sum())
+        keep[np.flatnonzero(keep)[gap]] = False
+        sign, entry, exit_, sec_keep, log_ret = sign[~gap], entry[~gap], exit_[
+            ~gap], sec_keep[~gap], log_ret[~gap]
+    entry_day, exit_day = res['entry_day'][keep], res['exit_day'][keep]
+    out = pd.DataFrame({
+        'Date': pd.DatetimeIndex(arrays['news_date'][keep]).date,
+        'Company': security_names(master, sec_keep) if master is not None else sec_keep,
+        'Security ID': sec_keep,
+        'Action': np.where(sign > 0, 'LONG', 'SHORT'),
+        'Entry Date': cube['dates'][entry_day].date,
+        'Exit Date': cube['dates'][exit_day].date,
+        'Entry Field': np.asarray(cube['fields'])[res['entry_field'][keep]],
+        'Exit Field': np.asarray(cube['fields'])[res['exit_field'][keep]],
+        'Entry': entry,
+        'Exit': exit_,
+        'Return': sign * np.expm1(log_ret)
+    })
+    if netting is not None:
+        out['Signals'] = arrays['n_signals'][keep]
+    return_col = 'Return'
+    if cost_params is not None:
+        if market is None:
+            market = np.zeros(cube['prices'].shape[2], dtype=np.int64)
+        entry_cost, exit_cost = position_costs(
+            cube['dates'], sec_keep, sign, entry_day, exit_day, market, cost_params)
+        out['Cost'] = entry_cost + exit_cost
+        out['Net Return'] = out['Return'] - out['Cost']
+        return_col = 'Net Return'
+    out = out.sort_values('Date', kind='stable').reset_index(drop=True)
+
+    # 보유 거래일 기준 포트폴리오 누적 수익률 (포지션 청산일 시점 값)
+    daily = daily_book_returns(out, cube, ret_cube, return_col)
+    out['Cumulative Return'] = cumulative_at_exit(out, daily['TOTAL'])
+    return out, skip_counts
+
+
+def holding_log_returns(ret_cube, sec, entry_day, exit_day, entry_field, exit_field):
+    """
+    (진입일, 청산일, 가격 필드) → 보유 기간 로그수익률 (누적 배열 차이, O(1))
+    """
+    lp = ret_cube['log_price']
+    return lp[exit_field, exit_day, sec] - lp[entry_field, entry_day, sec]
+
+
+def daily_portfolio_returns(ret_cube, sec, entry_day, exit_day, entry_field, exit_field,
+                            weight):
+    """
+    보유 중인 포지션을 거래일별로 집계한 포트폴리오 수익률 (기간이 겹치는 포지션 포함)
+    포지션마다 보유 구간(진입일 ~ 청산일)에 weight 를 차분 배열로 더해
+    (거래일 × 종목) 보유 행렬을 만든 뒤 일별 구간 수익률과 곱한다. 비용은 보유 기간과 무관.
+    weight: 롱 +1 / 숏 -1 (또는 임의 가중치), 롱/숏 북은 따로 호출 (같은 종목 상계 방지)
+    반환: (거래일별 가중 수익률 합, 거래일별 보유 가중치 절대값 합)
+    """
+    cc, oc, co = ret_cube['cc'], ret_cube['oc'], ret_cube['co']
+    D, S = cc.shape
+    open_idx = ret_cube['fields'].index('Open')
+
+    def holdings(start, stop, w):
+        # start..stop (포함) 구간에 w 를 더한 (D × S) 행렬
+        mask = stop >= start
+        diff = np.bincount(start[mask] * S + sec[mask], weights=w[mask],
+                           minlength=(D + 1) * S)
+        diff -= np.bincount((stop[mask] + 1) * S + sec[mask], weights=w[mask],
+                            minlength=(D + 1) * S)
+        return np.cumsum(diff.reshape(D + 1, S), axis=0)[:D]
+
+    open_entry = entry_field == open_idx
+    open_exit = exit_field == open_idx
+
+    # 종가 → 종가 구간: 진입 다음 날 ~ 청산일 (시가 청산이면 청산 전날까지)
+    h_cc = holdings(entry_day + 1, exit_day - open_exit, weight)
+    # 시가 진입일의 시가 → 종가 구간
+    h_oc = holdings(np.where(open_entry, entry_day, 0),
+                    np.where(open_entry & ~(open_exit & (exit_day == entry_day)),
+                             entry_day, -1), weight)
+    # 시가 청산일의 전일 종가 → 시가 구간
+    h_co = holdings(np.where(open_exit, exit_day, 0),
+                    np.where(open_exit & (exit_day > entry_day), exit_day, -1), weight)
+
+    pnl = (h_cc * np.nan_to_num(cc)).sum(axis=1) \
+        + (h_oc * np.nan_to_num(oc)).sum(axis=1) \
+        + (h_co * np.nan_to_num(co)).sum(axis=1)
+    gross = np.abs(h_cc).sum(axis=1) + np.abs(h_oc).sum(axis=1) \
+        + np.abs(h_co).sum(axis=1)
+    return pnl, gross
+
+
+def daily_book_returns(positions, cube, ret_cube, return_col='Return'):
+    """
+    포지션 DataFrame (calculate_positions) → 거래일별 롱/숏/전체 포트폴리오 수익률
+    그날 보유 중인 포지션 균등 가중 (daily_portfolio_returns 의 pnl / gross, 보유 기간이 겹치는 포지션 포함)
+    return_col 이 'Net Return' 이면 포지션 비용 ('Cost') 을 청산일에 차감
+    반환: DataFrame (index: 첫 진입일 ~ 마지막 청산일, columns: LONG / SHORT / TOTAL)
+    """
+    if positions.empty:
+        return pd.DataFrame(columns=['LONG', 'SHORT', 'TOTAL'], dtype=float)
+    dates, fields = cube['dates'], list(ret_cube['fields'])
+    sec = positions['Security ID'].to_numpy(dtype=np.int64)
+    entry_day = dates.get_indexer(pd.to_datetime(positions['Entry Date']))
+    exit_day = dates.get_indexer(pd.to_datetime(positions['Exit Date']))
+    entry_field = positions['Entry Field'].map(fields.index).to_numpy(dtype=np.int64)
+    exit_field = positions['Exit Field'].map(fields.index).to_numpy(dtype=np.int64)
+    sign = np.where(positions['Action'].to_numpy() == 'LONG', 1.0, -1.0)
+    cost = positions['Cost'].to_numpy(dtype=float) if return_col == 'Net Return' \
+        else np.zeros(len(positions))
+
+    books = {}
+    for name, mask in (('LONG', sign > 0), ('SHORT', sign < 0)):
+        pnl, gross = daily_portfolio_returns(ret_cube, sec[mask], entry_day[mask], exit_day[mask],
+                                             entry_field[mask], exit_field[mask], sign[mask])
+        pnl -= daily_costs(exit_day[mask], sign[mask], cost[mask], 0.0, len(pnl))
+        books[name] = (pnl, gross)
+
+    def book_return(pnl, gross):
+        return np.where(gross > 0, pnl / np.maximum(gross, 1e-12), 0.0)
+
+    (long_pnl, long_gross), (short_pnl, short_gross) = books['LONG'], books['SHORT']
+    window = slice(entry_day.min(), exit_day.max() + 1)
+    return pd.DataFrame({
+        'LONG': book_return(long_pnl, long_gross)[window],
+        'SHORT': book_return(short_pnl, short_gross)[window],
+        'TOTAL': book_return(long_pnl + short_pnl, long_gross + short_gross)[window]
+    }, index=dates[window].rename('Date'))
+
+
+def cumulative_at_exit(positions, daily):
+    """
+    거래일별 수익률 Series → 포지션 청산일 시점의 누적 수익률 (포지션 행 순서)
+    """
+    cum = (1 + daily).cumprod() - 1
+    return pd.to_datetime(positions['Exit Date']).map(cum).to_numpy()
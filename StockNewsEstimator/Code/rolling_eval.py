@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+from metrics_kernel import annual_trading_days, matrix_metrics
+
+# 롤링 / 워크포워드 평가: 카테고리별 델타-뉴트럴 일별 수익률을 (거래일 × 카테고리) 행렬로 놓고
+# 누적합(창 합계 = 두 누적합의 차)과 블록 누적 최대값(van Herk / Gil-Werman)으로
+# 모든 창의 지표를 O(거래일 × 카테고리) 에 한 번에 계산한다.
+
+data_path = '/Users/imdonghyeon/Desktop/Quantlab/final_수정/news_with_sector.csv'
+ROLLING_WINDOW = 63   # 약 3개월
+TRAIN_WINDOW = 126    # 약 6개월
+TEST_WINDOW = 21      # 약 1개월
+
+ROLLING_METRICS = ['mean_daily_return', 'annual_vol', 'sharpe_ratio', 'sortino_ratio',
+                   'hit_rate', 'drawdown']
+
+
+def category_return_matrix(all_results, column='long_short_return'):
+    """
+    all_results (카테고리 → {'daily': 일별 수익률 DataFrame}) → (거래일 × 카테고리) 수익률 행렬
+    카테고리에 뉴스가 없는 날은 포지션이 없으므로 수익률 0
+    """
+    return pd.DataFrame({category: data['daily'][column]
+                         for category, data in all_results.items() if 'daily' in data}).sort_index().fillna(0)
+
+
+def _window_sum(x, window):
+    # 누적합 차이로 창 합계 (앞쪽 window-1 개는 NaN)
+    c = np.cumsum(np.vstack([np.zeros((1, x.shape[1])), x]), axis=0)
+    out = np.full(x.shape, np.nan)
+    out[window - 1:] = c[window:] - c[:-window]
+    return out
+
+
+def rolling_max(x, window):
+    """
+    창 최대값 (van Herk / Gil-Werman): 블록 앞/뒤 누적 최대값 두 개로 O(n)
+    창 [t-window+1, t] 의 최대값 = max(뒤 누적[t-window+1], 앞 누적[t])
+    """
+    n, m = x.shape
+    n_blocks = -(-n // window)
+    padded = np.full((n_blocks * window, m), -np.inf)
+    padded[:n] = x
+    blocks = padded.reshape(n_blocks, window, m)
+    prefix = np.maximum.accumulate(blocks, axis=1).reshape(-1, m)
+    suffix = np.flip(np.maximum.accumulate(np.flip(blocks, axis=1), axis=1), axis=1).reshape(-1, m)
+
+    out = np.full((n, m), np.nan)
+    if n >= window:
+        out[window - 1:] = np.maximum(suffix[:n - window + 1], prefix[window - 1:n])
+    return out
+
+
+def rolling_metrics(returns_df, window=ROLLING_WINDOW, annual_days=None):
+    """
+    (거래일 × 카테고리) 수익률 → 지표별 (거래일 × 카테고리) DataFrame
+    정의는 calculate_performance_metrics 와 같고 (연율화는 전체 기간 기준 고정), 창이 다 차기 전은 NaN
+    hit_rate: 창 안에서 수익률 > 0 인 날의 비율
+    drawdown: 창 안 최고 누적가치 대비 현재 낙폭
+    """
+    x = returns_df.to_numpy(dtype=float)
+    annual_days = annual_trading_days(returns_df.index) if annual_days is None else annual_days
+
+    s1 = _window_sum(x, window)
+    s2 = _window_sum(x ** 2, window)
+    mean = s1 / window
+    var = np.maximum(s2 - s1 ** 2 / window, 0) / (window - 1)
+    annual_return = (1 + mean) ** annual_days - 1
+    annual_vol = np.sqrt(var) * np.sqrt(annual_days)
+
+    # 하방 변동성: 창 안 음수 수익률만의 표본 표준편차
+    neg = x < 0
+    k = _window_sum(neg.astype(float), window)
+    n1 = _window_sum(np.where(neg, x, 0), window)
+    n2 = _window_sum(np.where(neg, x ** 2, 0), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        down_var = np.maximum(n2 - n1 ** 2 / np.maximum(k, 1), 0) / (k - 1)
+        downside_vol = np.where(k > 1, np.sqrt(down_var), np.where(k == 1, np.nan, 0.0)) \
+            * np.sqrt(annual_days)
+        sharpe = np.where(annual_vol != 0, annual_return / annual_vol, 0.0)
+        sortino = np.where(downside_vol != 0, annual_return / downside_vol, 0.0)
+
+    # 누적가치 (로그 누적합) 와 창 최고점
+    wealth = np.exp(np.cumsum(np.log1p(x), axis=0))
+    drawdown = wealth / rolling_max(wealth, window) - 1
+
+    valid = ~np.isnan(s1)
+    frames = {
+        'mean_daily_return': mean,
+        'annual_vol': annual_vol,
+        'sharpe_ratio': np.where(valid, sharpe, np.nan),
+        'sortino_ratio': np.where(valid, sortino, np.nan),
+        'hit_rate': _window_sum((x > 0).astype(float), window) / window,
+        'drawdown': drawdown
+    }
+    return {m: pd.DataFrame(v, index=returns_df.index, columns=returns_df.columns)
+            for m, v in frames.items()}
+
+
+def walk_forward(returns_df, train=TRAIN_WINDOW, test=TEST_WINDOW, select_by='sharpe_ratio',
+                 top_k=None, min_score=0.0, exclude=('전체',), annual_days=None):
+    """
+    워크포워드: train 창 지표로 거래할 카테고리를 고르고 다음 test 구간에 동일가중 보유
+    선택: select_by 가 min_score 초과인 카테고리 (top_k 가 있으면 상위 top_k 개)
+    train 창 지표는 rolling_metrics 결과에서 분할 시점 값을 바로 조회 (창 재계산 없음)
+    반환: (표본 외 일별 수익률 DataFrame [oos_return, n_selected], 분할별 선택 DataFrame, 표본 외 지표 dict)
+    """
+    candidates = returns_df.drop(columns=[c for c in exclude if c in returns_df.columns])
+    annual_days = annual_trading_days(returns_df.index) if annual_days is None else annual_days
+    scores = rolling_metrics(candidates, train, annual_days)[select_by].to_numpy()
+    x = candidates.to_numpy(dtype=float)
+    n = len(x)
+
+    oos = np.full(n, np.nan)
+    n_selected = np.zeros(n, dtype=np.int64)
+    splits = []
+    for end in range(train, n, test):
+        score = scores[end - 1]
+        chosen = np.flatnonzero(score > min_score)
+        if top_k is not None:
+            chosen = chosen[np.argsort(-score[chosen], kind='stable')[:top_k]]
+        period = slice(end, min(end + test, n))
+        oos[period] = x[period][:, chosen].mean(axis=1) if len(chosen) else 0.0
+        n_selected[period] = len(chosen)
+        splits.append({
+            'train_start': returns_df.index[end - train],
+            'train_end': returns_df.index[end - 1],
+            'test_start': returns_df.index[period.start],
+            'test_end': returns_df.index[period.stop - 1],
+            'n_selected': len(chosen),
+            'selected': ', '.join(map(str, candidates.columns[chosen]))
+        })
+
+    oos_df = pd.DataFrame({'oos_return': oos, 'n_selected': n_selected},
+                          index=returns_df.index).dropna(subset=['oos_return'])
+    metrics = {m: v[0] for m, v in matrix_metrics(oos_df['oos_return'].to_numpy(), annual_days).items()} \
+        if len(oos_df) else {}
+    return oos_df, pd.DataFrame(splits), metrics
+
+
+# 메인 실행 코드
+if __name__ == "__main__":
+    from daily_aggregates import category_cells, category_membership, delta_neutral_by_category
+
+    df = pd.read_csv(data_path)
+    df['long_return'] = pd.to_numeric(df['long_return'], errors='coerce').fillna(0)
+    df['short_return'] = pd.to_numeric(df['short_return'], errors='coerce').fillna(0)
+    df['current_date'] = pd.to_datetime(df['current_date'])
+
+    for category_col in ['Sector', '규모구분']:
+        # 카테고리별 델타-뉴트럴 일별 수익률 (전체 포함, 셀 집계 한 번)
+        cells = category_cells(df, category_membership(df, category_col))
+        all_results = {category: {'daily': daily}
+                       for category, daily in delta_neutral_by_category(df, cells).items()}
+        returns_df = category_return_matrix(all_results)
+
+        # 롤링 지표 (카테고리 전체 동시)
+        rolling = rolling_metrics(returns_df)
+        for m, frame in rolling.items():
+            frame.to_csv(f'rolling_{m}_{category_col}.csv', encoding='utf-8-sig')
+        print(f"\n📈 {category_col} 롤링 샤프 ({ROLLING_WINDOW}일) 최근값:")
+        print(rolling['sharpe_ratio'].iloc[-1].sort_values(ascending=False).round(3).to_string())
+
+        # 워크포워드 카테고리 선택
+        oos_df, splits, metrics = walk_forward(returns_df)
+        oos_df.to_csv(f'walk_forward_{category_col}.csv', encoding='utf-8-sig')
+        splits.to_csv(f'walk_forward_splits_{category_col}.csv', encoding='utf-8-sig', index=False)
+        if metrics:
+            print(f"🚶 워크포워드 표본 외: 누적 {metrics['total_return']:.2%}, "
+                  f"샤프 {metrics['sharpe_ratio']:.2f}, MDD {metrics['max_drawdown']:.2%}")
+        print(f"✅ 저장: rolling_*_{category_col}.csv, walk_forward_{category_col}.csv")
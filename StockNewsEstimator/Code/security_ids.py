@@ -0,0 +1,110 @@
+import pandas as pd
+import numpy as np
+
+# KRX 종목코드 → 정수 security_id (0부터 연속된 값) 매핑
+# 기업명 문자열 대신 정수 키로 병합/그룹화하고, 기업명은 출력용으로만 사용한다.
+
+security_master_path = '/Users/imdonghyeon/Desktop/Quantlab/security_master.csv'
+
+MISSING_ID = -1
+
+
+def normalize_code(codes):
+    """
+    종목코드 정규화: FnGuide 'A005930' / pykrx '005930' / 숫자 5930 → '005930'
+    """
+    codes = pd.Series(codes, dtype=object)
+    missing = codes.isna().to_numpy()
+    codes = codes.astype(str).str.strip().str.upper()\
+        .str.replace(r'\.0$', '', regex=True)\
+        .str.replace(r'^A(?=[0-9A-Z]{6}$)', '', regex=True)\
+        .str.zfill(6)
+    return codes.mask(missing | (codes == '000000').to_numpy(), None)
+
+
+def build_security_master(codes, names=None, markets=None):
+    """
+    종목코드 목록으로 security_id 마스터 테이블 생성
+    (정렬된 코드 순서대로 0, 1, 2, ... 부여 → security_id == 행 위치)
+    markets: 종목별 시장 ('KOSPI' / 'KOSDAQ', 거래세 계산용, 선택)
+    """
+    master = pd.DataFrame({
+        'code': normalize_code(codes).to_numpy(),
+        'name': pd.Series(names, dtype=object).astype(str).str.strip().to_numpy() if names is not None else None
+    })
+    if markets is not None:
+        master['market'] = pd.Series(markets, dtype=object).to_numpy()
+    master = master.dropna(subset=['code'])
+    master = master.drop_duplicates('code').sort_values(
+        'code').reset_index(drop=True)
+    master.insert(0, 'security_id', np.arange(len(master), dtype=np.int64))
+    return master
+
+
+def extend_security_master(master, codes, names=None, markets=None):
+    """
+    마스터에 없는 종목코드만 뒤에 추가 (기존 security_id 는 그대로 유지)
+    """
+    new = build_security_master(codes, names, markets)
+    new = new[~new['code'].isin(master['code'])].copy()
+    if new.empty:
+        return master
+    new['security_id'] = np.arange(
+        len(master), len(master) + len(new), dtype=np.int64)
+    return pd.concat([master, new], ignore_index=True)
+
+
+def save_security_master(master, path=security_master_path):
+    master.to_csv(path, index=False, encoding='utf-8-sig')
+
+
+def load_security_master(path=security_master_path):
+    master = pd.read_csv(path, dtype={'code': str, 'name': str, 'market': str})
+    master['security_id'] = master['security_id'].astype(np.int64)
+    return master.sort_values('security_id').reset_index(drop=True)
+
+
+def lookup_security_id(master, codes=None, names=None):
+    """
+    종목코드(우선) 또는 기업명으로 security_id 배열 조회, 없으면 -1
+    """
+    n = len(codes) if codes is not None else len(names)
+    ids = np.full(n, MISSING_ID, dtype=np.int64)
+
+    if codes is not None:
+        code_index = pd.Index(master['code'])
+        ids = code_index.get_indexer(normalize_code(codes)).astype(np.int64)
+        ids = np.where(ids >= 0, master['security_id'].to_numpy()[ids], MISSING_ID)
+
+    if names is not None:
+        by_name = master.dropna(subset=['name']).drop_duplicates('name')
+        name_index = pd.Index(by_name['name'])
+        pos = name_index.get_indexer(
+            pd.Series(names, dtype=object).astype(str).str.strip())
+        from_name = np.where(
+            pos >= 0, by_name['security_id'].to_numpy()[pos], MISSING_ID)
+        ids = np.where(ids == MISSING_ID, from_name, ids)
+
+    return ids
+
+
+def attach_security_id(df, master, code_col='ticker', name_col='company'):
+    """
+    df 에 security_id 컬럼(int64, 매칭 실패 -1) 추가
+    """
+    df = df.copy()
+    codes = df[code_col] if code_col in df.columns else None
+    names = df[name_col] if name_col in df.columns else None
+    if codes is None and names is None:
+        raise KeyError(f"'{code_col}' 또는 '{name_col}' 컬럼이 필요합니다.")
+    df['security_id'] = lookup_security_id(master, codes, names)
+    return df
+
+
+def security_names(master, ids):
+    """
+    security_id 배열 → 기업명 (출력용)
+    """
+    names = master['name'].to_numpy()
+    ids = np.asarray(ids)
+    return np.where(ids >= 0, names[np.clip(ids, 0, len(names) - 1)], None)
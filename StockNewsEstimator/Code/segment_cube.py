@@ -0,0 +1,204 @@
+import time
+import numpy as np
+import pandas as pd
+from daily_aggregates import date_codes
+from metrics_kernel import compute_metrics
+
+# 규모 × 스타일 × 섹터 × 뉴스 시점 세그먼트 큐브
+# 뉴스 행을 (차원 값 조합 × 거래일) 셀로 한 번 집계해 롱/숏 수익률 합과 종목 수만 저장하고,
+# 임의의 롤업/드릴다운은 조합 선택 행렬 × 셀 배열 곱으로 원본 행 없이 계산한다.
+
+data_path = '/Users/imdonghyeon/Desktop/Quantlab/final_수정/news_with_sector.csv'
+cube_path = '/Users/imdonghyeon/Desktop/Quantlab/final_수정/segment_cube.pkl'
+
+# 차원 이름 → 뉴스 데이터 컬럼
+SEGMENT_DIMENSIONS = {
+    'size': '규모구분',
+    'style': '스타일',
+    'sector': 'Sector',
+    'session': 'session'
+}
+
+# 셀별 저장 값 (조합 × 거래일)
+CELL_SUMS = ['sum_long', 'sum_short', 'sum_avg']
+CELL_COUNTS = ['n_long', 'n_short', 'n_avg', 'n_rows']
+
+SERIES_COLUMNS = ['long_return', 'short_return', 'long_short_return', 'benchmark_return']
+
+
+def session_labels(df):
+    """
+    tag1 / tag2 → 뉴스 시점 라벨 (DAY-OFF / PRE / IN / AFTER), 태그가 없으면 None
+    """
+    tag1 = df['tag1'].to_numpy(dtype=object)
+    return pd.Series(np.where(tag1 == 'DAY-OFF', 'DAY-OFF', df['tag2'].to_numpy(dtype=object)),
+                     index=df.index).where(df['tag1'].notna())
+
+
+def build_segment_cube(df, dimensions=SEGMENT_DIMENSIONS, date_col='current_date'):
+    """
+    뉴스 행 → 세그먼트 큐브 dict
+    dimensions 중 df 에 없는 컬럼은 제외, 결측 값은 코드 -1 (해당 차원으로 필터하면 제외, 롤업에는 포함)
+    combos: (조합 × 차원) 값 코드, 행이 있는 조합만 저장
+    """
+    dimensions = {name: col for name, col in dimensions.items() if col in df.columns}
+    day, dates = date_codes(df, date_col)
+    ok = day >= 0
+
+    # 값 조합 → 혼합 진법 정수 키 (결측 -1 은 0 자리) → 조합 번호
+    labels, codes, key = {}, [], np.zeros(int(ok.sum()), dtype=np.int64)
+    for name, col in dimensions.items():
+        code, values = pd.factorize(df[col], sort=True)
+        labels[name] = np.asarray(values, dtype=object)
+        codes.append(code[ok])
+        key = key * (len(values) + 1) + code[ok] + 1
+    day = day[ok]
+
+    keys, combo = np.unique(key, return_inverse=True)
+    first = np.zeros(len(keys), dtype=np.int64)
+    first[combo] = np.arange(len(combo))
+    combos = np.column_stack([code[first] for code in codes]) if codes else np.zeros((len(keys), 0), dtype=np.int64)
+    n_combo, n_days = len(combos), len(dates)
+    cell = combo * n_days + day
+
+    long_ret = df['long_return'].to_numpy(dtype=float)[ok]
+    short_ret = df['short_return'].to_numpy(dtype=float)[ok]
+    avg_return = (long_ret + short_ret) / 2
+    has_avg = ~np.isnan(avg_return)
+
+    def cell_sum(weights=None):
+        return np.bincount(cell, weights=weights, minlength=n_combo * n_days).reshape(n_combo, n_days)
+
+    return {
+        'dimensions': dimensions,
+        'labels': labels,
+        'dates': dates,
+        'combos': combos.astype(np.int32),
+        'sum_long': cell_sum(long_ret),
+        'sum_short': cell_sum(short_ret),
+        'sum_avg': cell_sum(np.where(has_avg, avg_return, 0.0)),
+        'n_long': cell_sum(long_ret != 0).astype(np.int32),
+        'n_short': cell_sum(short_ret != 0).astype(np.int32),
+        'n_avg': cell_sum(has_avg).astype(np.int32),
+        'n_rows': cell_sum().astype(np.int32)
+    }
+
+
+def save_segment_cube(cube, path=cube_path):
+    pd.to_pickle(cube, path)
+
+
+def load_segment_cube(path=cube_path):
+    return pd.read_pickle(path)
+
+
+def _combo_mask(cube, filters):
+    # 필터 (차원 → 값 또는 값 목록) 를 모두 만족하는 조합 bool 배열, 지정하지 않은 차원은 롤업
+    names = list(cube['dimensions'])
+    mask = np.ones(len(cube['combos']), dtype=bool)
+    for name, values in filters.items():
+        if name not in cube['labels']:
+            raise KeyError(f"알 수 없는 차원: {name} (가능: {names})")
+        values = [values] if np.isscalar(values) or values is None else list(values)
+        wanted = np.flatnonzero(np.isin(cube['labels'][name], values))
+        mask &= np.isin(cube['combos'][:, names.index(name)], wanted)
+    return mask
+
+
+def _segment_daily(cube, select):
+    """
+    (세그먼트 × 조합) 선택 행렬 → 세그먼트별 일별 DataFrame 목록 (행이 있는 거래일만)
+    delta_neutral_daily / equal_weight_daily 와 같은 정의 (롱/숏 각 0.5 / n 가중, 동일가중 평균)
+    """
+    select = select.astype(float)
+    total = {k: select @ cube[k] for k in CELL_SUMS}
+    count = {k: np.rint(select @ cube[k]).astype(np.int64) for k in CELL_COUNTS}
+
+    weighted_long = total['sum_long'] * np.where(count['n_long'] > 0, 0.5 / np.maximum(count['n_long'], 1), 0.0)
+    weighted_short = total['sum_short'] * np.where(count['n_short'] > 0, 0.5 / np.maximum(count['n_short'], 1), 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        benchmark = total['sum_avg'] / count['n_avg']
+
+    frames = []
+    for k in range(len(select)):
+        present = count['n_rows'][k] > 0
+        frames.append(pd.DataFrame({
+            'long_return': weighted_long[k, present],
+            'short_return': weighted_short[k, present],
+            'long_short_return': weighted_long[k, present] + weighted_short[k, present],
+            'benchmark_return': benchmark[k, present],
+            'n_long': count['n_long'][k, present],
+            'n_short': count['n_short'][k, present],
+            'n_total': count['n_long'][k, present] + count['n_short'][k, present],
+            'n_stocks': count['n_rows'][k, present]
+        }, index=cube['dates'][present]))
+    return frames
+
+
+def query_segment(cube, **filters):
+    """
+    하나의 세그먼트 일별 수익률, 예: query_segment(cube, style=['성장주', '성장주+가치주'], size='대형주', session='PRE')
+    값 목록은 합집합, 지정하지 않은 차원은 모두 포함
+    """
+    return _segment_daily(cube, _combo_mask(cube, filters)[None, :])[0]
+
+
+def drill_down(cube, by, **filters):
+    """
+    filters 세그먼트를 차원 by 의 값별로 나눈 일별 수익률 dict (값 → DataFrame, 행이 없는 값은 제외)
+    """
+    names = list(cube['dimensions'])
+    if by not in cube['labels']:
+        raise KeyError(f"알 수 없는 차원: {by} (가능: {names})")
+    mask = _combo_mask(cube, filters)
+    values = cube['labels'][by]
+    select = (cube['combos'][:, names.index(by)][None, :] == np.arange(len(values))[:, None]) & mask
+
+    return {value: daily for value, daily in zip(values, _segment_daily(cube, select)) if len(daily)}
+
+
+def segment_metrics(daily):
+    """
+    세그먼트 일별 수익률 → (롱 / 숏 / 롱숏 / 벤치마크 × 지표) DataFrame, 벤치마크 대비 지표 포함
+    """
+    returns = daily[SERIES_COLUMNS].fillna(0)
+    return compute_metrics(returns, benchmark=returns['benchmark_return'])
+
+
+def drill_down_metrics(cube, by, **filters):
+    """
+    drill_down 의 값별 지표를 ((값, 시계열) × 지표) DataFrame 하나로
+    """
+    results = drill_down(cube, by, **filters)
+    return pd.concat({value: segment_metrics(daily) for value, daily in results.items()},
+                     names=[by, 'series'])
+
+
+# 메인 실행 코드
+if __name__ == "__main__":
+    df = pd.read_csv(data_path)
+    df['long_return'] = pd.to_numeric(df['long_return'], errors='coerce').fillna(0)
+    df['short_return'] = pd.to_numeric(df['short_return'], errors='coerce').fillna(0)
+    if 'session' not in df.columns and {'tag1', 'tag2'} <= set(df.columns):
+        df['session'] = session_labels(df)
+
+    start = time.perf_counter()
+    cube = build_segment_cube(df)
+    save_segment_cube(cube)
+    print(f"🧊 세그먼트 큐브: 차원 {list(cube['dimensions'])}, 조합 {len(cube['combos']):,}개 × "
+          f"{len(cube['dates'])}거래일 ({time.perf_counter() - start:.2f}s) → {cube_path}")
+
+    for dimension in cube['dimensions']:
+        start = time.perf_counter()
+        metrics = drill_down_metrics(cube, dimension)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\n📊 {dimension} 별 롱숏 지표 ({elapsed:.1f}ms)")
+        print(metrics.xs('long_short_return', level='series')[
+            ['total_return', 'sharpe_ratio', 'max_drawdown', 'alpha']].round(4).to_string())
+
+    if {'style', 'size'} <= set(cube['dimensions']):
+        start = time.perf_counter()
+        daily = query_segment(cube, style=['성장주', '성장주+가치주'], size=cube['labels']['size'][0])
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\n🔎 성장주 × {cube['labels']['size'][0]}: {len(daily)}거래일, "
+              f"롱숏 누적 {(1 + daily['long_short_return']).prod() - 1:.2%} ({elapsed:.1f}ms)")
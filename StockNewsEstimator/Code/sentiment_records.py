@@ -0,0 +1,100 @@
+import json
+import pandas as pd
+import numpy as np
+
+# GPT_기업별감성 ("A(1), B(-1)") 문자열 대신 쓰는 기업별 감성 레코드
+# 기사 하나에 기업이 여러 개면 기업마다 한 행: (article_id, company, ticker, score, confidence)
+
+RECORD_COLUMNS = ['article_id', 'company', 'ticker', 'score', 'confidence']
+
+# "기업명(점수)" 한 쌍 (쉼표로 구분된 목록에서 반복 추출)
+SENTIMENT_PATTERN = r'\s*([^,()]+?)\s*\(([-+]?[0-9]*\.?[0-9]+)\)'
+
+
+def load_name_to_code(matched_path):
+    """
+    matched_companies.json (기업명 → KRX 코드) 로드, 매칭 실패(null)는 제외
+    """
+    with open(matched_path, 'r', encoding='utf-8') as f:
+        matched = json.load(f)
+    return {name: code for name, code in matched.items() if code}
+
+
+def ensure_article_ids(df, id_col='article_id'):
+    """
+    기사 고유 id 컬럼 보장: 이미 있으면 정수로 유지 (중복이면 오류), 없으면 현재 행 위치로 새로 부여
+    1-GPTScore.py 가 파일에 써 두면 이후 단계에서 행이 빠지거나 순서가 바뀌어도 레코드와 같은 기사로 결합된다.
+    """
+    df = df.copy()
+    if id_col in df.columns:
+        df[id_col] = pd.to_numeric(df[id_col], errors='raise').astype(np.int64)
+        if df[id_col].duplicated().any():
+            raise ValueError(f"{id_col} 가 중복됩니다 (기사당 하나여야 함).")
+    else:
+        df[id_col] = np.arange(len(df), dtype=np.int64)
+    return df
+
+
+def make_records(rows, name_to_code=None):
+    """
+    (article_id, company, score, confidence) 목록을 레코드 테이블로 변환
+    """
+    records = pd.DataFrame(rows, columns=[
+                           'article_id', 'company', 'score', 'confidence'])
+    return attach_tickers(records, name_to_code)
+
+
+def attach_tickers(records, name_to_code=None):
+    """
+    기업명으로 ticker 컬럼 채우기 (매핑이 없으면 결측)
+    """
+    records = records.copy()
+    if name_to_code:
+        records['ticker'] = records['company'].map(name_to_code)
+    elif 'ticker' not in records.columns:
+        records['ticker'] = None
+    records['article_id'] = records['article_id'].astype(np.int64)
+    records['score'] = pd.to_numeric(records['score'], errors='coerce')
+    records['confidence'] = pd.to_numeric(
+        records['confidence'], errors='coerce')
+    return records[RECORD_COLUMNS]
+
+
+def explode_sentiment(df, sentiment_col='GPT_기업별감성', name_to_code=None):
+    """
+    기존 "A(1), B(-1)" 문자열 컬럼을 레코드 테이블로 펼치기 (벡터화)
+    article_id 는 df 의 인덱스(기본 RangeIndex = 행 위치),
+    confidence 는 기존 형식에 없으므로 결측
+    """
+    pairs = df[sentiment_col].str.extractall(SENTIMENT_PATTERN)
+
+    records = pd.DataFrame({
+        'article_id': pairs.index.get_level_values(0),
+        'company': pairs[0].to_numpy(),
+        'score': pairs[1].to_numpy(),
+        'confidence': np.nan
+    })
+    return attach_tickers(records, name_to_code)
+
+
+def implode_sentiment(records, n_articles=None):
+    """
+    레코드 테이블을 기존 GPT_기업별감성 문자열로 되돌리기 (호환용)
+    """
+    score = records['score'].astype('Int64').astype(str)
+    pair = records['company'] + '(' + score + ')'
+    joined = pair.groupby(records['article_id']).agg(', '.join)
+    if n_articles is not None:
+        joined = joined.reindex(range(n_articles), fill_value='')
+    return joined
+
+
+def rename_companies(records, name_map, name_to_code=None):
+    """
+    기업명 변경 매핑(구 → 신)을 레코드에 적용 (3-FinalName.py 의 정규식 치환 대체)
+    """
+    records = records.copy()
+    records['company'] = records['company'].replace(name_map)
+    if name_to_code:
+        records['ticker'] = records['company'].map(name_to_code)
+    return records
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# 같은 기업·같은 세션에 여러 헤드라인이 있을 때 점수를 하나로 합쳐 포지션 하나만 연다.
+# 그룹 키는 정수 배열 (security_id, 기준 거래일, 세션 규칙 번호 등) 로 만든다.
+
+NETTING_MODES = ['sum', 'mean', 'latest', 'confidence']
+
+
+def signal_groups(*keys):
+    """
+    정수 키 배열들 → 그룹 번호 배열 (0부터 연속)
+    """
+    stacked = np.column_stack([np.asarray(k, dtype=np.int64) for k in keys])
+    _, group = np.unique(stacked, axis=0, return_inverse=True)
+    return group.reshape(-1)
+
+
+def net_scores(group, score, mode='sum', confidence=None):
+    """
+    그룹별 점수 합산
+    sum: 점수 합 (롱/숏이 섞이면 상계), mean: 평균, latest: 그룹의 마지막 행 (파일 순서 = 시간 순),
+    confidence: 신뢰도 가중 평균 (신뢰도가 없는 행은 가중치 1)
+    점수가 없는(NaN) 행은 합산에서 빠지고, 모두 없으면 NaN
+    반환: (대표 행 위치 = 그룹의 마지막 행, 합산 점수, 그룹별 유효 헤드라인 수)
+    """
+    if mode not in NETTING_MODES:
+        raise ValueError(f"netting mode 는 {NETTING_MODES} 중 하나: {mode}")
+    group = np.asarray(group, dtype=np.int64)
+    score = np.asarray(score, dtype=float)
+    n_groups = int(group.max()) + 1 if len(group) else 0
+
+    # 그룹별 마지막 행 (행 위치가 큰 쪽이 최신)
+    rep = np.full(n_groups, -1, dtype=np.int64)
+    np.maximum.at(rep, group, np.arange(len(group)))
+
+    has = ~np.isnan(score)
+    s = np.where(has, score, 0.0)
+    count = np.bincount(group, weights=has, minlength=n_groups)
+
+    if mode == 'sum':
+        net = np.bincount(group, weights=s, minlength=n_groups)
+    elif mode == 'mean':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            net = np.bincount(group, weights=s, minlength=n_groups) / count
+    elif mode == 'latest':
+        # 점수가 있는 마지막 행
+        last = np.full(n_groups, -1, dtype=np.int64)
+        np.maximum.at(last, group[has], np.flatnonzero(has))
+        net = np.where(last >= 0, score[np.clip(last, 0, None)], np.nan)
+    else:
+        w = np.ones(len(score)) if confidence is None \
+            else np.nan_to_num(np.asarray(confidence, dtype=float), nan=1.0)
+        w = np.where(has, w, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            net = np.bincount(group, weights=w * s, minlength=n_groups) \
+                / np.bincount(group, weights=w, minlength=n_groups)
+
+    net = np.where(count > 0, net, np.nan)
+    return rep, net, count.astype(np.int64)
+
+
+def net_signals(df, keys, mode='sum', score_col='GPT_SCORE', confidence_col='confidence'):
+    """
+    DataFrame 단위 합산: keys 컬럼 조합별로 마지막 행을 남기고 score_col 을 합산 점수로 교체
+    (문자열 키는 정수 코드로 바꿔 그룹화), 'n_signals' 컬럼 추가
+    """
+    codes = [pd.factorize(df[k], use_na_sentinel=True)[0] for k in keys]
+    group = signal_groups(*codes)
+    confidence = df[confidence_col] if confidence_col in df.columns else None
+    rep, net, count = net_scores(group, pd.to_numeric(df[score_col], errors='coerce'),
+                                 mode, confidence)
+    order = np.argsort(rep, kind='stable')
+    out = df.iloc[rep[order]].copy()
+    out[score_col] = net[order]
+    out['n_signals'] = count[order]
+    return out.reset_index(drop=True)
@@ -1,182 +1,180 @@
 import os
+import glob
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 import re
 import matplotlib.pyplot as plt
 from tqdm import tqdm
+from security_ids import (build_security_master, extend_security_master, load_security_master,
+                          lookup_security_id, security_master_path)
+from position_engine import (build_price_cube, build_return_cube, calculate_positions, cumulative_at_exit,
+                             daily_book_returns, SKIP_REASONS)
+from cost_model import COST_PARAMS, market_codes
 
 # 설정
 news_folder = '/Users/imdonghyeon/Desktop/Quantlab/news_tags'
 output_folder = '/Users/imdonghyeon/Desktop/Quantlab/portfolio_results'
 stock_path = '/Users/imdonghyeon/Desktop/Quantlab/stockdata.xlsx'
-os.makedirs(output_folder, exist_ok=True)
+
+# 단일 월 실행: 뉴스 파일 경로 지정 / None 이면 news_folder 의 모든 월을 병렬 실행
+news_path = None
+MAX_WORKERS = None  # None 이면 CPU 코어 수
+# 기본 청산일 이후 추가 보유 거래일 수 (0 이면 기존 당일/익일 청산)
+EXIT_SHIFT = 0
+# 거래비용 (수수료/스프레드/매도세/대차비용) 차감 여부 → 'Net Return' 기준으로 누적/요약
+# (기본은 기존과 같은 비용 전 수익률, marketbench-delta.py 의 APPLY_COSTS 와 같은 기본값)
+APPLY_COSTS = False
+# 같은 기업·세션의 여러 헤드라인 점수 합산 방식 ('sum' / 'mean' / 'latest' / 'confidence', None 이면 헤드라인별 포지션)
+NETTING = None
 
 
 # ── 0. 주가 데이터 로드 & 전처리 (Wide → Long) ─────────────────────────
-stock_df = pd.read_excel(stock_path, dtype=str)
-stock_df.columns = [c.strip() if isinstance(
-    c, str) else c for c in stock_df.columns]
-# Symbol Name 컬럼도 strip
-stock_df['Symbol Name'] = stock_df['Symbol Name'].str.strip()
-
-date_cols = [c for c in stock_df.columns if isinstance(
-    c, str) and re.fullmatch(r'\d{4}-\d{2}-\d{2}', c)]
-stock_long = stock_df.melt(
-    id_vars=['Symbol Name', 'Item Name'],
-    value_vars=date_cols,
-    var_name='Date',
-    value_name='Price'
-)
-stock_long['Date'] = pd.to_datetime(stock_long['Date'])
-stock_long['Price'] = stock_long['Price'].str.replace(',', '').astype(float)
-
-open_df = stock_long.query("`Item Name`=='시가(원)'")\
-    .rename(columns={'Price': 'Open'}).drop(columns='Item Name')
-close_df = stock_long.query("`Item Name`=='수정주가 (현금배당반영)(원)'")\
-    .rename(columns={'Price': 'Close'}).drop(columns='Item Name')
-price_df = pd.merge(open_df, close_df, on=['Symbol Name', 'Date'], how='inner')
+def load_price_data(stock_path):
+    """
+    주가 엑셀 → (price_df, security_id 마스터)
+    """
+    stock_df = pd.read_excel(stock_path, dtype=str)
+    stock_df.columns = [c.strip() if isinstance(
+        c, str) else c for c in stock_df.columns]
+    # Symbol Name 컬럼도 strip
+    stock_df['Symbol Name'] = stock_df['Symbol Name'].str.strip()
+
+    date_cols = [c for c in stock_df.columns if isinstance(
+        c, str) and re.fullmatch(r'\d{4}-\d{2}-\d{2}', c)]
+    stock_long = stock_df.melt(
+        id_vars=['Symbol', 'Symbol Name', 'Item Name'],
+        value_vars=date_cols,
+        var_name='Date',
+        value_name='Price'
+    )
+    stock_long['Date'] = pd.to_datetime(stock_long['Date'])
+    stock_long['Price'] = stock_long['Price'].str.replace(
+        ',', '').astype(float)
+
+    # 종목코드 → 정수 security_id (병합/조회는 정수 키, 기업명은 출력용)
+    symbols = stock_df[['Symbol', 'Symbol Name']].drop_duplicates('Symbol')
+    if os.path.exists(security_master_path):
+        master = extend_security_master(load_security_master(
+            security_master_path), symbols['Symbol'], symbols['Symbol Name'])
+    else:
+        master = build_security_master(
+            symbols['Symbol'], symbols['Symbol Name'])
+    stock_long['security_id'] = lookup_security_id(
+        master, codes=stock_long['Symbol'])
+    stock_long = stock_long.drop(columns=['Symbol', 'Symbol Name'])
+
+    open_df = stock_long.query("`Item Name`=='시가(원)'")\
+        .rename(columns={'Price': 'Open'}).drop(columns='Item Name')
+    close_df = stock_long.query("`Item Name`=='수정주가 (현금배당반영)(원)'")\
+        .rename(columns={'Price': 'Close'}).drop(columns='Item Name')
+    price_df = pd.merge(open_df, close_df, on=[
+                        'security_id', 'Date'], how='inner')
+    return price_df, master
 
-# ── 1. 뉴스 로드 & 전처리 ───────────────────────────────────────────
-news_df = pd.read_excel(news_path, dtype=str)
-news_df.columns = [c.strip() for c in news_df.columns]
 
-# 날짜, 점수, 기업명/심볼 처리
-news_df['일자'] = pd.to_datetime(news_df['일자'])
-news_df['거래일'] = news_df['일자'].dt.date
-news_df['GPT_SCORE'] = pd.to_numeric(news_df['GPT_SCORE'], errors='coerce')
+# ── 1. 뉴스 로드 & 전처리 ───────────────────────────────────────────
+def load_news(news_path, master):
+    news_df = pd.read_excel(news_path, dtype=str)
+    news_df.columns = [c.strip() for c in news_df.columns]
+
+    # 날짜, 점수, 기업명/심볼 처리
+    news_df['일자'] = pd.to_datetime(news_df['일자'])
+    news_df['거래일'] = news_df['일자'].dt.date
+    news_df['GPT_SCORE'] = pd.to_numeric(
+        news_df['GPT_SCORE'], errors='coerce')
+
+    # 매칭 키: security_id 가 있으면 그대로, 없으면 'Symbol Name' / '기업명' 으로 조회
+    if 'security_id' in news_df.columns:
+        news_df['security_id'] = pd.to_numeric(
+            news_df['security_id'], errors='coerce').fillna(-1).astype('int64')
+    elif 'Symbol Name' in news_df.columns:
+        news_df['security_id'] = lookup_security_id(
+            master, names=news_df['Symbol Name'])
+    else:
+        news_df['security_id'] = lookup_security_id(
+            master, names=news_df['기업명'])
+    return news_df
 
-# 어떤 컬럼을 매칭에 쓸지 결정
-# 우선 news_df에 'Symbol Name' 있으면, 그걸 쓰고, 없으면 '기업명' 사용
-if 'Symbol Name' in news_df.columns:
-    news_df['MatchName'] = news_df['Symbol Name'].str.strip()
-else:
-    news_df['MatchName'] = news_df['기업명'].str.strip()
 
 # ── 2. 수익률 계산 함수 ──────────────────────────────────────────────
-
-
-def calculate_positions_with_tags(df, price_df):
-    days = sorted(price_df['Date'].dt.date.unique())
-    next_map = {d: days[i+1] if i+1 <
-                len(days) else None for i, d in enumerate(days)}
-    records, skipped, processed = [], 0, 0
-
-    for _, row in df.iterrows():
-        d = row['거래일']
-        sym = row['MatchName']
-        score = row['GPT_SCORE']
-        tag1, tag2 = row.get('tag1', ''), row.get('tag2', '')
-
-        # 필터
-        if pd.isna(score) or score == 0:
-            skipped += 1
-            continue
-
-        # 종목 매칭
-        if sym not in price_df['Symbol Name'].values:
-            skipped += 1
-            continue
-
-        action = 'LONG' if score > 0 else 'SHORT'
-        nxt = next_map.get(d)
-        if nxt is None:
-            skipped += 1
-            continue
-
-        # 진입·청산 시점 결정
-        if tag1 == 'DAY-OFF':
-            Ein, Eout, ti, to = nxt, nxt, 'Open', 'Close'
-        elif tag1 == 'DAY-IN' and tag2 == 'PRE':
-            Ein, Eout, ti, to = d, d, 'Open', 'Close'
-        elif tag1 == 'DAY-IN' and tag2 == 'IN':
-            Ein, Eout, ti, to = d, nxt, 'Close', 'Close'
-        elif tag1 == 'DAY-IN' and tag2 == 'AFTER':
-            Ein, Eout, ti, to = nxt, nxt, 'Open', 'Close'
-        else:
-            skipped += 1
-            continue
-
-        er = price_df[(price_df['Symbol Name'] == sym)
-                      & (price_df['Date'] == Ein)]
-        xr = price_df[(price_df['Symbol Name'] == sym)
-                      & (price_df['Date'] == Eout)]
-        if er.empty or xr.empty:
-            skipped += 1
-            continue
-
-        entry, exit_ = er[ti].iat[0], xr[to].iat[0]
-        if entry == 0 or pd.isna(entry) or pd.isna(exit_):
-            skipped += 1
-            continue
-
-        ret = (exit_-entry)/entry if action == 'LONG' else (entry-exit_)/entry
-        records.append([d, sym, action, Ein, Eout, entry, exit_, ret])
-        processed += 1
-
-    if not records:
-        return pd.DataFrame(), processed, skipped
-
-    out = pd.DataFrame(records, columns=[
-        'Date', 'Company', 'Action', 'Entry Date', 'Exit Date', 'Entry', 'Exit', 'Return'
-    ]).sort_values('Date')
-    daily = out.groupby('Date')['Return'].mean()
-    out['Cumulative Return'] = out['Date'].map((1+daily).cumprod()-1)
-    return out, processed, skipped
-
-
-# ── 3. 단일 뉴스 처리 ───────────────────────────────────────────
-result_df, proc, skip = calculate_positions_with_tags(news_df, price_df)
-print(f"✅ 처리: {proc}건, 스킵: {skip}건")
-
-if result_df.empty:
-    print("⚠️ 유효 포지션 없음 – 종료")
-    exit()
-
-# ── 4. 엑셀 저장 ───────────────────────────────────────────────
-base = os.path.basename(news_path)[11:17]
-out_xlsx = os.path.join(output_folder, f"portfolio_result_{base}.xlsx")
-result_df.to_excel(out_xlsx, index=False)
-print("✅ 엑셀 저장:", out_xlsx)
-
-# ── 5. 시각화 ───────────────────────────────────────────────
-result_df['Date'] = pd.to_datetime(result_df['Date'])
-long_daily = result_df[result_df['Action'] == 'LONG'].groupby('Date')[
-    'Return'].mean()
-short_daily = result_df[result_df['Action'] == 'SHORT'].groupby('Date')[
-    'Return'].mean()
-total_daily = result_df.groupby('Date')['Return'].mean()
-
-long_cum = (1+long_daily).cumprod()-1
-short_cum = (1+short_daily).cumprod()-1
-total_cum = (1+total_daily).cumprod()-1
-
-plt.figure(figsize=(10, 5))
-plt.plot(long_cum, '--', label='LONG')
-plt.plot(short_cum, ':', label='SHORT')
-plt.plot(total_cum, '-', label='TOTAL')
-plt.title('Cumulative Returns')
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-png1 = os.path.join(output_folder, f"cum_returns_{base}.png")
-plt.savefig(png1)
-plt.close()
-print("✅ 그래프 저장:", png1)
-
-pos_cnt = result_df.groupby(['Date', 'Action']).size().unstack(fill_value=0)
-pos_cnt.index = pd.to_datetime(pos_cnt.index)
-ax = pos_cnt.plot(kind='bar', stacked=True, figsize=(12, 4), colormap='Set2')
-ax.set_ylabel('Count')
-plt.tight_layout()
-png2 = os.path.join(output_folder, f"daily_count_{base}.png")
-plt.savefig(png2)
-plt.close()
-print("✅ 카운트 그래프 저장:", png2)
-
-# ── 6. 통계 요약 추가 저장 ─────────────────────────────────────────────
-
-
+def calculate_positions_with_tags(df, price_cube, master, ret_cube=None):
+    """
+    (tag1, tag2, 거래일) → 진입/청산 가격을 배열 연산으로 계산 (position_engine)
+    반환: (포지션 DataFrame, 처리 건수, 사유별 스킵 건수)
+    """
+    out, skip_counts = calculate_positions(
+        df, price_cube, master=master, exit_shift=EXIT_SHIFT, ret_cube=ret_cube,
+        cost_params=COST_PARAMS if APPLY_COSTS else None,
+        market=market_codes(master, price_cube['prices'].shape[2]), netting=NETTING)
+    return out, len(out), skip_counts
+
+
+def return_column(result_df):
+    # 비용 차감 결과가 있으면 순수익률 기준
+    return 'Net Return' if 'Net Return' in result_df.columns else 'Return'
+
+
+def add_cumulative_return(result_df, price_cube, ret_cube):
+    """
+    보유 거래일 기준 포트폴리오 누적 수익률 (여러 월을 합친 뒤 전체 기간으로 다시 계산)
+    각 행에는 포지션 청산일 시점의 누적 수익률을 기록
+    """
+    result_df = result_df.sort_values(
+        'Date', kind='stable').reset_index(drop=True)
+    daily = daily_book_returns(result_df, price_cube, ret_cube, return_column(result_df))
+    result_df['Cumulative Return'] = cumulative_at_exit(result_df, daily['TOTAL'])
+    return result_df
+
+
+# ── 3. 월별 병렬 처리 ───────────────────────────────────────────
+# 워커 프로세스마다 가격/누적 로그수익률 행렬을 한 번만 전달받아 재사용
+_worker_state = {}
+
+
+def _init_worker(price_cube, master, ret_cube):
+    _worker_state['price_cube'] = price_cube
+    _worker_state['master'] = master
+    _worker_state['ret_cube'] = ret_cube
+
+
+def _backtest_month(path):
+    master = _worker_state['master']
+    news_df = load_news(path, master)
+    out, _, skip_counts = calculate_positions_with_tags(
+        news_df, _worker_state['price_cube'], master, _worker_state['ret_cube'])
+    return path, out, skip_counts
+
+
+def run_all_months(news_paths, price_cube, master, max_workers=None, ret_cube=None):
+    """
+    월별 뉴스 파일을 프로세스 풀에서 백테스트 후 하나의 결과로 병합
+    반환: (병합 포지션 DataFrame, 파일별 처리/스킵 건수 DataFrame)
+    """
+    frames, stats = [], []
+    if ret_cube is None:
+        ret_cube = build_return_cube(price_cube)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(price_cube, master, ret_cube)) as pool:
+        for path, out, skip_counts in tqdm(pool.map(_backtest_month, news_paths),
+                                           total=len(news_paths)):
+            frames.append(out)
+            stats.append({'file': os.path.basename(path), 'processed': len(out),
+                          **skip_counts.to_dict()})
+
+    frames = [f for f in frames if not f.empty]
+    stats_df = pd.DataFrame(stats, columns=['file', 'processed'] + SKIP_REASONS)
+    if not frames:
+        return pd.DataFrame(), stats_df
+
+    # 월 경계를 넘어 누적 수익률이 이어지도록 전체 기간으로 다시 계산
+    merged = pd.concat(frames, ignore_index=True).drop(
+        columns='Cumulative Return')
+    return add_cumulative_return(merged, price_cube, ret_cube), stats_df
+
+
+# ── 4~6. 결과 저장 / 시각화 / 통계 요약 ───────────────────────────────
 def get_summary(series):
     return pd.Series({
         'Mean': series.mean() * 100,
@@ -190,12 +188,90 @@ def get_summary(series):
     })
 
 
-summary_df = pd.DataFrame({
-    'Long Cumulative Return': get_summary(long_cum),
-    'Short Cumulative Return': get_summary(short_cum),
-    'Long+Short Cumulative Return': get_summary(total_cum)
-}).round(3)
-
-summary_path = os.path.join(output_folder, f"summary_stats_{base}.csv")
-summary_df.to_csv(summary_path)
-print("✅ 통계 요약 저장:", summary_path)
+def save_results(result_df, base, price_cube, ret_cube):
+    # ── 4. 엑셀 저장 ───────────────────────────────────────────────
+    out_xlsx = os.path.join(output_folder, f"portfolio_result_{base}.xlsx")
+    result_df.to_excel(out_xlsx, index=False)
+    print("✅ 엑셀 저장:", out_xlsx)
+
+    # ── 5. 시각화 ───────────────────────────────────────────────
+    # 신호일이 아니라 보유 거래일별 포트폴리오 수익률로 누적 (EXIT_SHIFT 로 보유 기간이 겹쳐도 일별 복리)
+    daily = daily_book_returns(result_df, price_cube, ret_cube, return_column(result_df))
+    long_cum = (1+daily['LONG']).cumprod()-1
+    short_cum = (1+daily['SHORT']).cumprod()-1
+    total_cum = (1+daily['TOTAL']).cumprod()-1
+
+    plt.figure(figsize=(10, 5))
+    plt.plot(long_cum, '--', label='LONG')
+    plt.plot(short_cum, ':', label='SHORT')
+    plt.plot(total_cum, '-', label='TOTAL')
+    plt.title('Cumulative Returns')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    png1 = os.path.join(output_folder, f"cum_returns_{base}.png")
+    plt.savefig(png1)
+    plt.close()
+    print("✅ 그래프 저장:", png1)
+
+    result_df = result_df.copy()
+    result_df['Date'] = pd.to_datetime(result_df['Date'])
+    pos_cnt = result_df.groupby(
+        ['Date', 'Action']).size().unstack(fill_value=0)
+    pos_cnt.index = pd.to_datetime(pos_cnt.index)
+    ax = pos_cnt.plot(kind='bar', stacked=True,
+                      figsize=(12, 4), colormap='Set2')
+    ax.set_ylabel('Count')
+    plt.tight_layout()
+    png2 = os.path.join(output_folder, f"daily_count_{base}.png")
+    plt.savefig(png2)
+    plt.close()
+    print("✅ 카운트 그래프 저장:", png2)
+
+    # ── 6. 통계 요약 추가 저장 ─────────────────────────────────────────────
+    summary_df = pd.DataFrame({
+        'Long Cumulative Return': get_summary(long_cum),
+        'Short Cumulative Return': get_summary(short_cum),
+        'Long+Short Cumulative Return': get_summary(total_cum)
+    }).round(3)
+
+    summary_path = os.path.join(output_folder, f"summary_stats_{base}.csv")
+    summary_df.to_csv(summary_path)
+    print("✅ 통계 요약 저장:", summary_path)
+
+
+# 메인 실행 코드
+if __name__ == "__main__":
+    os.makedirs(output_folder, exist_ok=True)
+
+    # 주가는 한 번만 로드 → (거래일 × security_id) 가격 행렬
+    price_df, master = load_price_data(stock_path)
+    price_cube = build_price_cube(price_df)
+    ret_cube = build_return_cube(price_cube)
+
+    if news_path is not None:
+        # ── 단일 월 ──
+        news_df = load_news(news_path, master)
+        result_df, proc, skip = calculate_positions_with_tags(
+            news_df, price_cube, master, ret_cube)
+        print(f"✅ 처리: {proc}건, 스킵: {skip.sum()}건")
+        for reason, cnt in skip[skip > 0].items():
+            print(f"   - {reason}: {cnt}건")
+        base = os.path.basename(news_path)[11:17]
+    else:
+        # ── 전체 월 병렬 ──
+        news_paths = sorted(glob.glob(os.path.join(news_folder, '*.xlsx')))
+        result_df, stats_df = run_all_months(
+            news_paths, price_cube, master, MAX_WORKERS, ret_cube)
+        print(f"✅ {len(news_paths)}개 월 처리: {stats_df['processed'].sum()}건, "
+              f"스킵: {stats_df[SKIP_REASONS].to_numpy().sum()}건")
+        base = 'all'
+        stats_path = os.path.join(output_folder, "run_stats_all.csv")
+        stats_df.to_csv(stats_path, index=False, encoding='utf-8-sig')
+        print("✅ 월별 처리 현황 저장:", stats_path)
+
+    if result_df.empty:
+        print("⚠️ 유효 포지션 없음 – 종료")
+        exit()
+
+    save_results(result_df, base, price_cube, ret_cube)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from daily_aggregates import weighted_delta_neutral_by_category
+from index_hedge import row_cube_positions, trailing_window_sum
+from metrics_kernel import compute_metrics
+
+# 롱/숏 북 안 종목 가중치: 동일가중 / 역변동성 (가격 큐브 롤링 변동성) / 시가총액 / 신뢰도(점수 절대값)
+# 행별 원시 가중치를 배열로 만든 뒤 (카테고리 × 거래일) 셀 안에서 정규화하고 종목당 상한을 적용한다.
+
+WEIGHT_SCHEMES = ['equal', 'inverse_vol', 'market_cap', 'score']
+
+VOL_WINDOW = 60       # 변동성 추정 창 (거래일)
+MIN_VOL_OBS = 20      # 창 안 최소 유효 관측 수
+
+SWEEP_METRICS = ['total_return', 'annual_return', 'annual_vol', 'sharpe_ratio',
+                 'sortino_ratio', 'max_drawdown']
+
+
+def rolling_volatility(stock_ret, window=VOL_WINDOW, min_obs=MIN_VOL_OBS):
+    """
+    (거래일 × 종목) 수익률 → 거래일 t 의 일별 변동성 (t-window ~ t-1 창 표본 표준편차, 당일 미포함)
+    유효 관측이 min_obs 미만이면 NaN
+    """
+    valid = ~np.isnan(stock_ret)
+    y = np.where(valid, stock_ret, 0.0)
+    n = trailing_window_sum(valid.astype(float), window)
+    s1, s2 = trailing_window_sum(y, window), trailing_window_sum(y * y, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = np.maximum(s2 - s1 ** 2 / n, 0) / (n - 1)
+    return np.where(n >= min_obs, np.sqrt(var), np.nan)
+
+
+def cube_row_values(df, dates, matrix, id_col='security_id', date_col='current_date'):
+    """
+    (거래일 × 종목) 행렬에서 행별 (거래일, 종목) 값, 찾지 못하면 NaN
+    """
+    day, day_ok, sec, sec_ok = row_cube_positions(df, dates, matrix.shape[1], id_col, date_col)
+    return np.where(day_ok & sec_ok, matrix[day, sec], np.nan)
+
+
+def row_weights(df, scheme='equal', dates=None, volatility=None, market_cap=None,
+                score_col='GPT_SCORE', cap_col='시가총액', id_col='security_id', date_col='current_date'):
+    """
+    행별 원시 가중치 (정규화 전, NaN 은 집계 시 같은 셀 평균으로 채움)
+    equal: 1, inverse_vol: 1 / rolling_volatility, market_cap: cap_col 컬럼 (없으면 (거래일 × 종목) market_cap 행렬),
+    score: |score_col|
+    """
+    if scheme == 'equal':
+        return np.ones(len(df))
+    if scheme == 'inverse_vol':
+        if volatility is None:
+            raise ValueError("inverse_vol 은 volatility (rolling_volatility 결과) 와 dates 가 필요합니다.")
+        vol = cube_row_values(df, dates, volatility, id_col, date_col)
+        with np.errstate(divide='ignore'):
+            return np.where(vol > 0, 1.0 / vol, np.nan)
+    if scheme == 'market_cap':
+        if cap_col in df.columns:
+            return pd.to_numeric(df[cap_col], errors='coerce').to_numpy(dtype=float)
+        if market_cap is None:
+            raise ValueError(f"market_cap 은 '{cap_col}' 컬럼 또는 (거래일 × 종목) market_cap 행렬이 필요합니다.")
+        return cube_row_values(df, dates, market_cap, id_col, date_col)
+    if scheme == 'score':
+        return np.abs(pd.to_numeric(df[score_col], errors='coerce').to_numpy(dtype=float))
+    raise ValueError(f"scheme 은 {WEIGHT_SCHEMES} 중 하나: {scheme}")
+
+
+def scheme_sweep(df, cells, scheme_weights, name_cap=None, column='long_short_return', metric_keys=SWEEP_METRICS):
+    """
+    가중치 방식 → 행별 가중치 dict 를 모든 카테고리에 적용해 지표 비교
+    반환: ((방식, 카테고리) × 지표) DataFrame (카테고리에 뉴스가 없는 날은 수익률 0)
+    """
+    returns = {}
+    for scheme, weights in scheme_weights.items():
+        for category, daily in weighted_delta_neutral_by_category(df, cells, weights, name_cap).items():
+            returns[(scheme, category)] = daily[column]
+    table = compute_metrics(pd.DataFrame(returns).sort_index().fillna(0))[metric_keys]
+    table.index.names = ['가중치', '카테고리']
+    return table